@@ -0,0 +1,45 @@
+from fastapi import APIRouter, HTTPException, status
+from typing import Optional
+from datetime import date
+from app.schemas.agenda import AgendaResponse
+from app.services.agenda_service import agenda_service, get_zone
+from app.services.recurrence_service import utcnow
+
+router = APIRouter()
+
+
+@router.get("/", response_model=AgendaResponse)
+async def get_agenda(
+    user_id: int = 1,  # TODO: Get from auth
+    day: Optional[date] = None,
+    tz: str = "UTC",
+    briefing: bool = False,
+):
+    """
+    Get the agenda of a day: open tasks due by its end (overdue included)
+    and the events overlapping it, recurring occurrences included
+
+    With `briefing=true` an AI-generated summary of the day is added.
+    """
+    try:
+        zone = get_zone(tz)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    day = day or utcnow().astimezone(zone).date()
+    agenda = await agenda_service.get_agenda(user_id, day, zone)
+
+    summary = None
+    if briefing:
+        try:
+            summary = await agenda_service.get_briefing(user_id, agenda)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Briefing failed: {str(e)}",
+            )
+
+    return AgendaResponse(**agenda, briefing=summary)
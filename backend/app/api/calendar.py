@@ -1,26 +1,142 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List, Optional
 from datetime import datetime, timedelta
-from app.core.database import get_db
-from app.models.calendar import CalendarEvent
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
+from app.models.calendar import CalendarEvent, CalendarEventOverride
 from app.schemas.calendar import (
     CalendarEventCreate,
     CalendarEventUpdate,
     CalendarEventResponse,
+    CalendarEventOverrideCreate,
+    CalendarEventOverrideResponse,
+    CalendarEventWithConflicts,
+    EventConflict,
+    BusyInterval,
+    FreeBusyResponse,
+    CalendarImportResponse,
+)
+from app.services.ical_service import ical_service
+from app.services.agenda_service import agenda_service
+from app.services.change_feed import (
+    change_feed,
+    KIND_EVENT,
+    ACTION_CREATED,
+    ACTION_UPDATED,
+    ACTION_DELETED,
+    ACTION_RESET,
+)
+from app.services.freebusy_service import freebusy_service
+from app.services.reminder_scheduler import reminder_scheduler
+from app.services.recurrence_service import (
+    recurrence_service,
+    Occurrence,
+    EPOCH,
+    MODE_CONTAINED,
+    MODE_STARTS,
+    MODE_OVERLAP,
+    window_filter,
+    not_expanded,
+    ensure_aware,
+    get_zone,
+    utcnow,
 )
 
 router = APIRouter()
 
 
-@router.post("/", response_model=CalendarEventResponse, status_code=status.HTTP_201_CREATED)
+def _validate_recurrence(event) -> None:
+    """Raise 400 if an event has an unknown timezone or a recurring event an invalid rule"""
+    try:
+        get_zone(event.tzid)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    if not event.is_recurring or not event.recurrence_rule:
+        return
+
+    try:
+        recurrence_service.validate(event.recurrence_rule, event.start_time, event.tzid)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid recurrence rule: {str(e)}",
+        )
+
+
+async def _event_changed(
+    event: CalendarEvent,
+    check_conflicts: bool = False,
+    action: str = ACTION_UPDATED,
+) -> CalendarEventWithConflicts:
+    """Propagate a committed event change and build the response"""
+    await reminder_scheduler.event_changed(event)
+    await freebusy_service.event_changed(event)
+    await agenda_service.invalidate(event.user_id)
+
+    response = CalendarEventWithConflicts.model_validate(event)
+    await change_feed.publish(
+        event.user_id,
+        KIND_EVENT,
+        action,
+        event.id,
+        CalendarEventResponse.model_validate(event).model_dump(mode="json"),
+    )
+    if check_conflicts:
+        response.conflicts = [
+            EventConflict.model_validate(c) for c in await freebusy_service.conflicts(event)
+        ]
+    return response
+
+
+def _validate_window(start_date: datetime, end_date: datetime):
+    """Raise 400 if a free/busy window is empty or too long"""
+    if start_date >= end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_date must be after start_date",
+        )
+
+    if end_date - start_date > timedelta(days=settings.RECURRENCE_HORIZON_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Window must not exceed {settings.RECURRENCE_HORIZON_DAYS} days",
+        )
+
+
+def _occurrence_response(event: CalendarEvent, occurrence: Occurrence) -> CalendarEventResponse:
+    """Build an event response for a single occurrence"""
+    return CalendarEventResponse.model_validate(event).model_copy(
+        update={
+            "start_time": occurrence.start_time,
+            "end_time": occurrence.end_time,
+            "recurrence_id": occurrence.recurrence_id,
+            "title": occurrence.title or event.title,
+            "description": occurrence.description or event.description,
+            "location": occurrence.location or event.location,
+        }
+    )
+
+
+@router.post("/", response_model=CalendarEventWithConflicts, status_code=status.HTTP_201_CREATED)
 async def create_event(
     event_data: CalendarEventCreate,
     user_id: int = 1,  # TODO: Get from auth
+    check_conflicts: bool = False,
     db: AsyncSession = Depends(get_db),
 ):
-    """Create a new calendar event"""
+    """
+    Create a new calendar event
+
+    With `check_conflicts=true` the response lists the events that overlap
+    the new event. Conflicts are a warning; the event is created anyway.
+    """
 
     # Validate dates
     if event_data.start_time >= event_data.end_time:
@@ -33,12 +149,15 @@ async def create_event(
         user_id=user_id,
         **event_data.model_dump(),
     )
+    _validate_recurrence(event)
 
+    # Materialized before the flush, so the occurrence coverage is part of
+    # the INSERT; id and created_at come back from INSERT ... RETURNING
     db.add(event)
+    await recurrence_service.materialize(db, event, overrides=[])
     await db.commit()
-    await db.refresh(event)
 
-    return event
+    return await _event_changed(event, check_conflicts, ACTION_CREATED)
 
 
 @router.get("/", response_model=List[CalendarEventResponse])
@@ -46,22 +165,41 @@ async def get_events(
     user_id: int = 1,  # TODO: Get from auth
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    db: AsyncSession = Depends(get_db),
+    overlap: bool = False,
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Get calendar events for a user"""
+    """
+    Get calendar events for a user
+
+    When a date range is given, recurring events are expanded into their
+    occurrences inside the range. By default only events that lie entirely
+    inside the range are returned; with `overlap=true` every event that
+    intersects the half-open range [start_date, end_date) is returned,
+    including events that straddle its edges.
+    """
     query = select(CalendarEvent).where(CalendarEvent.user_id == user_id)
 
-    # Filter by date range if provided
-    if start_date:
-        query = query.where(CalendarEvent.start_time >= start_date)
-    if end_date:
-        query = query.where(CalendarEvent.end_time <= end_date)
+    if start_date is None and end_date is None:
+        query = query.order_by(CalendarEvent.start_time.asc())
+        result = await db.execute(query)
+        return result.scalars().all()
 
-    query = query.order_by(CalendarEvent.start_time.asc())
+    mode = MODE_OVERLAP if overlap else MODE_CONTAINED
 
+    # Filter by date range
+    query = query.where(window_filter(CalendarEvent, start_date, end_date, mode), not_expanded)
     result = await db.execute(query)
-    events = result.scalars().all()
+    events = [CalendarEventResponse.model_validate(e) for e in result.scalars().all()]
+
+    # Expand recurring events, bounding open-ended ranges by the horizon
+    window_start = ensure_aware(start_date) if start_date else EPOCH
+    window_end = ensure_aware(end_date) if end_date else (
+        max(window_start, utcnow()) + timedelta(days=settings.RECURRENCE_HORIZON_DAYS)
+    )
+    occurrences = await recurrence_service.get_occurrences(db, user_id, window_start, window_end, mode)
+    events.extend(_occurrence_response(event, o) for event, o in occurrences)
 
+    events.sort(key=lambda e: ensure_aware(e.start_time))
     return events
 
 
@@ -69,10 +207,10 @@ async def get_events(
 async def get_upcoming_events(
     user_id: int = 1,  # TODO: Get from auth
     days: int = 7,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Get upcoming events for the next N days"""
-    now = datetime.utcnow()
+    """Get upcoming events for the next N days, including recurring occurrences"""
+    now = utcnow()
     end_date = now + timedelta(days=days)
 
     result = await db.execute(
@@ -81,19 +219,127 @@ async def get_upcoming_events(
             CalendarEvent.user_id == user_id,
             CalendarEvent.start_time >= now,
             CalendarEvent.start_time <= end_date,
+            not_expanded,
         )
-        .order_by(CalendarEvent.start_time.asc())
     )
-    events = result.scalars().all()
+    events = [CalendarEventResponse.model_validate(e) for e in result.scalars().all()]
 
+    occurrences = await recurrence_service.get_occurrences(db, user_id, now, end_date, MODE_STARTS)
+    events.extend(_occurrence_response(event, o) for event, o in occurrences)
+
+    events.sort(key=lambda e: ensure_aware(e.start_time))
     return events
 
 
+@router.get("/freebusy", response_model=FreeBusyResponse)
+async def get_freebusy(
+    start_date: datetime,
+    end_date: datetime,
+    user_id: int = 1,  # TODO: Get from auth
+):
+    """Get merged busy intervals and the free gaps between them"""
+    start_date, end_date = ensure_aware(start_date), ensure_aware(end_date)
+    _validate_window(start_date, end_date)
+
+    busy = await freebusy_service.busy(user_id, start_date, end_date)
+    free = freebusy_service.gaps(busy, start_date, end_date)
+
+    return FreeBusyResponse(
+        start_date=start_date,
+        end_date=end_date,
+        busy=[BusyInterval(start_time=s, end_time=e) for s, e in busy],
+        free=[BusyInterval(start_time=s, end_time=e) for s, e in free],
+    )
+
+
+@router.get("/find-slot", response_model=List[BusyInterval])
+async def find_slot(
+    duration_minutes: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    limit: int = 5,
+    align_minutes: int = 15,
+    user_id: int = 1,  # TODO: Get from auth
+):
+    """
+    Suggest free slots of the given length
+
+    Searches from now (or start_date) for the next 7 days (or until end_date).
+    """
+    if duration_minutes <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="duration_minutes must be positive",
+        )
+
+    start_date = ensure_aware(start_date) if start_date else utcnow()
+    end_date = ensure_aware(end_date) if end_date else start_date + timedelta(days=7)
+    _validate_window(start_date, end_date)
+
+    slots = await freebusy_service.find_slots(
+        user_id,
+        start_date,
+        end_date,
+        timedelta(minutes=duration_minutes),
+        limit=limit,
+        align_minutes=align_minutes,
+    )
+
+    return [BusyInterval(start_time=s, end_time=e) for s, e in slots]
+
+
+@router.post("/import", response_model=CalendarImportResponse)
+async def import_calendar(
+    file: UploadFile = File(...),
+    user_id: int = 1,  # TODO: Get from auth
+):
+    """
+    Import events from an iCalendar (.ics) file
+
+    Events are matched by UID, so importing the same calendar again
+    updates the events instead of duplicating them. VEVENTs that cannot
+    be imported are skipped and reported.
+    """
+    if file.size is not None and file.size > settings.ICAL_IMPORT_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File size exceeds maximum allowed size of {settings.ICAL_IMPORT_MAX_SIZE} bytes",
+        )
+
+    try:
+        result = await ical_service.import_events(user_id, file)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Import failed: {str(e)}",
+        )
+    finally:
+        freebusy_service.invalidate(user_id)
+        await agenda_service.invalidate(user_id)
+        await reminder_scheduler.reload()
+        # Too many changes to send one by one; clients reload their events
+        await change_feed.publish(user_id, KIND_EVENT, ACTION_RESET, None)
+
+    return result
+
+
+@router.get("/export.ics")
+async def export_calendar(
+    user_id: int = 1,  # TODO: Get from auth
+):
+    """Export all events of a user as an iCalendar (.ics) file"""
+    return StreamingResponse(
+        ical_service.export_events(user_id),
+        media_type="text/calendar; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="calendar.ics"'},
+    )
+
+
 @router.get("/{event_id}", response_model=CalendarEventResponse)
 async def get_event(
     event_id: int,
     user_id: int = 1,  # TODO: Get from auth
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get a specific calendar event"""
     result = await db.execute(
@@ -113,11 +359,12 @@ async def get_event(
     return event
 
 
-@router.put("/{event_id}", response_model=CalendarEventResponse)
+@router.put("/{event_id}", response_model=CalendarEventWithConflicts)
 async def update_event(
     event_id: int,
     event_data: CalendarEventUpdate,
     user_id: int = 1,  # TODO: Get from auth
+    check_conflicts: bool = False,
     db: AsyncSession = Depends(get_db),
 ):
     """Update a calendar event"""
@@ -147,11 +394,13 @@ async def update_event(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="End time must be after start time",
         )
+    _validate_recurrence(event)
 
+    await recurrence_service.materialize(db, event)
     await db.commit()
     await db.refresh(event)
 
-    return event
+    return await _event_changed(event, check_conflicts)
 
 
 @router.delete("/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -177,5 +426,97 @@ async def delete_event(
 
     await db.delete(event)
     await db.commit()
+    reminder_scheduler.event_deleted(event_id)
+    freebusy_service.event_deleted(user_id, event_id)
+    await agenda_service.invalidate(user_id)
+    await change_feed.publish(user_id, KIND_EVENT, ACTION_DELETED, event_id)
+
+    return None
+
+
+@router.put("/{event_id}/occurrences", response_model=CalendarEventOverrideResponse)
+async def override_occurrence(
+    event_id: int,
+    override_data: CalendarEventOverrideCreate,
+    user_id: int = 1,  # TODO: Get from auth
+    db: AsyncSession = Depends(get_db),
+):
+    """Modify or cancel a single occurrence of a recurring event"""
+    result = await db.execute(
+        select(CalendarEvent).where(
+            CalendarEvent.id == event_id,
+            CalendarEvent.user_id == user_id,
+        )
+    )
+    event = result.scalar_one_or_none()
+
+    if not event:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found",
+        )
+
+    if not event.is_recurring or not event.recurrence_rule:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Event is not recurring",
+        )
+
+    recurrence_id = ensure_aware(override_data.recurrence_id)
+    if recurrence_id not in recurrence_service.parse_rule(event.recurrence_rule, event.start_time, event.tzid):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="recurrence_id is not an occurrence of this event",
+        )
+
+    overrides = await recurrence_service.load_overrides(db, event.id)
+    override = next(
+        (o for o in overrides if ensure_aware(o.recurrence_id) == recurrence_id),
+        None,
+    )
+
+    if override is None:
+        override = CalendarEventOverride(event_id=event.id)
+        db.add(override)
+        overrides.append(override)
+
+    for field, value in override_data.model_dump().items():
+        setattr(override, field, value)
+    override.recurrence_id = recurrence_id
+
+    # Times left unset keep the occurrence's start (and its duration)
+    start_time = override.start_time or recurrence_id
+    end_time = override.end_time or start_time + (event.end_time - event.start_time)
+    if start_time >= end_time:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="End time must be after start time",
+        )
+
+    await db.flush()
+    await recurrence_service.materialize(db, event, overrides)
+    await db.commit()
+    # The override is fully loaded (id comes back from INSERT ... RETURNING),
+    # but the event's updated_at was expired by the UPDATE of its coverage
+    await db.refresh(event, ["updated_at"])
+    await _event_changed(event)
+
+    return override
+
+
+@router.delete("/{event_id}/occurrences", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_occurrence(
+    event_id: int,
+    recurrence_id: datetime,
+    user_id: int = 1,  # TODO: Get from auth
+    db: AsyncSession = Depends(get_db),
+):
+    """Cancel a single occurrence of a recurring event (adds an EXDATE-style override)"""
+    await override_occurrence(
+        event_id,
+        CalendarEventOverrideCreate(recurrence_id=recurrence_id, is_cancelled=True),
+        user_id=user_id,
+        db=db,
+    )
 
     return None
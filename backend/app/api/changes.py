@@ -0,0 +1,100 @@
+import asyncio
+from fastapi import APIRouter, Header, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from typing import AsyncGenerator, Optional
+from app.core.config import settings
+from app.core.redis import REDIS_ERRORS
+from app.core.sse import format_sse, SSE_HEADERS, SSE_PING
+from app.schemas.changes import ChangesResponse
+from app.services.change_feed import change_feed, ACTION_RESET, END_OF_STREAM
+
+router = APIRouter()
+
+
+@router.get("/", response_model=ChangesResponse)
+async def get_changes(
+    since: int = 0,
+    user_id: int = 1,  # TODO: Get from auth
+):
+    """
+    Get task and event changes after a sequence number (delta sync)
+
+    Clients keep `latest_seq` and pass it as `since` on the next call.
+    When `reset` is true the changes are no longer available and the
+    client should reload `/tasks` and `/calendar`.
+    """
+    changes, latest, reset = await change_feed.changes_since(user_id, since)
+
+    return ChangesResponse(changes=[] if reset else changes, latest_seq=latest, reset=reset)
+
+
+@router.get("/stream")
+async def stream_changes(
+    request: Request,
+    since: Optional[int] = None,
+    user_id: int = 1,  # TODO: Get from auth
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Stream task and event changes over Server-Sent Events
+
+    Each `change` event carries its sequence number as the SSE id, so
+    reconnecting clients resume through Last-Event-ID (or `since`).
+    Missed changes are replayed first. A `reset` event means changes
+    were lost and the client should reload its lists.
+    """
+    if since is None and last_event_id:
+        try:
+            since = int(last_event_id)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid Last-Event-ID",
+            )
+
+    async def _event_stream() -> AsyncGenerator[str, None]:
+        try:
+            async with change_feed.subscribe(user_id) as queue:
+                # Subscribed before reading the log, so nothing falls in between
+                changes, latest, reset = await change_feed.changes_since(user_id, since or 0)
+                last_seq = latest if since is None else since
+
+                if reset:
+                    yield format_sse({"latest_seq": latest}, event=ACTION_RESET, id=latest)
+                    last_seq = latest
+                elif since is not None:
+                    for change in changes:
+                        yield format_sse(change, event="change", id=change["seq"])
+                        last_seq = change["seq"]
+
+                yield format_sse({"latest_seq": last_seq}, event="ready")
+
+                while not await request.is_disconnected():
+                    try:
+                        change = await asyncio.wait_for(queue.get(), timeout=settings.CHANGE_FEED_HEARTBEAT)
+                    except asyncio.TimeoutError:
+                        yield SSE_PING
+                        continue
+
+                    if change is END_OF_STREAM:
+                        # The client reconnects with Last-Event-ID and resubscribes
+                        break
+
+                    if change["action"] == ACTION_RESET:
+                        yield format_sse({"latest_seq": change.get("seq")}, event=ACTION_RESET, id=change.get("seq"))
+                        continue
+
+                    # Skip changes already replayed from the log
+                    if change["seq"] is not None and change["seq"] <= last_seq:
+                        continue
+                    last_seq = change["seq"]
+                    yield format_sse(change, event="change", id=change["seq"])
+
+        except REDIS_ERRORS as e:
+            yield format_sse({"detail": f"Change feed unavailable: {str(e)}"}, event="error")
+
+    return StreamingResponse(
+        _event_stream(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
@@ -5,7 +5,8 @@ from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from typing import List
 from datetime import datetime
-from app.core.database import get_db
+import asyncio
+from app.core.database import get_db, get_read_db
 from app.models.conversation import Conversation, Message, MessageRole
 from app.schemas.chat import (
     ChatRequest,
@@ -42,24 +43,13 @@ async def chat(
                 detail="Conversation not found",
             )
     else:
-        # Create new conversation
+        # Create new conversation; it is inserted with the user message
         conversation = Conversation(
             user_id=user_id,
             ai_provider=request.ai_provider or "gemini",
+            messages=[],
         )
         db.add(conversation)
-        await db.commit()
-        await db.refresh(conversation)
-
-    # Create user message
-    user_message = Message(
-        conversation_id=conversation.id,
-        role=MessageRole.USER,
-        content=request.message,
-    )
-    db.add(user_message)
-    await db.commit()
-    await db.refresh(user_message)
 
     # Get AI service
     ai_service = AIServiceFactory.get_service(
@@ -80,23 +70,41 @@ async def chat(
             detail="Streaming not yet implemented",
         )
 
-    try:
-        ai_response = await ai_service.chat(messages)
-    except Exception as e:
+    # Create user message
+    user_message = Message(
+        conversation=conversation,
+        role=MessageRole.USER,
+        content=request.message,
+    )
+    db.add(user_message)
+
+    # The user message is written (INSERT ... RETURNING) while the provider
+    # works on the reply; the whole turn commits once at the end
+    flushed, ai_response = await asyncio.gather(
+        db.flush(),
+        ai_service.chat(messages),
+        return_exceptions=True,
+    )
+    if isinstance(flushed, BaseException):
+        raise flushed
+    if isinstance(ai_response, BaseException):
+        if not isinstance(ai_response, Exception):
+            raise ai_response
+        # Keep the user message even though there is no reply
+        await db.commit()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"AI service error: {str(e)}",
+            detail=f"AI service error: {str(ai_response)}",
         )
 
     # Create assistant message
     assistant_message = Message(
-        conversation_id=conversation.id,
+        conversation=conversation,
         role=MessageRole.ASSISTANT,
         content=ai_response,
     )
     db.add(assistant_message)
     await db.commit()
-    await db.refresh(assistant_message)
 
     return ChatResponse(
         conversation_id=conversation.id,
@@ -108,7 +116,7 @@ async def chat(
 @router.get("/conversations", response_model=List[ConversationResponse])
 async def get_conversations(
     user_id: int = 1,  # TODO: Get from auth
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get all conversations for a user"""
     result = await db.execute(
@@ -126,7 +134,7 @@ async def get_conversations(
 async def get_conversation(
     conversation_id: int,
     user_id: int = 1,  # TODO: Get from auth
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get a specific conversation"""
     result = await db.execute(
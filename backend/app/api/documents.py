@@ -5,7 +5,7 @@ from typing import List
 from datetime import datetime
 import aiofiles
 import os
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.models.document import Document
 from app.schemas.document import (
     DocumentResponse,
@@ -54,9 +54,9 @@ async def upload_document(
         file_size=len(content),
     )
 
+    # id and created_at come back from INSERT ... RETURNING
     db.add(document)
     await db.commit()
-    await db.refresh(document)
 
     return document
 
@@ -118,7 +118,7 @@ async def analyze_document(
 @router.get("/", response_model=List[DocumentResponse])
 async def get_documents(
     user_id: int = 1,  # TODO: Get from auth
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get all documents for a user"""
     result = await db.execute(
@@ -135,7 +135,7 @@ async def get_documents(
 async def get_document(
     document_id: int,
     user_id: int = 1,  # TODO: Get from auth
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get a specific document"""
     result = await db.execute(
@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import FileResponse, PlainTextResponse
+from typing import Optional
+import asyncio
+from app.core.profiling import check_token, profile_store
+
+router = APIRouter()
+
+
+async def require_profiling_token(x_profile_token: Optional[str] = Header(None)):
+    """Allow only callers presenting PROFILING_TOKEN"""
+    if not check_token(x_profile_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Profiling requires a valid X-Profile-Token",
+        )
+
+
+@router.get("/", dependencies=[Depends(require_profiling_token)])
+async def list_profiles():
+    """List stored request profiles, newest first"""
+    return await asyncio.to_thread(profile_store.list_profiles)
+
+
+@router.get("/flamegraphs", dependencies=[Depends(require_profiling_token)])
+async def list_flamegraphs():
+    """List routes with sampled flamegraphs"""
+    return await asyncio.to_thread(profile_store.list_flamegraphs)
+
+
+@router.get("/flamegraphs/{name}", dependencies=[Depends(require_profiling_token)])
+async def get_flamegraph(name: str):
+    """
+    Get the aggregated flamegraph of a route
+
+    Returns folded stacks ("frame;frame;frame microseconds" per line) for
+    flamegraph.pl, speedscope or similar tools.
+    """
+    folded = await asyncio.to_thread(profile_store.flamegraph, name)
+    if folded is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Flamegraph not found",
+        )
+
+    return PlainTextResponse(folded)
+
+
+@router.get("/{name}", dependencies=[Depends(require_profiling_token)])
+async def get_profile(name: str):
+    """Download a stored profile (HTML, or JSON to open in speedscope)"""
+    path = profile_store.profile_path(name)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found",
+        )
+
+    media_type = "text/html" if name.endswith(".html") else "application/json"
+    return FileResponse(path, media_type=media_type, filename=name)
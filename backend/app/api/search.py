@@ -1,17 +1,57 @@
 from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import StreamingResponse
+from typing import AsyncGenerator, Dict, List
 from app.schemas.search import SearchRequest, SearchResponse, SearchResult
 from app.services.web_search_service import WebSearchService
 from app.services.ai_factory import AIServiceFactory
+from app.core.cache import TwoLevelCache, MISSING, make_key
+from app.core.config import settings
+from app.core.sse import format_sse, SSE_HEADERS
 
 router = APIRouter()
 search_service = WebSearchService()
+summary_cache = TwoLevelCache(
+    "search-summary",
+    ttl=settings.SEARCH_CACHE_TTL,
+    maxsize=settings.CACHE_LOCAL_MAXSIZE,
+)
+
+
+def build_summary_messages(query: str, results: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Build the AI prompt that summarizes search results"""
+    # Prepare context for AI
+    context = f"Web search results for '{query}':\n\n"
+    for i, result in enumerate(results, 1):
+        context += f"{i}. {result['title']}\n"
+        context += f"   {result['snippet']}\n\n"
+
+    return [
+        {
+            "role": "system",
+            "content": "You are a helpful assistant that summarizes web search results.",
+        },
+        {
+            "role": "user",
+            "content": f"Please provide a concise summary of these search results:\n\n{context}",
+        },
+    ]
+
+
+def _summary_key(request: SearchRequest) -> str:
+    """Cache key for a summarized search"""
+    return make_key(
+        request.query.strip().lower(),
+        request.num_results,
+        request.lang,
+        settings.DEFAULT_AI_PROVIDER,
+    )
 
 
 @router.post("/", response_model=SearchResponse)
 async def search_web(request: SearchRequest):
     """Search the web and get AI-summarized results"""
 
-    try:
+    async def _search_and_summarize() -> dict:
         # Perform search
         results = await search_service.search(
             request.query,
@@ -19,38 +59,32 @@ async def search_web(request: SearchRequest):
             request.lang,
         )
 
-        # Convert to SearchResult objects
-        search_results = [
-            SearchResult(**result) for result in results
-        ]
-
         # Generate summary using AI
         ai_service = AIServiceFactory.get_service()
+        summary = await ai_service.chat(
+            build_summary_messages(request.query, results),
+            temperature=0.3,
+        )
 
-        # Prepare context for AI
-        context = f"Web search results for '{request.query}':\n\n"
-        for i, result in enumerate(results, 1):
-            context += f"{i}. {result['title']}\n"
-            context += f"   {result['snippet']}\n\n"
-
-        # Get AI summary
-        messages = [
-            {
-                "role": "system",
-                "content": "You are a helpful assistant that summarizes web search results.",
-            },
-            {
-                "role": "user",
-                "content": f"Please provide a concise summary of these search results:\n\n{context}",
-            },
-        ]
+        return {"results": results, "summary": summary}
 
-        summary = await ai_service.chat(messages, temperature=0.3)
+    try:
+        cached = await summary_cache.get_or_compute(
+            _summary_key(request),
+            _search_and_summarize,
+            # search() returns [] on errors, which must not be cached
+            cacheable=lambda value: bool(value["results"]),
+        )
+
+        # Convert to SearchResult objects
+        search_results = [
+            SearchResult(**result) for result in cached["results"]
+        ]
 
         return SearchResponse(
             query=request.query,
             results=search_results,
-            summary=summary,
+            summary=cached["summary"],
         )
 
     except Exception as e:
@@ -58,3 +92,60 @@ async def search_web(request: SearchRequest):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Search failed: {str(e)}",
         )
+
+
+@router.post("/stream")
+async def search_web_stream(request: SearchRequest):
+    """
+    Search the web and stream the AI summary over Server-Sent Events
+
+    Emits a `results` event as soon as the search returns, then `token`
+    events while the summary is generated, and a final `done` event with
+    the full summary (or an `error` event).
+    """
+
+    async def _event_stream() -> AsyncGenerator[str, None]:
+        key = _summary_key(request)
+        cached = await summary_cache.get(key)
+
+        if cached is not MISSING:
+            yield format_sse({"query": request.query, "results": cached["results"]}, event="results")
+            yield format_sse({"text": cached["summary"]}, event="token")
+            yield format_sse({"summary": cached["summary"]}, event="done")
+            return
+
+        try:
+            results = await search_service.search(
+                request.query,
+                request.num_results,
+                request.lang,
+            )
+            search_results = [SearchResult(**result).model_dump() for result in results]
+            yield format_sse({"query": request.query, "results": search_results}, event="results")
+
+            ai_service = AIServiceFactory.get_service()
+            stream = await ai_service.chat(
+                build_summary_messages(request.query, results),
+                temperature=0.3,
+                stream=True,
+            )
+
+            summary = ""
+            async for token in stream:
+                summary += token
+                yield format_sse({"text": token}, event="token")
+
+        except Exception as e:
+            yield format_sse({"detail": f"Search failed: {str(e)}"}, event="error")
+            return
+
+        # search() returns [] on errors, which must not be cached
+        if results:
+            await summary_cache.set(key, {"results": results, "summary": summary})
+        yield format_sse({"summary": summary}, event="done")
+
+    return StreamingResponse(
+        _event_stream(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
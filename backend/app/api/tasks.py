@@ -1,15 +1,69 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List, Optional
-from datetime import datetime
-from app.core.database import get_db
+from sqlalchemy import func, insert, or_, select, update
+from typing import Iterable, List, Optional
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
 from app.models.task import Task, TaskStatus
-from app.schemas.task import TaskCreate, TaskUpdate, TaskResponse
+from app.schemas.task import (
+    TaskCreate,
+    TaskUpdate,
+    TaskResponse,
+    TaskBulkUpdate,
+    TaskBulkComplete,
+    TaskBulkResponse,
+)
+from app.services.agenda_service import agenda_service
+from app.services.change_feed import change_feed, KIND_TASK, ACTION_CREATED, ACTION_UPDATED, ACTION_DELETED
+from app.services.reminder_scheduler import reminder_scheduler
+from app.services.task_recurrence_service import task_recurrence_service, utcnow
 
 router = APIRouter()
 
 
+def _validate_recurrence(is_recurring: Optional[bool], rule: Optional[str]) -> None:
+    """Raise 400 if a recurring task has an invalid cron expression"""
+    if not is_recurring or not rule:
+        return
+
+    try:
+        task_recurrence_service.validate(rule)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid recurrence rule: {str(e)}",
+        )
+
+
+def _check_bulk_size(count: int) -> None:
+    """Raise 400 if a bulk request is empty or too large"""
+    if not 0 < count <= settings.TASK_BULK_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Bulk requests take between 1 and {settings.TASK_BULK_MAX_SIZE} tasks",
+        )
+
+
+def _horizon() -> datetime:
+    return utcnow() + timedelta(days=settings.TASK_RECURRENCE_HORIZON_DAYS)
+
+
+async def _tasks_changed(created: Iterable[Task] = (), updated: Iterable[Task] = ()) -> None:
+    """Refresh reminders and agendas of committed tasks and publish the changes"""
+    changes = {}
+    for action, tasks in ((ACTION_CREATED, created), (ACTION_UPDATED, updated)):
+        for task in tasks:
+            await reminder_scheduler.task_changed(task)
+            changes.setdefault(task.user_id, []).append(
+                (KIND_TASK, action, task.id, TaskResponse.model_validate(task).model_dump(mode="json"))
+            )
+
+    for user_id, user_changes in changes.items():
+        await agenda_service.invalidate(user_id)
+        await change_feed.publish_many(user_id, user_changes)
+
+
 @router.post("/", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
 async def create_task(
     task_data: TaskCreate,
@@ -17,23 +71,153 @@ async def create_task(
     db: AsyncSession = Depends(get_db),
 ):
     """Create a new task"""
+    _validate_recurrence(task_data.is_recurring, task_data.recurrence_rule)
+
     task = Task(
         user_id=user_id,
         **task_data.model_dump(),
     )
 
     db.add(task)
+    await db.flush()
+    generated = await task_recurrence_service.generate(db, [task], _horizon())
     await db.commit()
-    await db.refresh(task)
+    await _tasks_changed(created=[task, *generated])
 
     return task
 
 
+@router.post("/bulk", response_model=List[TaskResponse], status_code=status.HTTP_201_CREATED)
+async def create_tasks(
+    tasks_data: List[TaskCreate],
+    user_id: int = 1,  # TODO: Get from auth
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Create many tasks in one transaction
+
+    Tasks are inserted with a single INSERT ... RETURNING. Instances of
+    recurring tasks are generated for the recurrence horizon in the same
+    transaction.
+    """
+    _check_bulk_size(len(tasks_data))
+    for task_data in tasks_data:
+        _validate_recurrence(task_data.is_recurring, task_data.recurrence_rule)
+
+    result = await db.scalars(
+        insert(Task).returning(Task),
+        [{"user_id": user_id, **task_data.model_dump()} for task_data in tasks_data],
+    )
+    tasks = list(result.all())
+    generated = await task_recurrence_service.generate(db, tasks, _horizon())
+    await db.commit()
+    await _tasks_changed(created=[*tasks, *generated])
+
+    return tasks
+
+
+@router.patch("/bulk", response_model=TaskBulkResponse)
+async def update_tasks(
+    bulk_data: TaskBulkUpdate,
+    user_id: int = 1,  # TODO: Get from auth
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Apply the same changes to many tasks in one UPDATE ... RETURNING
+
+    Recurring tasks moved to completed spawn their next instance, which is
+    returned in `created`.
+    """
+    ids = set(bulk_data.ids)
+    _check_bulk_size(len(ids))
+
+    update_data = bulk_data.changes.model_dump(exclude_unset=True)
+    if not update_data:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No changes given",
+        )
+    if "recurrence_rule" in update_data:
+        _validate_recurrence(True, update_data["recurrence_rule"])
+
+    completing = update_data.get("status") == TaskStatus.COMPLETED.value
+    if completing:
+        update_data["completed_at"] = func.now()
+
+    # Status before the update, to spawn only on transition to completed
+    previous = (
+        select(Task.id, Task.status.label("previous_status"))
+        .where(Task.id.in_(ids), Task.user_id == user_id)
+        .with_for_update()
+        .cte("previous")
+    )
+    result = await db.execute(
+        update(Task)
+        .where(Task.id == previous.c.id)
+        .values(**update_data)
+        .returning(Task, previous.c.previous_status)
+        .execution_options(synchronize_session=False)
+    )
+    rows = result.all()
+
+    if len(rows) != len(ids):
+        missing = sorted(ids - {task.id for task, _ in rows})
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Tasks not found: {missing}",
+        )
+
+    tasks = [task for task, _ in rows]
+    created = []
+    if completing:
+        created = await task_recurrence_service.spawn_next(
+            db, [task for task, previous_status in rows if previous_status != TaskStatus.COMPLETED]
+        )
+    await db.commit()
+    await _tasks_changed(created=created, updated=tasks)
+
+    return TaskBulkResponse(tasks=tasks, created=created)
+
+
+@router.post("/bulk/complete", response_model=TaskBulkResponse)
+async def complete_tasks(
+    bulk_data: TaskBulkComplete,
+    user_id: int = 1,  # TODO: Get from auth
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Mark many tasks as completed in one transaction
+
+    Tasks that are already completed are left unchanged and not returned.
+    Recurring tasks spawn their next instance, returned in `created`.
+    """
+    _check_bulk_size(len(set(bulk_data.ids)))
+
+    result = await db.scalars(
+        update(Task)
+        .where(
+            Task.id.in_(set(bulk_data.ids)),
+            Task.user_id == user_id,
+            or_(Task.status.is_(None), Task.status != TaskStatus.COMPLETED),
+        )
+        .values(status=TaskStatus.COMPLETED, completed_at=func.now())
+        .returning(Task)
+        .execution_options(synchronize_session=False)
+    )
+    tasks = list(result.all())
+    created = await task_recurrence_service.spawn_next(db, tasks)
+    await db.commit()
+    await _tasks_changed(created=created, updated=tasks)
+
+    return TaskBulkResponse(tasks=tasks, created=created)
+
+
 @router.get("/", response_model=List[TaskResponse])
 async def get_tasks(
     user_id: int = 1,  # TODO: Get from auth
     status_filter: Optional[str] = None,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get all tasks for a user"""
     query = select(Task).where(Task.user_id == user_id)
@@ -53,7 +237,7 @@ async def get_tasks(
 async def get_task(
     task_id: int,
     user_id: int = 1,  # TODO: Get from auth
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get a specific task"""
     result = await db.execute(
@@ -97,6 +281,7 @@ async def update_task(
 
     # Update fields
     update_data = task_data.model_dump(exclude_unset=True)
+    was_completed = task.status == TaskStatus.COMPLETED
 
     # Handle status change to completed
     if "status" in update_data and update_data["status"] == TaskStatus.COMPLETED.value:
@@ -104,9 +289,16 @@ async def update_task(
 
     for field, value in update_data.items():
         setattr(task, field, value)
+    _validate_recurrence(task.is_recurring, task.recurrence_rule)
+
+    # Completing a recurring task spawns its next instance
+    created = []
+    if task.status == TaskStatus.COMPLETED and not was_completed:
+        created = await task_recurrence_service.spawn_next(db, [task])
 
     await db.commit()
     await db.refresh(task)
+    await _tasks_changed(created=created, updated=[task])
 
     return task
 
@@ -134,5 +326,8 @@ async def delete_task(
 
     await db.delete(task)
     await db.commit()
+    reminder_scheduler.task_deleted(task_id)
+    await agenda_service.invalidate(user_id)
+    await change_feed.publish(user_id, KIND_TASK, ACTION_DELETED, task_id)
 
     return None
@@ -1,12 +1,16 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, status
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, UploadFile, File, Header, HTTPException, WebSocket, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
-import aiofiles
-import os
-from app.services.voice_service import VoiceService
+import asyncio
+import logging
+from app.services.audio_pipeline import AudioFormat, negotiate_format, transcode
+from app.services.voice_service import VoiceService, TranscriptionStream
+from app.services.voice_turn import VoiceTurn
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 voice_service = VoiceService()
 
@@ -15,60 +19,220 @@ class TextToSpeechRequest(BaseModel):
     text: str
     language: Optional[str] = None
     slow: bool = False
+    voice: Optional[str] = None
+    # Output encoding (mp3, opus, wav, pcm); negotiated from Accept when omitted
+    format: Optional[str] = None
+    bitrate: Optional[int] = None  # kbps
+    sample_rate: Optional[int] = None
 
 
 class SpeechToTextResponse(BaseModel):
     text: str
 
 
+def _output_format(
+    codec: Optional[str],
+    bitrate: Optional[int],
+    sample_rate: Optional[int],
+    accept: Optional[str],
+) -> AudioFormat:
+    """Resolve the requested output format, raising 400 if unsupported"""
+    try:
+        return negotiate_format(codec, bitrate, sample_rate, accept)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
 @router.post("/speech-to-text", response_model=SpeechToTextResponse)
 async def speech_to_text(
     audio: UploadFile = File(...),
     language: Optional[str] = None,
+    engine: Optional[str] = None,
 ):
     """Convert speech audio to text"""
 
-    # Save uploaded file temporarily
-    temp_file_path = os.path.join(settings.UPLOAD_DIR, f"temp_{audio.filename}")
+    content = await audio.read()
+    if len(content) > settings.MAX_UPLOAD_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File size exceeds maximum allowed size of {settings.MAX_UPLOAD_SIZE} bytes",
+        )
 
     try:
-        async with aiofiles.open(temp_file_path, 'wb') as f:
-            content = await audio.read()
-            await f.write(content)
-
         # Transcribe audio
-        text = await voice_service.speech_to_text(temp_file_path, language)
+        text = await voice_service.speech_to_text(content, language, engine)
 
         return SpeechToTextResponse(text=text)
 
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Speech recognition failed: {str(e)}",
         )
+
+
+async def _receive_audio(websocket: WebSocket, stream: TranscriptionStream) -> bool:
+    """
+    Feed binary audio frames to a transcription stream until a text message
+
+    Returns:
+        False if the client disconnected first
+    """
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return False
+        if message.get("bytes"):
+            stream.feed(message["bytes"])
+        elif message.get("text") is not None:
+            return True
+
+
+async def _send_events(websocket: WebSocket, events: asyncio.Queue, until: str):
+    """Send queued events (dicts as JSON, bytes as binary) up to one of type `until`"""
+    while True:
+        event = await events.get()
+        if isinstance(event, bytes):
+            await websocket.send_bytes(event)
+            continue
+
+        await websocket.send_json(event)
+        if event["type"] == until:
+            return
+
+
+@router.websocket("/speech-to-text/stream")
+async def speech_to_text_stream(
+    websocket: WebSocket,
+    language: Optional[str] = None,
+    sample_rate: int = 16000,
+    engine: Optional[str] = None,
+):
+    """
+    Transcribe speech while it is being captured
+
+    The client sends binary frames of 16-bit little-endian mono PCM at
+    `sample_rate` (8000, 16000, 32000 or 48000 Hz) and a text message
+    "end" when it stops recording. The server answers with JSON
+    "partial" messages as speech segments are transcribed and a "final"
+    message with the whole transcript, then closes the connection.
+    """
+    await websocket.accept()
+
+    try:
+        stream = TranscriptionStream(voice_service, sample_rate, language, engine)
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
+        return
+
+    sender = asyncio.create_task(_send_events(websocket, stream.events, until="final"))
+
+    try:
+        if not await _receive_audio(websocket, stream):
+            return
+
+        await stream.finish()
+        await sender
+        await websocket.close()
     finally:
-        # Cleanup
-        if os.path.exists(temp_file_path):
-            voice_service.cleanup_temp_file(temp_file_path)
+        stream.cancel()
+        sender.cancel()
 
 
-@router.post("/text-to-speech")
-async def text_to_speech(request: TextToSpeechRequest):
-    """Convert text to speech audio"""
+@router.websocket("/turn")
+async def voice_turn(
+    websocket: WebSocket,
+    conversation_id: Optional[int] = None,
+    ai_provider: Optional[str] = None,
+    language: Optional[str] = None,
+    sample_rate: int = 16000,
+    engine: Optional[str] = None,
+    voice: Optional[str] = None,
+    format: Optional[str] = None,
+    bitrate: Optional[int] = None,
+    output_sample_rate: Optional[int] = None,
+    user_id: int = 1,  # TODO: Get from auth
+):
+    """
+    Spoken conversation turn: speech-to-text, chat and text-to-speech in one connection
+
+    Audio is sent as in /speech-to-text/stream. After "end", the server
+    streams the transcript, the AI reply as it is generated ("reply"
+    messages) and the spoken reply sentence by sentence ("audio" messages,
+    each followed by a binary frame in `format`, MP3 by default). A final
+    "done" message carries the conversation id and per-stage timings in
+    milliseconds.
+    """
+    await websocket.accept()
 
     try:
-        # Generate speech
-        audio_file_path = await voice_service.text_to_speech(
+        stream = TranscriptionStream(voice_service, sample_rate, language, engine)
+        output = AudioFormat(format or "mp3", bitrate, output_sample_rate)
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
+        return
+
+    turn = VoiceTurn(voice_service, stream, user_id, conversation_id, ai_provider, voice, output)
+    sender = asyncio.create_task(_send_events(websocket, stream.events, until="done"))
+    runner = None
+
+    try:
+        if not await _receive_audio(websocket, stream):
+            return
+
+        runner = asyncio.create_task(turn.run())
+        await sender
+        await websocket.close()
+    finally:
+        stream.cancel()
+        sender.cancel()
+        if runner is not None:
+            runner.cancel()
+
+
+async def _speech_response(
+    request: TextToSpeechRequest,
+    if_none_match: Optional[str],
+    accept: Optional[str],
+):
+    """Serve synthesized speech from the TTS cache with an ETag"""
+    output = _output_format(request.format, request.bitrate, request.sample_rate, accept)
+    etag = f'"{voice_service.speech_key(request.text, request.language, request.slow, request.voice, output)}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={settings.TTS_HTTP_MAX_AGE}"}
+    if request.format is None:
+        headers["Vary"] = "Accept"
+
+    # The ETag is derived from the request, so a match needs no synthesis
+    if if_none_match and etag in if_none_match:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    try:
+        # Generate speech (or reuse the cached file)
+        audio = await voice_service.text_to_speech_cached(
             request.text,
             request.language,
             request.slow,
+            request.voice,
+            output,
         )
 
         # Return audio file
         return FileResponse(
-            audio_file_path,
-            media_type="audio/mpeg",
-            filename="speech.mp3",
+            audio.path,
+            media_type=output.media_type,
+            filename=f"speech.{output.extension}",
+            headers=headers,
         )
 
     except Exception as e:
@@ -78,19 +242,116 @@ async def text_to_speech(request: TextToSpeechRequest):
         )
 
 
+@router.post("/text-to-speech")
+async def text_to_speech(
+    request: TextToSpeechRequest,
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
+):
+    """
+    Convert text to speech audio
+
+    The output is MP3 unless `format` (mp3, opus, wav, pcm) or the Accept
+    header asks for another encoding; `bitrate` and `sample_rate` shrink
+    it further.
+    """
+    return await _speech_response(request, if_none_match, accept)
+
+
+@router.get("/text-to-speech")
+async def get_text_to_speech(
+    text: str,
+    language: Optional[str] = None,
+    slow: bool = False,
+    voice: Optional[str] = None,
+    format: Optional[str] = None,
+    bitrate: Optional[int] = None,
+    sample_rate: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
+):
+    """Convert text to speech audio (cacheable by browsers, e.g. as an audio src)"""
+    return await _speech_response(
+        TextToSpeechRequest(
+            text=text,
+            language=language,
+            slow=slow,
+            voice=voice,
+            format=format,
+            bitrate=bitrate,
+            sample_rate=sample_rate,
+        ),
+        if_none_match,
+        accept,
+    )
+
+
+@router.post("/text-to-speech/stream")
+async def text_to_speech_stream(
+    request: TextToSpeechRequest,
+    accept: Optional[str] = Header(None),
+):
+    """
+    Convert long text to speech as a chunked audio stream
+
+    Sentences are synthesized in parallel and sent in order, so playback
+    starts after the first sentence instead of the whole text. Formats
+    other than MP3 are transcoded on the fly.
+    """
+    if not request.text.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Text is empty",
+        )
+
+    output = _output_format(request.format, request.bitrate, request.sample_rate, accept)
+
+    async def _audio_stream():
+        try:
+            async for chunk in voice_service.text_to_speech_stream(
+                request.text,
+                request.language,
+                request.slow,
+                request.voice,
+                output,
+            ):
+                yield chunk
+        except Exception as e:
+            # Headers are already sent; end the stream early
+            logger.warning("Streaming text-to-speech failed: %s", e)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if request.format is None:
+        headers["Vary"] = "Accept"
+
+    return StreamingResponse(
+        _audio_stream(),
+        media_type=output.media_type,
+        headers=headers,
+    )
+
+
 @router.post("/record")
-async def record_audio(duration: int = 5):
-    """Record audio from microphone"""
+async def record_audio(
+    duration: int = 5,
+    format: Optional[str] = None,
+    bitrate: Optional[int] = None,
+    sample_rate: Optional[int] = None,
+):
+    """Record audio from microphone (WAV unless another format is requested)"""
+    output = _output_format(format or "wav", bitrate, sample_rate, None)
 
     try:
         # Record audio
-        audio_file_path = await voice_service.record_audio(duration)
+        audio = await voice_service.record_audio(duration)
+        if output != AudioFormat("wav"):
+            audio = await transcode(audio, output, "wav")
 
         # Return audio file
-        return FileResponse(
-            audio_file_path,
-            media_type="audio/wav",
-            filename="recording.wav",
+        return Response(
+            audio,
+            media_type=output.media_type,
+            headers={"Content-Disposition": f'attachment; filename="recording.{output.extension}"'},
         )
 
     except Exception as e:
@@ -0,0 +1,242 @@
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from app.core.redis import get_redis, mark_redis_unavailable, REDIS_ERRORS
+
+MISSING = object()
+
+
+def make_key(*parts: Any) -> str:
+    """Build a compact cache key from arbitrary parts"""
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """In-process LRU cache with per-entry TTL"""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[Optional[float], Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Get a value, or default if missing or expired"""
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entry if full"""
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        """Remove a value"""
+        self._data.pop(key, None)
+
+    def clear(self):
+        """Remove all values"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TwoLevelCache:
+    """
+    JSON value cache with an in-process LRU in front of Redis
+
+    Values must be JSON serializable. Redis errors degrade to the local
+    LRU only. get_or_compute() makes sure a hot key is computed once per
+    process (single flight) and, through a short Redis lock, once across
+    workers.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: float,
+        local_ttl: Optional[float] = None,
+        maxsize: int = 1024,
+        lock_timeout: float = 30.0,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local = LRUCache(maxsize=maxsize, ttl=local_ttl or ttl)
+        self.lock_timeout = lock_timeout
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _redis_key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    async def get(self, key: str, default: Any = MISSING) -> Any:
+        """Get a value from the local LRU, falling back to Redis"""
+        value = self.local.get(key)
+        if value is not MISSING:
+            return value
+
+        redis = get_redis()
+        if redis is None:
+            return default
+
+        try:
+            raw = await redis.get(self._redis_key(key))
+        except REDIS_ERRORS as e:
+            mark_redis_unavailable(e)
+            return default
+
+        if raw is None:
+            return default
+
+        value = json.loads(raw)
+        self.local.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a value in both levels"""
+        ttl = ttl or self.ttl
+        self.local.set(key, value, min(ttl, self.local.ttl or ttl))
+
+        redis = get_redis()
+        if redis is None:
+            return
+
+        try:
+            await redis.set(
+                self._redis_key(key),
+                json.dumps(value, default=str),
+                px=int(ttl * 1000),
+            )
+        except REDIS_ERRORS as e:
+            mark_redis_unavailable(e)
+
+    async def delete(self, key: str):
+        """Remove a value from both levels"""
+        self.local.delete(key)
+
+        redis = get_redis()
+        if redis is None:
+            return
+
+        try:
+            await redis.delete(self._redis_key(key))
+        except REDIS_ERRORS as e:
+            mark_redis_unavailable(e)
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+        cacheable: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        Get a cached value or compute and store it
+
+        Concurrent callers for the same key within this process share a
+        single computation. Exceptions from compute are propagated to all
+        waiters and nothing is cached; neither is a value for which
+        `cacheable` returns False.
+        """
+        value = await self.get(key)
+        if value is not MISSING:
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+
+        try:
+            value = await self._compute_with_lock(key, compute, ttl, cacheable)
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else is waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _compute_with_lock(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: Optional[float],
+        cacheable: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """Compute a value while holding a short-lived Redis lock"""
+        redis = get_redis()
+        lock_key = self._redis_key(key) + ":lock"
+        token = uuid.uuid4().hex
+        locked = False
+
+        if redis is not None:
+            try:
+                locked = await redis.set(
+                    lock_key, token, nx=True, px=int(self.lock_timeout * 1000)
+                )
+                if not locked:
+                    # Another worker is computing; wait for its result
+                    value = await self._wait_for_value(key)
+                    if value is not MISSING:
+                        return value
+            except REDIS_ERRORS as e:
+                mark_redis_unavailable(e)
+
+        try:
+            value = await compute()
+            if cacheable is None or cacheable(value):
+                await self.set(key, value, ttl)
+            return value
+        finally:
+            if locked:
+                await self._release_lock(redis, lock_key, token)
+
+    async def _wait_for_value(self, key: str) -> Any:
+        """Poll Redis for a value another worker is computing"""
+        deadline = time.monotonic() + self.lock_timeout
+        delay = 0.05
+
+        while time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+            value = await self.get(key)
+            if value is not MISSING:
+                return value
+            delay = min(delay * 2, 1.0)
+
+        return MISSING
+
+    async def _release_lock(self, redis, lock_key: str, token: str):
+        """Release the lock only if we still own it"""
+        script = (
+            "if redis.call('get', KEYS[1]) == ARGV[1] then "
+            "return redis.call('del', KEYS[1]) else return 0 end"
+        )
+        try:
+            await redis.eval(script, 1, lock_key, token)
+        except REDIS_ERRORS as e:
+            mark_redis_unavailable(e)
@@ -1,20 +1,97 @@
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.core.metrics import DB_POOL_CHECKOUT, DB_QUERY_DURATION
+from app.core.tracing import tracer, record_error
+from opentelemetry.trace import SpanKind
+
+
+def _async_url(url: str) -> str:
+    # Convert postgresql:// to postgresql+asyncpg://
+    return url.replace("postgresql://", "postgresql+asyncpg://")
+
+
+SQLALCHEMY_DATABASE_URL = _async_url(settings.DATABASE_URL)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Connection pool that records how long checkouts wait"""
+
+    metrics_name = "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT.labels(self.metrics_name).observe(time.perf_counter() - start)
+
+
+def _statement_type(statement: str) -> str:
+    # SELECT, INSERT, ...: bounded label and span name
+    return statement.lstrip().split(None, 1)[0].upper()[:16]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_span = tracer.start_span(
+        f"db {_statement_type(statement)}",
+        kind=SpanKind.CLIENT,
+        attributes={"db.system": "postgresql", "db.statement": statement[:2000]},
+    )
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_start
+    DB_QUERY_DURATION.labels(_statement_type(statement)).observe(elapsed)
+    context._query_span.end()
+
+
+def _handle_error(exception_context):
+    span = getattr(exception_context.execution_context, "_query_span", None)
+    if span is not None and span.is_recording():
+        record_error(span, exception_context.original_exception)
+        span.end()
+
+
+def create_engine_for(url: str, name: str) -> AsyncEngine:
+    """
+    Create an instrumented async engine with the DB_POOL_* settings
+
+    Args:
+        url: Database URL
+        name: Pool name used in metrics (primary, replica)
+    """
+    # A subclass per pool keeps the name when the pool is recreated
+    pool_class = type(f"{name.title()}QueuePool", (InstrumentedQueuePool,), {"metrics_name": name})
+    engine = create_async_engine(
+        _async_url(url),
+        echo=settings.DB_ECHO,
+        future=True,
+        poolclass=pool_class,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+    )
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
+    return engine
 
-# Convert postgresql:// to postgresql+asyncpg://
-SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL.replace(
-    "postgresql://", "postgresql+asyncpg://"
-)
 
 # Async engine
-engine = create_async_engine(
-    SQLALCHEMY_DATABASE_URL,
-    echo=settings.DEBUG,
-    future=True
-)
+engine = create_engine_for(settings.DATABASE_URL, "primary")
+
+# Engine for read-only sessions: a replica if configured, else the primary
+read_engine = create_engine_for(settings.DATABASE_READ_URL, "replica") if settings.DATABASE_READ_URL else engine
 
 # Session factory
 AsyncSessionLocal = sessionmaker(
@@ -25,6 +102,15 @@ AsyncSessionLocal = sessionmaker(
     autoflush=False,
 )
 
+# Session factory for reads (see get_read_db)
+ReadSessionLocal = sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+)
+
 # Base class for models
 Base = declarative_base()
 
@@ -42,7 +128,13 @@ async def get_db():
             await session.close()
 
 
-async def init_db():
-    """Initialize database tables"""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+async def get_read_db():
+    """
+    Dependency for getting a read-only database session
+
+    Never commits: the transaction is rolled back when the session closes.
+    With DATABASE_READ_URL set it reads from the replica, which may lag
+    behind writes that were just made.
+    """
+    async with ReadSessionLocal() as session:
+        yield session
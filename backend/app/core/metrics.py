@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from app.core.config import settings
+
+# Multiprocess mode must be configured before prometheus_client is imported
+if settings.PROMETHEUS_MULTIPROC_DIR:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.PROMETHEUS_MULTIPROC_DIR)
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+from starlette.routing import Match  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+# Latency buckets in seconds, from cache hits to slow AI calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+# HTTP
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests being served",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+
+# AI providers
+AI_REQUESTS = Counter("ai_requests_total", "AI chat requests", ["provider", "stream"])
+AI_ERRORS = Counter("ai_errors_total", "Failed AI chat requests", ["provider", "stream"])
+AI_DURATION = Histogram(
+    "ai_request_duration_seconds",
+    "AI chat latency until the full reply",
+    ["provider", "stream"],
+    buckets=LATENCY_BUCKETS,
+)
+AI_TIME_TO_FIRST_TOKEN = Histogram(
+    "ai_time_to_first_token_seconds",
+    "Time until the first streamed chunk of an AI reply",
+    ["provider"],
+    buckets=LATENCY_BUCKETS,
+)
+AI_TOKENS = Counter("ai_output_tokens_total", "Estimated output tokens of AI replies", ["provider"])
+AI_TOKENS_PER_SECOND = Histogram(
+    "ai_output_tokens_per_second",
+    "Estimated output tokens per second of streamed AI replies",
+    ["provider"],
+    buckets=(1, 5, 10, 20, 40, 60, 80, 100, 150, 200, 400),
+)
+
+# Database
+DB_POOL_CHECKOUT = Histogram(
+    "db_pool_checkout_seconds",
+    "Time to get a connection from the pool, including waiting and connecting",
+    ["pool"],
+    buckets=DB_BUCKETS,
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Database statement latency by statement type",
+    ["statement"],
+    buckets=DB_BUCKETS,
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the pool",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_connections",
+    "Connections held by the pool, idle or checked out",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+
+# Thread pool used by asyncio.to_thread()
+EXECUTOR_QUEUE_DEPTH = Gauge(
+    "executor_queue_depth",
+    "Calls waiting for a worker thread in the default executor",
+    multiprocess_mode="livesum",
+)
+EXECUTOR_THREADS = Gauge(
+    "executor_threads",
+    "Worker threads started by the default executor",
+    multiprocess_mode="livesum",
+)
+
+# Rate limiting
+RATE_LIMITED = Counter(
+    "rate_limited_requests_total",
+    "Requests rejected by the rate limiter",
+    ["route", "tier"],
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (providers report usage differently, if at all)"""
+    return max(1, len(text) // 4) if text else 0
+
+
+def render() -> bytes:
+    """Metrics in the Prometheus text format, aggregated over workers in multiprocess mode"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead():
+    """Drop this worker's live gauges (multiprocess mode, on shutdown)"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def route_template(app, scope) -> str:
+    """Path template of the route matching a request, to keep label cardinality bounded"""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
+class PrometheusMiddleware:
+    """
+    ASGI middleware recording latency and in-flight requests per route
+
+    Latency runs until the response body is complete, so streamed
+    responses count their full duration. WebSockets are not measured.
+    """
+
+    def __init__(self, app, root_app=None):
+        self.app = app
+        self.root_app = root_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(self.root_app, scope)
+        status_code = 500
+
+        async def _send(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method, route)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            in_progress.dec()
+            HTTP_REQUEST_DURATION.labels(method, route, str(status_code)).observe(time.perf_counter() - start)
+
+
+async def run_sampler(executor: Optional[ThreadPoolExecutor] = None):
+    """Sample pool and executor gauges every METRICS_SAMPLE_INTERVAL (runs in lifespan)"""
+    from app.core.database import engine, read_engine
+
+    engines = {engine.pool.metrics_name: engine, read_engine.pool.metrics_name: read_engine}
+    while True:
+        try:
+            for name, db_engine in engines.items():
+                pool = db_engine.pool
+                DB_POOL_CHECKED_OUT.labels(name).set(pool.checkedout())
+                DB_POOL_SIZE.labels(name).set(pool.checkedout() + pool.checkedin())
+            if executor is not None:
+                EXECUTOR_QUEUE_DEPTH.set(executor._work_queue.qsize())
+                EXECUTOR_THREADS.set(len(executor._threads))
+        except Exception:
+            logger.exception("Metrics sampling failed")
+
+        await asyncio.sleep(settings.METRICS_SAMPLE_INTERVAL)
@@ -0,0 +1,293 @@
+import asyncio
+import contextvars
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.core.metrics import route_template
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import HTMLRenderer, SpeedscopeRenderer
+    from pyinstrument.session import Session
+except ImportError:  # Optional: profiling is unavailable without it
+    Profiler = None
+
+logger = logging.getLogger(__name__)
+
+# Profile formats and their file extensions
+FORMATS = {"html": "html", "speedscope": "speedscope.json"}
+
+PROFILE_NAME = re.compile(r"^[\w.-]+$")
+
+
+class RequestProfile:
+    """Profiler sessions of one request: its event loop task and its worker threads"""
+
+    def __init__(self):
+        self.sessions: List["Session"] = []
+        self._lock = threading.Lock()
+
+    def add(self, session: Optional["Session"]):
+        if session is not None:
+            with self._lock:
+                self.sessions.append(session)
+
+    def combined(self) -> Optional["Session"]:
+        combined = None
+        for session in self.sessions:
+            combined = session if combined is None else Session.combine(combined, session)
+        return combined
+
+
+# Profile of the request being handled; copied into asyncio.to_thread() calls
+_current: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar("profile", default=None)
+
+
+def profiling_available() -> bool:
+    return settings.PROFILING_ENABLED and Profiler is not None
+
+
+def check_token(token: Optional[str]) -> bool:
+    """Whether a token grants access to profiling (never without PROFILING_TOKEN)"""
+    return bool(settings.PROFILING_TOKEN and token) and hmac.compare_digest(
+        token.encode(), settings.PROFILING_TOKEN.encode()
+    )
+
+
+class ProfilingThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    Default executor that profiles work submitted by a profiled request
+
+    submit() runs in the caller's context, so asyncio.to_thread() calls
+    made while a request is profiled get a profiler in the worker thread
+    and their samples (e.g. PDF parsing or OCR) join the request's profile.
+    """
+
+    def submit(self, fn, /, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return super().submit(fn, *args, **kwargs)
+
+        def _profiled():
+            profiler = Profiler(interval=settings.PROFILING_INTERVAL, async_mode="disabled")
+            profiler.start()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.add(profiler.stop())
+
+        return super().submit(_profiled)
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^\w-]+", "_", text).strip("_") or "root"
+
+
+def _folded_stacks(session: "Session") -> Counter:
+    """Self time per call stack in microseconds, in the folded format of flamegraph tools"""
+    stacks: Counter = Counter()
+
+    def _walk(frame, path: str):
+        name = frame.function if frame.is_synthetic else f"{frame.function} ({frame.file_path_short}:{frame.line_no})"
+        path = f"{path};{name}" if path else name
+        self_time = frame.time - sum(child.time for child in frame.children)
+        if self_time > 0:
+            stacks[path] += int(self_time * 1_000_000)
+        for child in frame.children:
+            _walk(child, path)
+
+    root = session.root_frame()
+    if root is not None:
+        _walk(root, "")
+    return stacks
+
+
+class ProfileStore:
+    """
+    Stored request profiles and per-route flamegraphs in PROFILING_DIR
+
+    Files are shared by all workers: profiles are one file each (the
+    newest PROFILING_MAX_FILES are kept), and flamegraph samples are
+    appended to one folded-stack file per route and summed when read.
+    """
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or settings.PROFILING_DIR
+
+    @property
+    def flamegraph_dir(self) -> str:
+        return os.path.join(self.directory, "flamegraphs")
+
+    def save(self, name: str, session: "Session", output: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        renderer = HTMLRenderer() if output == "html" else SpeedscopeRenderer()
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(renderer.render(session))
+        self._prune()
+        return path
+
+    def _prune(self):
+        profiles = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.is_file()),
+            key=lambda entry: entry.stat().st_mtime,
+            reverse=True,
+        )
+        for entry in profiles[settings.PROFILING_MAX_FILES:]:
+            try:
+                os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def list_profiles(self) -> List[Dict]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            (
+                {"name": entry.name, "size": entry.stat().st_size, "created_at": entry.stat().st_mtime}
+                for entry in os.scandir(self.directory)
+                if entry.is_file()
+            ),
+            key=lambda profile: profile["created_at"],
+            reverse=True,
+        )
+
+    def profile_path(self, name: str) -> Optional[str]:
+        if not PROFILE_NAME.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def add_sample(self, route: str, session: "Session"):
+        """Append a sampled request's stacks to its route's flamegraph"""
+        os.makedirs(self.flamegraph_dir, exist_ok=True)
+        lines = "".join(f"{stack} {count}\n" for stack, count in _folded_stacks(session).items())
+        path = os.path.join(self.flamegraph_dir, f"{_slug(route)}.folded")
+        # One append per sample; O_APPEND keeps concurrent workers' lines intact
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def list_flamegraphs(self) -> List[Dict]:
+        if not os.path.isdir(self.flamegraph_dir):
+            return []
+        return [
+            {"name": entry.name[:-len(".folded")], "size": entry.stat().st_size}
+            for entry in os.scandir(self.flamegraph_dir)
+            if entry.name.endswith(".folded")
+        ]
+
+    def flamegraph(self, name: str) -> Optional[str]:
+        """Summed folded stacks of a route (for flamegraph.pl, speedscope, ...)"""
+        if not PROFILE_NAME.match(name):
+            return None
+        path = os.path.join(self.flamegraph_dir, f"{name}.folded")
+        if not os.path.isfile(path):
+            return None
+
+        stacks: Counter = Counter()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                stack, _, count = line.rstrip("\n").rpartition(" ")
+                if stack and count.isdigit():
+                    stacks[stack] += int(count)
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+profile_store = ProfileStore()
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware for on-demand and sampled profiling
+
+    A request with an "X-Profile: html|speedscope" header (or a
+    ?profile=html|speedscope query flag) and a valid X-Profile-Token runs
+    under pyinstrument. The profile is stored in PROFILING_DIR and its
+    name is returned in the X-Profile-Id response header. Without a valid
+    token such requests get 403.
+
+    With PROFILING_SAMPLE_RATE > 0, that fraction of all other requests
+    is profiled too and added to a flamegraph of its route.
+    """
+
+    def __init__(self, app, root_app=None):
+        self.app = app
+        self.root_app = root_app
+
+    def _requested_format(self, scope, headers: Dict[str, str]) -> Optional[str]:
+        output = headers.get("x-profile")
+        if output is None:
+            for pair in scope.get("query_string", b"").decode("latin-1").split("&"):
+                key, _, value = pair.partition("=")
+                if key == "profile":
+                    output = value or "html"
+        return output
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profiling_available():
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        output = self._requested_format(scope, headers)
+        sampled = output is None and random.random() < settings.PROFILING_SAMPLE_RATE
+
+        if output is None and not sampled:
+            await self.app(scope, receive, send)
+            return
+
+        if output is not None:
+            if not check_token(headers.get("x-profile-token")):
+                await self._reply(send, 403, {"detail": "Profiling requires a valid X-Profile-Token"})
+                return
+            if output not in FORMATS:
+                await self._reply(send, 400, {"detail": f"Profile format must be one of {', '.join(FORMATS)}"})
+                return
+
+        route = f"{scope['method']} {route_template(self.root_app, scope)}"
+        name = None
+        if output is not None:
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{_slug(route)}-{uuid.uuid4().hex[:8]}.{FORMATS[output]}"
+
+        async def _send(message):
+            if output is not None and message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", name.encode())]
+            await send(message)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        profiler = Profiler(interval=settings.PROFILING_INTERVAL, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            profile.add(profiler.stop())
+            _current.reset(token)
+            try:
+                session = profile.combined()
+                if output is not None:
+                    await asyncio.to_thread(profile_store.save, name, session, output)
+                else:
+                    await asyncio.to_thread(profile_store.add_sample, route, session)
+            except Exception:
+                logger.exception("Could not store profile of %s", route)
+
+    @staticmethod
+    async def _reply(send, status_code: int, body: Dict):
+        data = json.dumps(body).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(data)).encode())],
+        })
+        await send({"type": "http.response.body", "body": data})
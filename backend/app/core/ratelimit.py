@@ -0,0 +1,256 @@
+import json
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from app.core.cache import LRUCache, MISSING
+from app.core.config import settings
+from app.core.database import ReadSessionLocal
+from app.core.metrics import RATE_LIMITED, route_template
+from app.core.redis import get_redis, mark_redis_unavailable, REDIS_ERRORS
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIER = "default"
+ANY_ROUTE = "*"
+UNLIMITED = "unlimited"
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Never limited, so probes and scrapers keep working
+EXEMPT_PATHS = {"/", "/health", "/metrics"}
+
+# GCRA: KEYS[1] holds the bucket's theoretical arrival time (TAT) in
+# milliseconds of the Redis clock. ARGV: emission interval and period in
+# milliseconds. Returns allowed, remaining, retry after and reset in ms;
+# the 0.001 absorbs rounding of fractional intervals in `remaining`.
+GCRA_SCRIPT = """
+local clock = redis.call('TIME')
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local tat = math.max(tonumber(redis.call('GET', KEYS[1]) or now), now)
+local new_tat = tat + interval
+if new_tat - now > period then
+    return {0, 0, math.ceil(new_tat - period - now), math.ceil(tat - now)}
+end
+redis.call('SET', KEYS[1], string.format('%.3f', new_tat), 'PX', math.ceil(new_tat - now))
+return {1, math.floor((period - (new_tat - now)) / interval + 0.001), 0, math.ceil(new_tat - now)}
+"""
+
+
+@dataclass(frozen=True)
+class Rate:
+    """A limit of `limit` requests per `period` seconds"""
+    limit: int
+    period: int
+
+    @property
+    def interval_ms(self) -> float:
+        return self.period * 1000 / self.limit
+
+    @property
+    def policy(self) -> str:
+        return f"{self.limit};w={self.period}"
+
+
+@dataclass
+class Decision:
+    """Outcome of a rate limit check; times in seconds"""
+    allowed: bool
+    rate: Rate
+    remaining: int
+    retry_after: float
+    reset: float
+
+    def headers(self) -> List[Tuple[bytes, bytes]]:
+        """RateLimit-* headers (IETF draft), and Retry-After when rejected"""
+        headers = [
+            (b"ratelimit-limit", str(self.rate.limit).encode()),
+            (b"ratelimit-remaining", str(self.remaining).encode()),
+            (b"ratelimit-reset", str(math.ceil(self.reset)).encode()),
+            (b"ratelimit-policy", self.rate.policy.encode()),
+        ]
+        if not self.allowed:
+            headers.append((b"retry-after", str(max(1, math.ceil(self.retry_after))).encode()))
+        return headers
+
+
+def parse_rate(text: str) -> Optional[Rate]:
+    """
+    Parse a rate such as "20/minute"
+
+    Returns:
+        The rate, or None for "unlimited"
+
+    Raises:
+        ValueError: If the rate is malformed
+    """
+    if text.strip() == UNLIMITED:
+        return None
+    count, _, period = text.partition("/")
+    if not count.strip().isdigit() or int(count) <= 0 or period.strip() not in PERIODS:
+        raise ValueError(f"Invalid rate limit {text!r}, expected e.g. '20/minute' or 'unlimited'")
+    return Rate(int(count), PERIODS[period.strip()])
+
+
+def parse_rules(rules: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, Optional[Rate]]]:
+    """Parse RATE_LIMITS; a tier without a route's limit inherits the default tier's"""
+    parsed = {tier: {route: parse_rate(rate) for route, rate in routes.items()} for tier, routes in rules.items()}
+    defaults = parsed.setdefault(DEFAULT_TIER, {})
+    for tier, routes in parsed.items():
+        if tier != DEFAULT_TIER:
+            parsed[tier] = {**{r: v for r, v in defaults.items() if r != ANY_ROUTE}, **routes}
+            parsed[tier].setdefault(ANY_ROUTE, defaults.get(ANY_ROUTE))
+    return parsed
+
+
+class RateLimiter:
+    """
+    Per-client GCRA rate limiter
+
+    Each user or client address has one bucket per limited route and one
+    shared by all other routes. With the "redis" backend buckets live in Redis and are
+    shared by all workers: a check is one EVALSHA of a Lua script using
+    the Redis clock. Without Redis (or while it is unavailable) buckets
+    are kept in process, which limits per worker instead.
+    """
+
+    def __init__(self, rules: Dict[str, Dict[str, str]] = None):
+        self.rules = parse_rules(rules if rules is not None else settings.RATE_LIMITS)
+        self._tiers = LRUCache(maxsize=settings.RATE_LIMIT_LOCAL_KEYS, ttl=settings.RATE_LIMIT_TIER_TTL)
+        self._local = LRUCache(maxsize=settings.RATE_LIMIT_LOCAL_KEYS)
+        self._script = None
+
+    @property
+    def uses_redis(self) -> bool:
+        return settings.RATE_LIMIT_BACKEND == "redis"
+
+    def rule(self, tier: str, route: str) -> Tuple[str, Optional[Rate]]:
+        """Bucket name and rate of a route for a tier"""
+        routes = self.rules.get(tier) or self.rules[DEFAULT_TIER]
+        if route in routes:
+            return route, routes[route]
+        return ANY_ROUTE, routes.get(ANY_ROUTE)
+
+    async def tier(self, user_id: int) -> str:
+        """A user's tier from preferences["rate_limit_tier"], cached for RATE_LIMIT_TIER_TTL"""
+        tier = self._tiers.get(user_id)
+        if tier is not MISSING:
+            return tier
+
+        try:
+            async with ReadSessionLocal() as db:
+                preferences = await db.scalar(select(User.preferences).where(User.id == user_id))
+        except (SQLAlchemyError, OSError) as e:
+            # Not cached: the tier is looked up again once the database is back
+            logger.warning("Could not look up the rate limit tier of user %s: %s", user_id, e)
+            return DEFAULT_TIER
+        tier = (preferences or {}).get("rate_limit_tier", DEFAULT_TIER)
+        if tier not in self.rules:
+            tier = DEFAULT_TIER
+        self._tiers.set(user_id, tier)
+        return tier
+
+    async def hit(self, key: str, rate: Rate) -> Decision:
+        """Count a request against a bucket"""
+        if self.uses_redis:
+            redis = get_redis()
+            if redis is not None:
+                if self._script is None:
+                    self._script = redis.register_script(GCRA_SCRIPT)
+                try:
+                    allowed, remaining, retry_after, reset = await self._script(
+                        keys=[f"ratelimit:{key}"],
+                        args=[rate.interval_ms, rate.period * 1000],
+                    )
+                    return Decision(bool(allowed), rate, int(remaining), retry_after / 1000, reset / 1000)
+                except REDIS_ERRORS as e:
+                    mark_redis_unavailable(e)
+
+        return self._hit_local(key, rate)
+
+    def _hit_local(self, key: str, rate: Rate) -> Decision:
+        """The GCRA of GCRA_SCRIPT on an in-process bucket"""
+        now = time.monotonic() * 1000
+        period = rate.period * 1000
+        tat = max(self._local.get(key, now), now)
+        new_tat = tat + rate.interval_ms
+        if new_tat - now > period:
+            return Decision(False, rate, 0, (new_tat - period - now) / 1000, (tat - now) / 1000)
+
+        self._local.set(key, new_tat, ttl=(new_tat - now) / 1000)
+        remaining = math.floor((period - (new_tat - now)) / rate.interval_ms + 0.001)
+        return Decision(True, rate, remaining, 0, (new_tat - now) / 1000)
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware applying RATE_LIMITS per client and route
+
+    An authenticated user (scope["user"] with an `id`, set by an
+    authentication middleware in front of this one) is limited with its
+    tier. Any other
+    request is limited per client address with the default tier: the
+    `user_id` query parameter is chosen by the client, so it neither
+    selects a bucket nor triggers a tier lookup. Allowed responses carry
+    RateLimit-* headers; rejected requests get 429 with Retry-After.
+    """
+
+    def __init__(self, app, root_app=None, limiter: RateLimiter = None):
+        self.app = app
+        self.root_app = root_app
+        self.limiter = limiter or RateLimiter()
+
+    @staticmethod
+    def _user_id(scope) -> Optional[int]:
+        """Id of the authenticated user, if any"""
+        user = scope.get("user")
+        if user is None or not getattr(user, "is_authenticated", False):
+            return None
+        user_id = getattr(user, "id", None)
+        return user_id if isinstance(user_id, int) else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        user_id = self._user_id(scope)
+        if user_id is not None:
+            identity, tier = f"user:{user_id}", await self.limiter.tier(user_id)
+        else:
+            client = scope.get("client")
+            identity, tier = f"ip:{client[0] if client else 'unknown'}", DEFAULT_TIER
+
+        route = f"{scope['method']} {route_template(self.root_app, scope)}"
+        bucket, rate = self.limiter.rule(tier, route)
+        if rate is None:
+            await self.app(scope, receive, send)
+            return
+
+        decision = await self.limiter.hit(f"{identity}:{bucket}", rate)
+        if not decision.allowed:
+            RATE_LIMITED.labels(route, tier).inc()
+            body = json.dumps({"detail": "Rate limit exceeded"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    *decision.headers(),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + decision.headers()
+            await send(message)
+
+        await self.app(scope, receive, _send)
@@ -0,0 +1,51 @@
+import time
+import logging
+from typing import Optional
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[aioredis.Redis] = None
+_unavailable_until = 0.0
+
+
+def get_redis() -> Optional[aioredis.Redis]:
+    """
+    Get the shared async Redis client
+
+    Returns None while Redis is marked unavailable, so callers can fall
+    back to in-process state without paying a connect timeout per request.
+    """
+    global _client
+
+    if time.monotonic() < _unavailable_until:
+        return None
+
+    if _client is None:
+        _client = aioredis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+    return _client
+
+
+def mark_redis_unavailable(error: Exception):
+    """Back off from Redis for a while after a connection error"""
+    global _unavailable_until
+    if time.monotonic() >= _unavailable_until:
+        logger.warning("Redis unavailable, using in-process fallback: %s", error)
+    _unavailable_until = time.monotonic() + settings.REDIS_RETRY_INTERVAL
+
+
+async def close_redis():
+    """Close the shared Redis client"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+REDIS_ERRORS = (RedisError, OSError)
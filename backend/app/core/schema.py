@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import os
+from typing import Set, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.core.config import settings
+from app.core.database import engine
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Revision matching the schema create_all() built before migrations existed
+BASELINE_REVISION = "0001"
+
+
+def alembic_config():
+    """Alembic configuration of the backend, independent of the working directory"""
+    from alembic.config import Config
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    return config
+
+
+def migration_revisions() -> Tuple[Set[str], Set[str]]:
+    """
+    Revisions of the migration scripts
+
+    Returns:
+        (head revisions, all known revisions)
+    """
+    from alembic.script import ScriptDirectory
+
+    script = ScriptDirectory.from_config(alembic_config())
+    return set(script.get_heads()), {rev.revision for rev in script.walk_revisions()}
+
+
+async def current_revisions(conn: AsyncConnection) -> Set[str]:
+    """Revisions stamped in alembic_version; empty for an unversioned database"""
+    if await conn.scalar(text("SELECT to_regclass('alembic_version')")) is None:
+        return set()
+    result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+    return set(result.scalars())
+
+
+async def check_schema():
+    """
+    Compare the database's schema version with the migrations (on startup)
+
+    One query and no DDL, so any number of workers can start at once;
+    migrations are applied beforehand with `python -m app.migrate`. A
+    database ahead of the code (migrated for a newer release during a
+    rolling deploy) only logs a warning.
+
+    Raises:
+        RuntimeError: If the schema is behind and DB_SCHEMA_CHECK is "error"
+    """
+    if settings.DB_SCHEMA_CHECK == "off":
+        return
+
+    heads, known = await asyncio.to_thread(migration_revisions)
+    async with engine.connect() as conn:
+        current = await current_revisions(conn)
+
+    if current == heads:
+        return
+
+    if current and not current <= known:
+        logger.warning(
+            "Database schema %s is newer than this release (%s)",
+            ", ".join(sorted(current)),
+            ", ".join(sorted(heads)),
+        )
+        return
+
+    message = (
+        f"Database schema is at {', '.join(sorted(current)) or 'no revision'}, "
+        f"migrations are at {', '.join(sorted(heads))}; run `python -m app.migrate`"
+    )
+    if settings.DB_SCHEMA_CHECK == "warn":
+        logger.warning(message)
+        return
+    raise RuntimeError(message)
+
+
+def _run_alembic(sync_conn, command_name: str, revision: str):
+    from alembic import command
+
+    config = alembic_config()
+    # migrations/env.py runs on this connection instead of opening its own
+    config.attributes["connection"] = sync_conn
+    getattr(command, command_name)(config, revision)
+
+
+async def migrate(revision: str = "head", adopt: bool = False) -> Set[str]:
+    """
+    Upgrade the database to `revision`
+
+    Runs under a Postgres advisory lock, so concurrent deploy jobs apply
+    migrations one after the other instead of racing. A database created
+    by the former create_all() on startup has tables but no revision;
+    with `adopt=True` it is stamped at BASELINE_REVISION and then
+    upgraded like any other database.
+
+    Returns:
+        Revisions of the database after the upgrade
+
+    Raises:
+        RuntimeError: If the database has unversioned tables and adopt is False
+    """
+    async with engine.connect() as conn:
+        # Polled instead of pg_advisory_lock(): a transaction blocked on the
+        # lock would stall CREATE INDEX CONCURRENTLY of the migration holding it
+        while True:
+            locked = await conn.scalar(
+                text("SELECT pg_try_advisory_lock(:lock_id)"),
+                {"lock_id": settings.DB_MIGRATION_LOCK_ID},
+            )
+            # The lock is held by the session, across the migration's own transaction
+            await conn.commit()
+            if locked:
+                break
+            logger.info("Waiting for another migration to finish")
+            await asyncio.sleep(1)
+
+        try:
+            current = await current_revisions(conn)
+            unversioned = not current and await conn.scalar(text("SELECT to_regclass('users')")) is not None
+            await conn.rollback()
+
+            if unversioned:
+                if not adopt:
+                    raise RuntimeError(
+                        "Database has tables but no schema revision (created by create_all); "
+                        f"check that it matches revision {BASELINE_REVISION}, then run with --adopt"
+                    )
+                logger.info("Stamping unversioned database at %s", BASELINE_REVISION)
+                await conn.run_sync(_run_alembic, "stamp", BASELINE_REVISION)
+                await conn.commit()
+
+            await conn.run_sync(_run_alembic, "upgrade", revision)
+            await conn.commit()
+
+            return await current_revisions(conn)
+        finally:
+            await conn.rollback()
+            await conn.execute(
+                text("SELECT pg_advisory_unlock(:lock_id)"),
+                {"lock_id": settings.DB_MIGRATION_LOCK_ID},
+            )
+            await conn.commit()
@@ -0,0 +1,33 @@
+import json
+from typing import Any, Optional
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # Disable proxy buffering (nginx)
+}
+
+
+def format_sse(data: Any, event: Optional[str] = None, id: Optional[Any] = None) -> str:
+    """
+    Format a Server-Sent Events message
+
+    Args:
+        data: JSON serializable payload
+        event: Optional event name
+        id: Optional event id, used by clients to resume with Last-Event-ID
+
+    Returns:
+        Encoded SSE message
+    """
+    message = ""
+    if id is not None:
+        message += f"id: {id}\n"
+    if event:
+        message += f"event: {event}\n"
+    for line in json.dumps(data, default=str).splitlines():
+        message += f"data: {line}\n"
+    return message + "\n"
+
+
+# Comment line sent periodically so proxies keep idle streams open
+SSE_PING = ": ping\n\n"
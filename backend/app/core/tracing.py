@@ -0,0 +1,149 @@
+import logging
+import threading
+from typing import Optional, Sequence
+from opentelemetry import propagate, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SimpleSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from app.core.config import settings
+from app.core.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+tracer = trace.get_tracer("app")
+
+# Set when TRACING_EXPORTER is "memory", for tests to read finished spans
+memory_exporter: Optional[InMemorySpanExporter] = None
+_provider: Optional[TracerProvider] = None
+
+
+class FileSpanExporter(SpanExporter):
+    """Append finished spans to a file as JSON lines"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError:
+            logger.exception("Could not write spans to %s", self.path)
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+
+def _create_exporter(name: str) -> SpanExporter:
+    """
+    Build the span exporter selected by TRACING_EXPORTER
+
+    Raises:
+        ValueError: If the exporter is unknown
+    """
+    global memory_exporter
+
+    if name == "console":
+        return ConsoleSpanExporter()
+    if name == "file":
+        return FileSpanExporter(settings.TRACING_FILE_PATH)
+    if name == "memory":
+        memory_exporter = InMemorySpanExporter()
+        return memory_exporter
+    if name == "otlp":
+        # Optional: pip install opentelemetry-exporter-otlp-proto-http;
+        # the endpoint comes from OTEL_EXPORTER_OTLP_ENDPOINT
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        return OTLPSpanExporter()
+    raise ValueError(f"Unsupported tracing exporter: {name}")
+
+
+def setup_tracing():
+    """
+    Install the tracer provider and exporter (once per process)
+
+    With TRACING_EXPORTER=none the OpenTelemetry API stays a no-op.
+    """
+    global _provider
+
+    if _provider is not None or settings.TRACING_EXPORTER == "none":
+        return
+
+    exporter = _create_exporter(settings.TRACING_EXPORTER)
+    _provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.TRACING_SERVICE_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATIO)),
+    )
+    # Test collectors see spans as soon as they end
+    processor = SimpleSpanProcessor if settings.TRACING_EXPORTER == "memory" else BatchSpanProcessor
+    _provider.add_span_processor(processor(exporter))
+    trace.set_tracer_provider(_provider)
+
+
+def shutdown_tracing():
+    """Flush pending spans (on shutdown)"""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+def record_error(span: trace.Span, error: BaseException):
+    """Mark a span as failed"""
+    span.record_exception(error)
+    span.set_status(Status(StatusCode.ERROR, str(error)))
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware starting a server span per HTTP request
+
+    The span is named after the route template and continues a trace
+    from an incoming traceparent header. Spans created while handling
+    the request, including in asyncio.to_thread() workers (which copy the
+    context), become its children.
+    """
+
+    def __init__(self, app, root_app=None):
+        self.app = app
+        self.root_app = root_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in ("/metrics", "/health"):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        route = route_template(self.root_app, scope)
+
+        with tracer.start_as_current_span(
+            f"{scope['method']} {route}",
+            context=propagate.extract(headers),
+            kind=SpanKind.SERVER,
+            attributes={
+                "http.request.method": scope["method"],
+                "http.route": route,
+                "url.path": scope["path"],
+            },
+        ) as span:
+
+            async def _send(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_status(Status(StatusCode.ERROR))
+                await send(message)
+
+            await self.app(scope, receive, _send)
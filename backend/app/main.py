@@ -1,9 +1,50 @@
-from fastapi import FastAPI
+import asyncio
+import importlib
+from types import ModuleType
+from typing import Dict, List
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from app.core.config import settings
-from app.core.database import init_db
-from app.api import chat, voice, tasks, calendar, documents, search, users
+from app.core.schema import check_schema
+from app.core import metrics, profiling, ratelimit, tracing
+from app.core.redis import close_redis
+from app.services.recurrence_service import recurrence_service
+from app.services.reminder_scheduler import reminder_scheduler
+from app.services.task_recurrence_service import task_recurrence_service
+from app.services.agenda_service import agenda_service
+from app.services.temp_janitor import temp_janitor
+from app.services.change_feed import change_feed, KIND_TASK, ACTION_CREATED
+from app.schemas.task import TaskResponse
+
+# API routers by module name (app.api.<name>) and URL prefix. Only the
+# routers listed in API_ROUTERS are imported, so a node serving tasks and
+# calendar never loads the AI provider SDKs or the voice, document and
+# search libraries.
+ROUTERS = {
+    "users": "/api/v1/users",
+    "chat": "/api/v1/chat",
+    "voice": "/api/v1/voice",
+    "tasks": "/api/v1/tasks",
+    "calendar": "/api/v1/calendar",
+    "documents": "/api/v1/documents",
+    "search": "/api/v1/search",
+    "agenda": "/api/v1/agenda",
+    "changes": "/api/v1/changes",
+}
+
+
+async def _task_generated(task):
+    """Propagate a task instance created by the recurrence loop"""
+    await reminder_scheduler.task_changed(task)
+    await agenda_service.invalidate(task.user_id)
+    await change_feed.publish(
+        task.user_id,
+        KIND_TASK,
+        ACTION_CREATED,
+        task.id,
+        TaskResponse.model_validate(task).model_dump(mode="json"),
+    )
 
 
 @asynccontextmanager
@@ -11,11 +52,45 @@ async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup
     print("Starting up...")
-    await init_db()
-    print("Database initialized")
+    # Migrations are applied by `python -m app.migrate`, not by workers
+    await check_schema()
+    print("Database schema checked")
+
+    # Explicit default executor so its queue depth can be sampled and
+    # work of profiled requests is profiled in worker threads
+    executor = profiling.ProfilingThreadPoolExecutor(
+        max_workers=settings.THREAD_POOL_MAX_WORKERS or None,
+        thread_name_prefix="worker",
+    )
+    asyncio.get_running_loop().set_default_executor(executor)
+
+    background_tasks = [
+        asyncio.create_task(recurrence_service.run_refresh_loop()),
+        asyncio.create_task(
+            task_recurrence_service.run_generation_loop(on_created=_task_generated)
+        ),
+        asyncio.create_task(temp_janitor.run()),
+    ]
+    if settings.METRICS_ENABLED:
+        background_tasks.append(asyncio.create_task(metrics.run_sampler(executor)))
+    if settings.REMINDER_SCHEDULER_ENABLED:
+        background_tasks.append(asyncio.create_task(reminder_scheduler.run()))
+    if settings.AGENDA_PRECOMPUTE_ENABLED:
+        background_tasks.append(asyncio.create_task(agenda_service.run_precompute_loop()))
+    if settings.REMINDER_SCHEDULER_ENABLED and settings.TTS_PREWARM_ENABLED and "voice" in routers:
+        background_tasks.append(asyncio.create_task(routers["voice"].voice_service.run_prewarm_loop()))
     yield
     # Shutdown
     print("Shutting down...")
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await reminder_scheduler.close()
+    await change_feed.close()
+    await close_redis()
+    metrics.mark_process_dead()
+    tracing.shutdown_tracing()
 
 
 app = FastAPI(
@@ -24,6 +99,10 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Inside CORS, so 429 responses carry CORS headers too
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(ratelimit.RateLimitMiddleware, root_app=app)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -33,14 +112,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.PrometheusMiddleware, root_app=app)
+
+tracing.setup_tracing()
+app.add_middleware(tracing.TracingMiddleware, root_app=app)
+
+if profiling.profiling_available():
+    app.add_middleware(profiling.ProfilingMiddleware, root_app=app)
+
+
+def include_routers(app: FastAPI, names: List[str]) -> Dict[str, ModuleType]:
+    """
+    Import and mount the enabled routers
+
+    Returns:
+        Router modules by name
+
+    Raises:
+        ValueError: If a name is not in ROUTERS
+    """
+    modules = {}
+    for name in names:
+        if name not in ROUTERS:
+            raise ValueError(f"Unknown router in API_ROUTERS: {name}")
+        module = importlib.import_module(f"app.api.{name}")
+        app.include_router(module.router, prefix=ROUTERS[name], tags=[name])
+        modules[name] = module
+    return modules
+
+
 # Include routers
-app.include_router(users.router, prefix="/api/v1/users", tags=["users"])
-app.include_router(chat.router, prefix="/api/v1/chat", tags=["chat"])
-app.include_router(voice.router, prefix="/api/v1/voice", tags=["voice"])
-app.include_router(tasks.router, prefix="/api/v1/tasks", tags=["tasks"])
-app.include_router(calendar.router, prefix="/api/v1/calendar", tags=["calendar"])
-app.include_router(documents.router, prefix="/api/v1/documents", tags=["documents"])
-app.include_router(search.router, prefix="/api/v1/search", tags=["search"])
+routers = include_routers(app, settings.API_ROUTERS)
+
+if profiling.profiling_available():
+    from app.api import profiling as profiling_api
+
+    app.include_router(profiling_api.router, prefix="/api/v1/profiling", tags=["profiling"])
 
 
 @app.get("/")
@@ -53,6 +161,14 @@ async def root():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus metrics"""
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -0,0 +1,59 @@
+"""
+Database migration entry point
+
+Applies the Alembic migrations in migrations/ and is run once per
+deploy, before the app starts: workers only check the schema version.
+Concurrent runs wait for each other on a Postgres advisory lock.
+
+A database created by an older release, which ran create_all() on
+startup, has no schema revision yet. It is taken over with --adopt,
+which stamps it at the baseline revision (0001, the schema of that
+release) and then upgrades it.
+
+Exits with status 1 with --check if the database is not at the head
+revision, e.g. for a readiness probe or a deploy gate.
+
+Usage (from backend/):
+    python -m app.migrate [revision] [--adopt] [--check]
+"""
+import argparse
+import asyncio
+import sys
+from app.core.database import engine
+from app.core.schema import current_revisions, migrate, migration_revisions
+
+
+async def _check() -> int:
+    heads, _ = migration_revisions()
+    async with engine.connect() as conn:
+        current = await current_revisions(conn)
+    print(f"database: {', '.join(sorted(current)) or 'no revision'}  migrations: {', '.join(sorted(heads))}")
+    return 0 if current == heads else 1
+
+
+async def _run(args: argparse.Namespace) -> int:
+    try:
+        if args.check:
+            return await _check()
+        revisions = await migrate(args.revision, adopt=args.adopt)
+        print(f"database at {', '.join(sorted(revisions))}")
+        return 0
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        await engine.dispose()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("revision", nargs="?", default="head")
+    parser.add_argument("--adopt", action="store_true", help="Stamp an unversioned database at the baseline revision, then upgrade it")
+    parser.add_argument("--check", action="store_true", help="Only check whether the database is at head")
+    args = parser.parse_args()
+
+    return asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,7 @@
 from app.models.user import User
 from app.models.conversation import Conversation, Message, MessageRole
 from app.models.task import Task, TaskPriority, TaskStatus
-from app.models.calendar import CalendarEvent
+from app.models.calendar import CalendarEvent, CalendarEventOverride, CalendarEventOccurrence
 from app.models.document import Document
 
 __all__ = [
@@ -13,5 +13,7 @@ __all__ = [
     "TaskPriority",
     "TaskStatus",
     "CalendarEvent",
+    "CalendarEventOverride",
+    "CalendarEventOccurrence",
     "Document",
 ]
@@ -1,15 +1,46 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index, UniqueConstraint,
+    Computed, DDL, event, text,
+)
+from sqlalchemy.dialects.postgresql import TSTZRANGE
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
+from datetime import timedelta
 from app.core.database import Base
 
+# Half-open [start, end) range kept in sync by PostgreSQL for overlap queries
+TIME_RANGE_SQL = "tstzrange(start_time, end_time, '[)')"
+
 
 class CalendarEvent(Base):
     """Calendar event model"""
     __tablename__ = "calendar_events"
+    __table_args__ = (
+        Index("ix_calendar_events_user_start", "user_id", "start_time"),
+        Index(
+            "ix_calendar_events_user_time_range",
+            "user_id",
+            "time_range",
+            postgresql_using="gist",
+        ),
+        Index(
+            "ix_calendar_events_reminder_at",
+            "reminder_at",
+            postgresql_where=text("reminder_at IS NOT NULL"),
+        ),
+        Index(
+            "uq_calendar_events_user_ical_uid",
+            "user_id",
+            "ical_uid",
+            unique=True,
+            postgresql_where=text("ical_uid IS NOT NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # iCalendar UID of imported events, used to update them on re-import
+    ical_uid = Column(String, nullable=True)
 
     title = Column(String, nullable=False)
     description = Column(Text)
@@ -19,13 +50,23 @@ class CalendarEvent(Base):
     start_time = Column(DateTime(timezone=True), nullable=False)
     end_time = Column(DateTime(timezone=True), nullable=False)
     all_day = Column(Boolean, default=False)
+    time_range = deferred(Column(TSTZRANGE, Computed(TIME_RANGE_SQL, persisted=True)))
 
     # Reminder
     reminder_minutes_before = Column(Integer, default=15)
+    # When the reminder fires, kept in sync on flush (None for recurring events,
+    # whose reminders live on their occurrences)
+    reminder_at = Column(DateTime(timezone=True), nullable=True)
 
     # Recurrence
     is_recurring = Column(Boolean, default=False)
     recurrence_rule = Column(String, nullable=True)  # iCalendar RRULE format
+    # IANA timezone the rule repeats in, e.g. "Europe/Berlin" (None: UTC)
+    tzid = Column(String, nullable=True)
+
+    # Range of materialized occurrences (recurring events only)
+    occurrences_from = Column(DateTime(timezone=True), nullable=True)
+    occurrences_until = Column(DateTime(timezone=True), nullable=True)
 
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -33,3 +74,94 @@ class CalendarEvent(Base):
 
     # Relationships
     user = relationship("User", back_populates="calendar_events")
+    overrides = relationship(
+        "CalendarEventOverride",
+        back_populates="event",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+
+class CalendarEventOverride(Base):
+    """Modified or cancelled occurrence of a recurring event"""
+    __tablename__ = "calendar_event_overrides"
+    __table_args__ = (
+        UniqueConstraint("event_id", "recurrence_id", name="uq_calendar_event_overrides_occurrence"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(Integer, ForeignKey("calendar_events.id", ondelete="CASCADE"), nullable=False)
+
+    # Original start time of the occurrence (iCalendar RECURRENCE-ID)
+    recurrence_id = Column(DateTime(timezone=True), nullable=False)
+
+    # Overridden values, None keeps the series value
+    start_time = Column(DateTime(timezone=True), nullable=True)
+    end_time = Column(DateTime(timezone=True), nullable=True)
+    title = Column(String, nullable=True)
+    description = Column(Text, nullable=True)
+    location = Column(String, nullable=True)
+    is_cancelled = Column(Boolean, default=False)
+
+    # Relationships
+    event = relationship("CalendarEvent", back_populates="overrides")
+
+
+class CalendarEventOccurrence(Base):
+    """Materialized occurrence of a recurring event within the horizon"""
+    __tablename__ = "calendar_event_occurrences"
+    __table_args__ = (
+        UniqueConstraint("event_id", "recurrence_id", name="uq_calendar_event_occurrences_occurrence"),
+        Index("ix_calendar_event_occurrences_user_start", "user_id", "start_time"),
+        Index(
+            "ix_calendar_event_occurrences_user_time_range",
+            "user_id",
+            "time_range",
+            postgresql_using="gist",
+        ),
+        Index(
+            "ix_calendar_event_occurrences_reminder_at",
+            "reminder_at",
+            postgresql_where=text("reminder_at IS NOT NULL"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    event_id = Column(Integer, ForeignKey("calendar_events.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+
+    recurrence_id = Column(DateTime(timezone=True), nullable=False)
+    start_time = Column(DateTime(timezone=True), nullable=False)
+    end_time = Column(DateTime(timezone=True), nullable=False)
+    time_range = deferred(Column(TSTZRANGE, Computed(TIME_RANGE_SQL, persisted=True)))
+    reminder_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Copied from an override, None keeps the series value
+    title = Column(String, nullable=True)
+    description = Column(Text, nullable=True)
+    location = Column(String, nullable=True)
+
+
+# GiST indexes over (user_id, time_range) need btree_gist for the integer column
+event.listen(
+    CalendarEvent.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist"),
+)
+
+
+def reminder_time(start_time, reminder_minutes_before):
+    """When a reminder for an occurrence starting at start_time fires"""
+    if start_time is None or reminder_minutes_before is None:
+        return None
+    return start_time - timedelta(minutes=reminder_minutes_before)
+
+
+@event.listens_for(CalendarEvent, "before_insert")
+@event.listens_for(CalendarEvent, "before_update")
+def _sync_reminder_at(mapper, connection, target):
+    """Keep reminder_at in sync with start_time and reminder_minutes_before"""
+    if target.is_recurring and target.recurrence_rule:
+        target.reminder_at = None
+    else:
+        target.reminder_at = reminder_time(target.start_time, target.reminder_minutes_before)
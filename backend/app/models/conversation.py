@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -14,6 +14,9 @@ class MessageRole(str, enum.Enum):
 class Conversation(Base):
     """Conversation/Chat session model"""
     __tablename__ = "conversations"
+    __table_args__ = (
+        Index("ix_conversations_user_updated_at", "user_id", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -34,6 +37,9 @@ class Conversation(Base):
 class Message(Base):
     """Individual message in a conversation"""
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_conversation_created_at", "conversation_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
@@ -44,7 +50,7 @@ class Message(Base):
     audio_url = Column(String, nullable=True)
 
     # Metadata (tokens used, model version, etc.)
-    metadata = Column(JSON, default={})
+    message_metadata = Column("metadata", JSON, default={})
 
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
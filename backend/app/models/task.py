@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Enum, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -22,6 +22,23 @@ class TaskStatus(str, enum.Enum):
 class Task(Base):
     """Task/Reminder model"""
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Per-user lists, filtered by status and sorted by due date
+        Index("ix_tasks_user_status_due_date", "user_id", "status", "due_date"),
+        Index("ix_tasks_user_due_date", "user_id", "due_date"),
+        Index(
+            "ix_tasks_reminder_date",
+            "reminder_date",
+            postgresql_where=text("reminder_date IS NOT NULL"),
+        ),
+        Index(
+            "uq_tasks_series_due_date",
+            "series_id",
+            "due_date",
+            unique=True,
+            postgresql_where=text("series_id IS NOT NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -35,7 +52,9 @@ class Task(Base):
     due_date = Column(DateTime(timezone=True), nullable=True)
     reminder_date = Column(DateTime(timezone=True), nullable=True)
     is_recurring = Column(Boolean, default=False)
-    recurrence_rule = Column(String, nullable=True)  # Cron-like expression
+    recurrence_rule = Column(String, nullable=True)  # Cron expression (UTC)
+    # First task of a recurring series; None for the series root itself
+    series_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=True)
 
     # Completion
     completed_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import date, datetime
+from app.schemas.calendar import CalendarEventResponse
+from app.schemas.task import TaskResponse
+
+
+class AgendaResponse(BaseModel):
+    date: date
+    timezone: str
+    tasks: List[TaskResponse]
+    events: List[CalendarEventResponse]
+    briefing: Optional[str] = None
+    generated_at: datetime
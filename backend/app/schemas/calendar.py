@@ -1,18 +1,21 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
+from app.schemas.types import UTCDateTime
 
 
 class CalendarEventBase(BaseModel):
     title: str
     description: Optional[str] = None
     location: Optional[str] = None
-    start_time: datetime
-    end_time: datetime
+    start_time: UTCDateTime
+    end_time: UTCDateTime
     all_day: bool = False
     reminder_minutes_before: int = 15
     is_recurring: bool = False
     recurrence_rule: Optional[str] = None
+    # IANA timezone the recurrence rule repeats in (UTC if None)
+    tzid: Optional[str] = None
 
 
 class CalendarEventCreate(CalendarEventBase):
@@ -23,19 +26,79 @@ class CalendarEventUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
     location: Optional[str] = None
-    start_time: Optional[datetime] = None
-    end_time: Optional[datetime] = None
+    start_time: Optional[UTCDateTime] = None
+    end_time: Optional[UTCDateTime] = None
     all_day: Optional[bool] = None
     reminder_minutes_before: Optional[int] = None
     is_recurring: Optional[bool] = None
     recurrence_rule: Optional[str] = None
+    tzid: Optional[str] = None
 
 
 class CalendarEventResponse(CalendarEventBase):
     id: int
     user_id: int
+    # Original start of this occurrence when expanded from a recurring event
+    recurrence_id: Optional[datetime] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
+
+
+class CalendarEventOverrideCreate(BaseModel):
+    recurrence_id: UTCDateTime
+    start_time: Optional[UTCDateTime] = None
+    end_time: Optional[UTCDateTime] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    location: Optional[str] = None
+    is_cancelled: bool = False
+
+
+class CalendarEventOverrideResponse(CalendarEventOverrideCreate):
+    id: int
+    event_id: int
+
+    class Config:
+        from_attributes = True
+
+
+class BusyInterval(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+
+class FreeBusyResponse(BaseModel):
+    start_date: datetime
+    end_date: datetime
+    busy: List[BusyInterval]
+    free: List[BusyInterval]
+
+
+class EventConflict(BaseModel):
+    event_id: int
+    title: str
+    start_time: datetime
+    end_time: datetime
+    recurrence_id: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class CalendarEventWithConflicts(CalendarEventResponse):
+    # Filled when the event was created or updated with check_conflicts=true
+    conflicts: List[EventConflict] = []
+
+
+class CalendarImportResponse(BaseModel):
+    created: int
+    updated: int
+    overrides: int
+    skipped: int
+    errors: List[str] = []
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import Any, List, Optional
+from datetime import datetime
+
+
+class Change(BaseModel):
+    seq: Optional[int] = None
+    kind: str  # task or event
+    action: str  # created, updated, deleted or reset
+    id: Optional[int] = None
+    # Serialized task or event; None for deletes and resets
+    data: Optional[Any] = None
+    at: datetime
+
+
+class ChangesResponse(BaseModel):
+    changes: List[Change]
+    # Pass as `since` on the next call
+    latest_seq: int
+    # Changes were dropped from the log; reload the full lists
+    reset: bool = False
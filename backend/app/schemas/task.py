@@ -1,14 +1,15 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
+from app.schemas.types import UTCDateTime
 
 
 class TaskBase(BaseModel):
     title: str
     description: Optional[str] = None
     priority: str = "medium"
-    due_date: Optional[datetime] = None
-    reminder_date: Optional[datetime] = None
+    due_date: Optional[UTCDateTime] = None
+    reminder_date: Optional[UTCDateTime] = None
     is_recurring: bool = False
     recurrence_rule: Optional[str] = None
 
@@ -22,8 +23,8 @@ class TaskUpdate(BaseModel):
     description: Optional[str] = None
     status: Optional[str] = None
     priority: Optional[str] = None
-    due_date: Optional[datetime] = None
-    reminder_date: Optional[datetime] = None
+    due_date: Optional[UTCDateTime] = None
+    reminder_date: Optional[UTCDateTime] = None
     is_recurring: Optional[bool] = None
     recurrence_rule: Optional[str] = None
 
@@ -32,9 +33,26 @@ class TaskResponse(TaskBase):
     id: int
     user_id: int
     status: str
+    # First task of the recurring series this task was generated from
+    series_id: Optional[int] = None
     completed_at: Optional[datetime] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
+
+
+class TaskBulkUpdate(BaseModel):
+    ids: List[int]
+    changes: TaskUpdate
+
+
+class TaskBulkComplete(BaseModel):
+    ids: List[int]
+
+
+class TaskBulkResponse(BaseModel):
+    tasks: List[TaskResponse]
+    # Next instances of completed recurring tasks
+    created: List[TaskResponse] = []
@@ -0,0 +1,14 @@
+from datetime import datetime, timezone
+from typing import Annotated
+from pydantic import AfterValidator
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Treat naive datetimes as UTC, like the timestamptz columns they are stored in"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+# Datetime accepted from clients; always timezone-aware once validated
+UTCDateTime = Annotated[datetime, AfterValidator(_as_utc)]
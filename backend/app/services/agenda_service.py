@@ -0,0 +1,278 @@
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional
+from zoneinfo import ZoneInfo
+from sqlalchemy import or_, select
+from app.core.cache import TwoLevelCache, make_key
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.redis import get_redis, mark_redis_unavailable, REDIS_ERRORS
+from app.models.calendar import CalendarEvent
+from app.models.task import Task, TaskStatus
+from app.models.user import User
+from app.schemas.calendar import CalendarEventResponse
+from app.schemas.task import TaskResponse
+from app.services.ai_factory import AIServiceFactory
+from app.services.recurrence_service import (
+    recurrence_service,
+    MODE_OVERLAP,
+    ensure_aware,
+    get_zone,
+    not_expanded,
+    utcnow,
+    window_filter,
+)
+
+logger = logging.getLogger(__name__)
+
+# Task statuses left off the agenda
+DONE_STATUSES = (TaskStatus.COMPLETED, TaskStatus.CANCELLED)
+
+
+def day_bounds(day: date, zone: ZoneInfo):
+    """Start and end of a local day as aware datetimes"""
+    start = datetime.combine(day, time.min, tzinfo=zone)
+    return start, datetime.combine(day + timedelta(days=1), time.min, tzinfo=zone)
+
+
+def build_briefing_messages(agenda: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Build the AI prompt for a daily briefing"""
+    zone = get_zone(agenda["timezone"])
+    lines = [f"Date: {agenda['date']}", "", "Events:"]
+
+    for event in agenda["events"]:
+        start = datetime.fromisoformat(event["start_time"]).astimezone(zone)
+        end = datetime.fromisoformat(event["end_time"]).astimezone(zone)
+        where = f" at {event['location']}" if event.get("location") else ""
+        lines.append(f"- {start:%H:%M}-{end:%H:%M} {event['title']}{where}")
+    if not agenda["events"]:
+        lines.append("- none")
+
+    lines += ["", "Tasks:"]
+    for task in agenda["tasks"]:
+        due = ""
+        if task.get("due_date"):
+            due = f" (due {datetime.fromisoformat(task['due_date']).astimezone(zone):%Y-%m-%d %H:%M})"
+        lines.append(f"- [{task['priority']}] {task['title']}{due}")
+    if not agenda["tasks"]:
+        lines.append("- none")
+
+    return [
+        {
+            "role": "system",
+            "content": (
+                "You are a helpful personal assistant. Write a short, friendly briefing "
+                "of the user's day: what is scheduled, what is overdue or urgent, and "
+                "where there is free time."
+            ),
+        },
+        {"role": "user", "content": "\n".join(lines)},
+    ]
+
+
+class AgendaService:
+    """
+    Daily agenda of a user's tasks and events, with an optional AI briefing
+
+    Agendas are cached per user, day and timezone in a TwoLevelCache.
+    Cache keys include a per-user version that routers bump through
+    invalidate() whenever a task or event changes, so every replica
+    misses at once. Briefings are cached by the agenda content they
+    summarize and can be precomputed by run_precompute_loop().
+    """
+
+    def __init__(self):
+        self.agenda_cache = TwoLevelCache(
+            "agenda",
+            ttl=settings.AGENDA_CACHE_TTL,
+            maxsize=settings.CACHE_LOCAL_MAXSIZE,
+        )
+        self.briefing_cache = TwoLevelCache(
+            "agenda-briefing",
+            ttl=settings.AGENDA_BRIEFING_TTL,
+            maxsize=settings.CACHE_LOCAL_MAXSIZE,
+            lock_timeout=120.0,
+        )
+        # Fallback versions while Redis is unavailable
+        self._versions: Dict[int, int] = {}
+
+    def _version_key(self, user_id: int) -> str:
+        return f"agenda:version:{user_id}"
+
+    async def _version(self, user_id: int) -> int:
+        redis = get_redis()
+        if redis is not None:
+            try:
+                raw = await redis.get(self._version_key(user_id))
+                return int(raw or 0)
+            except REDIS_ERRORS as e:
+                mark_redis_unavailable(e)
+        return self._versions.get(user_id, 0)
+
+    async def invalidate(self, user_id: int):
+        """Invalidate cached agendas of a user after a task or event change"""
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.incr(self._version_key(user_id))
+        except REDIS_ERRORS as e:
+            mark_redis_unavailable(e)
+
+    async def _load_tasks(self, user_id: int, day_end: datetime) -> List[Dict[str, Any]]:
+        """Open tasks due by the end of the day, overdue ones included"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Task)
+                .where(
+                    Task.user_id == user_id,
+                    Task.due_date < day_end,
+                    or_(Task.status.is_(None), Task.status.notin_(DONE_STATUSES)),
+                )
+                .order_by(Task.due_date.asc())
+            )
+            return [
+                TaskResponse.model_validate(task).model_dump(mode="json")
+                for task in result.scalars().all()
+            ]
+
+    async def _load_events(self, user_id: int, day_start: datetime, day_end: datetime) -> List[Dict[str, Any]]:
+        """Events and recurring occurrences overlapping the day"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(CalendarEvent).where(
+                    CalendarEvent.user_id == user_id,
+                    window_filter(CalendarEvent, day_start, day_end, MODE_OVERLAP),
+                    not_expanded,
+                )
+            )
+            events = [CalendarEventResponse.model_validate(e) for e in result.scalars().all()]
+
+            occurrences = await recurrence_service.get_occurrences(db, user_id, day_start, day_end, MODE_OVERLAP)
+            events.extend(
+                CalendarEventResponse.model_validate(event).model_copy(
+                    update={
+                        "start_time": o.start_time,
+                        "end_time": o.end_time,
+                        "recurrence_id": o.recurrence_id,
+                        "title": o.title or event.title,
+                        "description": o.description or event.description,
+                        "location": o.location or event.location,
+                    }
+                )
+                for event, o in occurrences
+            )
+
+        events.sort(key=lambda e: ensure_aware(e.start_time))
+        return [e.model_dump(mode="json") for e in events]
+
+    async def get_agenda(self, user_id: int, day: date, zone: ZoneInfo) -> Dict[str, Any]:
+        """
+        Get the agenda of a user for a local day
+
+        Tasks and events are loaded concurrently on separate connections.
+        """
+        version = await self._version(user_id)
+        key = make_key(user_id, day.isoformat(), zone.key, version)
+
+        async def _compute() -> Dict[str, Any]:
+            day_start, day_end = day_bounds(day, zone)
+            tasks, events = await asyncio.gather(
+                self._load_tasks(user_id, day_end),
+                self._load_events(user_id, day_start, day_end),
+            )
+            return {
+                "date": day.isoformat(),
+                "timezone": zone.key,
+                "tasks": tasks,
+                "events": events,
+                "generated_at": utcnow().isoformat(),
+            }
+
+        return await self.agenda_cache.get_or_compute(key, _compute)
+
+    def _briefing_key(self, user_id: int, agenda: Dict[str, Any]) -> str:
+        return make_key(
+            user_id,
+            agenda["date"],
+            agenda["timezone"],
+            agenda["tasks"],
+            agenda["events"],
+            settings.DEFAULT_AI_PROVIDER,
+        )
+
+    async def get_briefing(self, user_id: int, agenda: Dict[str, Any]) -> str:
+        """Get the AI briefing of an agenda, cached by the agenda content"""
+
+        async def _compute() -> str:
+            ai_service = AIServiceFactory.get_service()
+            return await ai_service.chat(build_briefing_messages(agenda), temperature=0.3)
+
+        return await self.briefing_cache.get_or_compute(self._briefing_key(user_id, agenda), _compute)
+
+    async def precompute(self, now: Optional[datetime] = None) -> int:
+        """
+        Precompute today's agenda and briefing for users whose local time
+        is AGENDA_PRECOMPUTE_HOUR
+
+        Users are read in batches. The user's timezone comes from
+        preferences["timezone"] (UTC by default).
+
+        Returns:
+            Number of precomputed briefings
+        """
+        now = now or utcnow()
+        done = 0
+        last_id = 0
+
+        while True:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(User.id, User.preferences)
+                    .where(User.id > last_id, User.is_active.isnot(False))
+                    .order_by(User.id)
+                    .limit(500)
+                )
+                users = result.all()
+
+            if not users:
+                return done
+            last_id = users[-1].id
+
+            for user_id, preferences in users:
+                try:
+                    zone = get_zone((preferences or {}).get("timezone"))
+                except ValueError:
+                    zone = get_zone("UTC")
+
+                local_now = now.astimezone(zone)
+                if local_now.hour != settings.AGENDA_PRECOMPUTE_HOUR:
+                    continue
+
+                try:
+                    agenda = await self.get_agenda(user_id, local_now.date(), zone)
+                    await self.get_briefing(user_id, agenda)
+                    done += 1
+                except Exception:
+                    logger.exception("Failed to precompute briefing for user %s", user_id)
+
+    async def run_precompute_loop(self):
+        """Precompute morning briefings once per hour (runs in lifespan)"""
+        while True:
+            # Run shortly after each full hour
+            now = utcnow()
+            next_hour = (now + timedelta(hours=1)).replace(minute=1, second=0, microsecond=0)
+            await asyncio.sleep((next_hour - now).total_seconds())
+
+            try:
+                done = await self.precompute()
+                if done:
+                    logger.info("Precomputed %d briefings", done)
+            except Exception:
+                logger.exception("Briefing precompute failed")
+
+
+agenda_service = AgendaService()
@@ -1,9 +1,117 @@
+import functools
+import time
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, AsyncGenerator
+from app.core.metrics import (
+    AI_DURATION,
+    AI_ERRORS,
+    AI_REQUESTS,
+    AI_TIME_TO_FIRST_TOKEN,
+    AI_TOKENS,
+    AI_TOKENS_PER_SECOND,
+    estimate_tokens,
+)
+from app.core.tracing import tracer, record_error
+from opentelemetry import trace
+
+
+async def _instrument_stream(
+    provider: str,
+    stream: AsyncGenerator[str, None],
+    start: float,
+    span: trace.Span,
+) -> AsyncGenerator[str, None]:
+    """Pass a streamed reply through, recording time to first token and throughput"""
+    tokens = 0
+    first = None
+    try:
+        async for chunk in stream:
+            if first is None:
+                first = time.perf_counter()
+                AI_TIME_TO_FIRST_TOKEN.labels(provider).observe(first - start)
+                span.add_event("first_token")
+            tokens += estimate_tokens(chunk)
+            yield chunk
+    except Exception as e:
+        AI_ERRORS.labels(provider, "true").inc()
+        record_error(span, e)
+        raise
+    finally:
+        span.set_attribute("ai.output_tokens", tokens)
+        span.end()
+
+    end = time.perf_counter()
+    AI_DURATION.labels(provider, "true").observe(end - start)
+    AI_TOKENS.labels(provider).inc(tokens)
+    if first is not None and end > first:
+        AI_TOKENS_PER_SECOND.labels(provider).observe(tokens / (end - first))
+
+
+def _instrument_chat(chat):
+    """Wrap a provider's chat() with a span and request, error, latency and token metrics"""
+
+    @functools.wraps(chat)
+    async def wrapper(self, messages, *args, **kwargs):
+        provider = self.get_provider_name()
+        stream = kwargs.get("stream", args[2] if len(args) > 2 else False)
+        label = "true" if stream else "false"
+        AI_REQUESTS.labels(provider, label).inc()
+        start = time.perf_counter()
+
+        # A streamed reply's span stays open until the stream is consumed
+        span = tracer.start_span(
+            "ai.chat",
+            attributes={"ai.provider": provider, "ai.stream": bool(stream), "ai.messages": len(messages)},
+        )
+        try:
+            with trace.use_span(span, end_on_exit=False):
+                result = await chat(self, messages, *args, **kwargs)
+        except Exception as e:
+            AI_ERRORS.labels(provider, label).inc()
+            record_error(span, e)
+            span.end()
+            raise
+
+        if stream:
+            return _instrument_stream(provider, result, start, span)
+
+        tokens = estimate_tokens(result or "")
+        span.set_attribute("ai.output_tokens", tokens)
+        span.end()
+        AI_DURATION.labels(provider, label).observe(time.perf_counter() - start)
+        AI_TOKENS.labels(provider).inc(tokens)
+        return result
+
+    return wrapper
+
+
+def _traced(name: str, method):
+    """Wrap a provider method in a span"""
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        with tracer.start_as_current_span(f"ai.{name}", attributes={"ai.provider": self.get_provider_name()}):
+            return await method(self, *args, **kwargs)
+
+    return wrapper
 
 
 class AIServiceBase(ABC):
-    """Base class for AI service providers"""
+    """
+    Base class for AI service providers
+
+    chat() of every subclass is wrapped to record Prometheus metrics
+    (requests, errors, latency, time to first token and throughput), and
+    chat(), analyze_document() and summarize() calls are traced.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "chat" in cls.__dict__:
+            cls.chat = _instrument_chat(cls.chat)
+        for name in ("analyze_document", "summarize"):
+            if name in cls.__dict__:
+                setattr(cls, name, _traced(name, cls.__dict__[name]))
 
     @abstractmethod
     async def chat(
@@ -1,15 +1,23 @@
-from typing import Optional
+import importlib
+from typing import Optional, Type, Union
 from app.services.ai_base import AIServiceBase
-from app.services.ai_openai import OpenAIService
-from app.services.ai_anthropic import AnthropicService
-from app.services.ai_gemini import GeminiService
-from app.services.ai_ollama import OllamaService
 from app.core.config import settings
 
 
 class AIServiceFactory:
-    """Factory for creating AI service instances"""
+    """
+    Factory for creating AI service instances
 
+    Providers are registered by name as "module:Class" paths and imported
+    on first use, so a process only loads the SDKs it actually calls.
+    """
+
+    _providers = {
+        "openai": "app.services.ai_openai:OpenAIService",
+        "anthropic": "app.services.ai_anthropic:AnthropicService",
+        "gemini": "app.services.ai_gemini:GeminiService",
+        "ollama": "app.services.ai_ollama:OllamaService",
+    }
     _instances = {}
 
     @classmethod
@@ -33,22 +41,33 @@ class AIServiceFactory:
         if provider in cls._instances:
             return cls._instances[provider]
 
-        # Create new instance based on provider
-        if provider == "openai":
-            service = OpenAIService()
-        elif provider == "anthropic":
-            service = AnthropicService()
-        elif provider == "gemini":
-            service = GeminiService()
-        elif provider == "ollama":
-            service = OllamaService()
-        else:
+        target = cls._providers.get(provider)
+        if target is None:
             raise ValueError(f"Unsupported AI provider: {provider}")
 
+        # Import the provider module on first use
+        if isinstance(target, str):
+            module_name, class_name = target.split(":")
+            target = getattr(importlib.import_module(module_name), class_name)
+            cls._providers[provider] = target
+
         # Cache the instance
+        service = target()
         cls._instances[provider] = service
         return service
 
+    @classmethod
+    def register(cls, provider: str, service_class: Union[str, Type[AIServiceBase]]):
+        """
+        Register a provider
+
+        Args:
+            provider: Provider name
+            service_class: AIServiceBase subclass or its "module:Class" path
+        """
+        cls._providers[provider] = service_class
+        cls._instances.pop(provider, None)
+
     @classmethod
     def get_available_providers(cls) -> list[str]:
         """Get list of available AI providers"""
@@ -0,0 +1,269 @@
+import asyncio
+import io
+import os
+from contextlib import suppress
+from dataclasses import dataclass
+from typing import AsyncGenerator, AsyncIterable, List, Optional
+import speech_recognition as sr
+from app.core.config import settings
+from app.services.vad import SAMPLE_WIDTH
+
+# Sample rate audio is decoded to for recognition
+TARGET_SAMPLE_RATE = 16000
+
+# Containers speech_recognition reads without ffmpeg
+_NATIVE_MAGIC = (b"RIFF", b"FORM")
+
+
+def is_native_audio(data: bytes) -> bool:
+    """Whether the data is WAV or AIFF, which can be read in memory"""
+    return data[:4] in _NATIVE_MAGIC
+
+
+def read_native_audio(data: bytes) -> sr.AudioData:
+    """Read WAV/AIFF bytes and resample them to 16 kHz mono PCM"""
+    with sr.AudioFile(io.BytesIO(data)) as source:
+        # AudioFile mixes multi-channel audio down to mono
+        audio_data = sr.Recognizer().record(source)
+
+    pcm = audio_data.get_raw_data(convert_rate=TARGET_SAMPLE_RATE, convert_width=SAMPLE_WIDTH)
+    return sr.AudioData(pcm, TARGET_SAMPLE_RATE, SAMPLE_WIDTH)
+
+
+# Output codecs, their media types and the Accept values that select them
+OUTPUT_CODECS = {
+    "mp3": ("audio/mpeg", ("audio/mpeg", "audio/mp3")),
+    "opus": ("audio/ogg; codecs=opus", ("audio/ogg", "audio/opus")),
+    "wav": ("audio/wav", ("audio/wav", "audio/wave", "audio/x-wav")),
+    "pcm": ("audio/L16", ("audio/l16",)),
+}
+OUTPUT_SAMPLE_RATES = (8000, 12000, 16000, 22050, 24000, 32000, 44100, 48000)
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    """Requested output encoding; None bitrate/sample rate keep the source's"""
+    codec: str = "mp3"
+    bitrate: Optional[int] = None  # kbps
+    sample_rate: Optional[int] = None
+
+    def __post_init__(self):
+        if self.codec not in OUTPUT_CODECS:
+            raise ValueError(f"Unsupported audio format: {self.codec} (use one of {', '.join(OUTPUT_CODECS)})")
+        if self.bitrate is not None and not 6 <= self.bitrate <= 320:
+            raise ValueError("Bitrate must be between 6 and 320 kbps")
+        rates = OPUS_SAMPLE_RATES if self.codec == "opus" else OUTPUT_SAMPLE_RATES
+        if self.sample_rate is not None and self.sample_rate not in rates:
+            raise ValueError(f"Sample rate must be one of {rates}")
+
+    @property
+    def is_source(self) -> bool:
+        """Whether this is gTTS's own MP3 output, which needs no transcoding"""
+        return self.codec == "mp3" and self.bitrate is None and self.sample_rate is None
+
+    @property
+    def media_type(self) -> str:
+        if self.codec == "pcm":
+            return f"audio/L16; rate={self.sample_rate or TARGET_SAMPLE_RATE}; channels=1"
+        return OUTPUT_CODECS[self.codec][0]
+
+    @property
+    def extension(self) -> str:
+        return {"opus": "ogg", "pcm": "raw"}.get(self.codec, self.codec)
+
+    @property
+    def tag(self) -> str:
+        """Short identifier used in cache keys"""
+        return f"{self.codec}:{self.bitrate or ''}:{self.sample_rate or ''}"
+
+    def ffmpeg_args(self) -> List[str]:
+        args = ["-ac", "1"]
+        if self.codec == "mp3":
+            args += ["-c:a", "libmp3lame", "-f", "mp3"]
+        elif self.codec == "opus":
+            args += [
+                "-c:a", "libopus",
+                "-application", "voip",
+                "-b:a", f"{self.bitrate or settings.AUDIO_OPUS_BITRATE}k",
+                "-f", "ogg",
+            ]
+        elif self.codec == "wav":
+            args += ["-c:a", "pcm_s16le", "-f", "wav"]
+        else:
+            args += ["-c:a", "pcm_s16le", "-f", "s16le"]
+
+        if self.bitrate and self.codec == "mp3":
+            args += ["-b:a", f"{self.bitrate}k"]
+        if self.sample_rate or self.codec == "pcm":
+            args += ["-ar", str(self.sample_rate or TARGET_SAMPLE_RATE)]
+        return args
+
+
+def negotiate_format(
+    codec: Optional[str] = None,
+    bitrate: Optional[int] = None,
+    sample_rate: Optional[int] = None,
+    accept: Optional[str] = None,
+) -> AudioFormat:
+    """
+    Pick the output format from an explicit codec or the Accept header
+
+    Accept entries are tried by descending q value; anything unsupported
+    (or */*) falls back to MP3.
+
+    Raises:
+        ValueError: If the codec, bitrate or sample rate is not supported
+    """
+    if codec is None and accept:
+        candidates = []
+        for position, item in enumerate(accept.split(",")):
+            media_type, *params = [p.strip() for p in item.split(";")]
+            q = 1.0
+            for param in params:
+                if param.startswith("q="):
+                    with suppress(ValueError):
+                        q = float(param[2:])
+            candidates.append((-q, position, media_type.lower()))
+
+        for q, _, media_type in sorted(candidates):
+            if q == 0:
+                break
+            codec = next((name for name, (_, types) in OUTPUT_CODECS.items() if media_type in types), None)
+            if codec:
+                break
+
+    return AudioFormat(codec or "mp3", bitrate, sample_rate)
+
+
+async def _spawn_ffmpeg(args: List[str]) -> asyncio.subprocess.Process:
+    """
+    Start ffmpeg with piped stdin/stdout
+
+    Raises:
+        RuntimeError: If ffmpeg is not installed
+    """
+    try:
+        return await asyncio.create_subprocess_exec(
+            settings.FFMPEG_PATH, "-hide_banner", "-loglevel", "error", *args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env={**os.environ, "TMPDIR": settings.VOICE_TEMP_DIR},
+        )
+    except FileNotFoundError:
+        raise RuntimeError(f"ffmpeg not found at '{settings.FFMPEG_PATH}'")
+
+
+async def transcode_stream(
+    chunks: AsyncIterable[bytes],
+    output: AudioFormat,
+    input_format: Optional[str] = None,
+) -> AsyncGenerator[bytes, None]:
+    """
+    Transcode audio through an ffmpeg pipe while it is produced
+
+    Input chunks are written to ffmpeg as they arrive and encoded output
+    is yielded as soon as ffmpeg flushes it, so the first bytes go out
+    before the input is complete.
+
+    Raises:
+        ValueError: If ffmpeg fails to transcode the audio
+        RuntimeError: If ffmpeg is not installed
+    """
+    args = ["-f", input_format] if input_format else []
+    args += ["-i", "pipe:0", *output.ffmpeg_args(), "-flush_packets", "1", "pipe:1"]
+    process = await _spawn_ffmpeg(args)
+
+    async def _write():
+        try:
+            async for chunk in chunks:
+                process.stdin.write(chunk)
+                await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # ffmpeg exited early; its error is reported below
+            pass
+        finally:
+            process.stdin.close()
+
+    writer = asyncio.create_task(_write())
+    try:
+        while True:
+            data = await process.stdout.read(settings.AUDIO_STREAM_CHUNK_SIZE)
+            if not data:
+                break
+            yield data
+
+        await writer
+        error = await process.stderr.read()
+        if await process.wait() != 0:
+            raise ValueError(f"Could not transcode audio: {error.decode(errors='replace').strip()}")
+    finally:
+        writer.cancel()
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+
+async def transcode(data: bytes, output: AudioFormat, input_format: Optional[str] = None) -> bytes:
+    """Transcode a complete audio file held in memory"""
+
+    async def _input():
+        yield data
+
+    return b"".join([chunk async for chunk in transcode_stream(_input(), output, input_format)])
+
+
+async def ffmpeg_decode(data: bytes, input_format: Optional[str] = None) -> bytes:
+    """
+    Decode any ffmpeg-supported audio to 16 kHz mono 16-bit PCM through pipes
+
+    Input is read through ffmpeg's cache protocol, so containers that need
+    seeking (e.g. MP4 with a trailing index) work without a temp file. Any
+    scratch files ffmpeg creates go to VOICE_TEMP_DIR.
+
+    Raises:
+        ValueError: If the audio cannot be decoded
+        RuntimeError: If ffmpeg is not installed
+    """
+    args = ["-f", input_format] if input_format else []
+    args += [
+        "-i", "cache:pipe:0",
+        "-f", "s16le",
+        "-acodec", "pcm_s16le",
+        "-ac", "1",
+        "-ar", str(TARGET_SAMPLE_RATE),
+        "pipe:1",
+    ]
+
+    process = await _spawn_ffmpeg(args)
+    pcm, error = await process.communicate(data)
+    if process.returncode != 0:
+        raise ValueError(f"Could not decode audio: {error.decode(errors='replace').strip()}")
+    return pcm
+
+
+async def decode_audio(data: bytes, input_format: Optional[str] = None) -> sr.AudioData:
+    """
+    Decode an audio file held in memory into 16 kHz mono PCM
+
+    Args:
+        data: Encoded audio file content
+        input_format: Optional ffmpeg format hint (e.g., 'webm', 'mp3')
+
+    Returns:
+        AudioData ready for recognition
+
+    Raises:
+        ValueError: If the audio cannot be decoded
+        RuntimeError: If ffmpeg is needed but not installed
+    """
+    if is_native_audio(data):
+        try:
+            return await asyncio.to_thread(read_native_audio, data)
+        except (ValueError, EOFError):
+            # Unusual WAV encodings (e.g. float, ADPCM) go through ffmpeg
+            pass
+
+    pcm = await ffmpeg_decode(data, input_format)
+    return sr.AudioData(pcm, TARGET_SAMPLE_RATE, SAMPLE_WIDTH)
@@ -0,0 +1,284 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from contextlib import asynccontextmanager, suppress
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from app.core.cache import LRUCache, MISSING
+from app.core.config import settings
+from app.core.redis import get_redis, mark_redis_unavailable, REDIS_ERRORS
+from app.services.recurrence_service import utcnow
+
+logger = logging.getLogger(__name__)
+
+# Change kinds and actions
+KIND_TASK = "task"
+KIND_EVENT = "event"
+ACTION_CREATED = "created"
+ACTION_UPDATED = "updated"
+ACTION_DELETED = "deleted"
+# Many objects changed at once (e.g. an import); clients should resync
+ACTION_RESET = "reset"
+
+# Queued after the last change of a subscription that has ended
+END_OF_STREAM = None
+
+# Assign the next sequence number, append to the capped log and publish
+PUBLISH_SCRIPT = """
+local seq = redis.call('INCR', KEYS[1])
+local message = '{"seq":' .. seq .. ',' .. string.sub(ARGV[1], 2)
+redis.call('ZADD', KEYS[2], seq, message)
+redis.call('ZREMRANGEBYRANK', KEYS[2], 0, -tonumber(ARGV[2]) - 1)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('PUBLISH', KEYS[3], message)
+return seq
+"""
+
+
+def _needs_reset(since: int, oldest: int, latest: int) -> bool:
+    """Whether changes after `since` can no longer be replayed from the log"""
+    if since > latest:
+        # The counter restarted (e.g. Redis was flushed)
+        return True
+    return since < latest and since + 1 < oldest
+
+
+class _LocalLog:
+    """Sequence counter and capped change log of one user (in-process backend)"""
+
+    def __init__(self):
+        self.seq = 0
+        self.entries: deque = deque(maxlen=settings.CHANGE_FEED_LOG_SIZE)
+
+
+class ChangeFeed:
+    """
+    Per-user feed of task and event changes
+
+    Every change gets a per-user sequence number and is appended to a
+    capped log of the last CHANGE_FEED_LOG_SIZE changes, so clients can
+    resume from the last sequence they saw. With the "redis" backend the
+    counter and log live in Redis and changes are fanned out through
+    pub/sub, one shared subscription connection per process. The
+    "memory" backend keeps everything in-process for single-node setups.
+    """
+
+    def __init__(self):
+        self._logs = LRUCache(maxsize=settings.CHANGE_FEED_LOCAL_USERS)
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._script = None
+
+    @property
+    def uses_redis(self) -> bool:
+        return settings.CHANGE_FEED_BACKEND == "redis"
+
+    def _keys(self, user_id: int) -> Tuple[str, str, str]:
+        return (
+            f"changes:seq:{user_id}",
+            f"changes:log:{user_id}",
+            f"changes:{user_id}",
+        )
+
+    def _local_log(self, user_id: int) -> _LocalLog:
+        log = self._logs.get(user_id)
+        if log is MISSING:
+            log = _LocalLog()
+            self._logs.set(user_id, log)
+        return log
+
+    # Publishing
+
+    def _change(self, kind: str, action: str, object_id: Optional[int], data: Any) -> Dict[str, Any]:
+        return {
+            "kind": kind,
+            "action": action,
+            "id": object_id,
+            "data": data,
+            "at": utcnow().isoformat(),
+        }
+
+    def _deliver(self, user_id: int, change: Dict[str, Any]):
+        """Hand a change to this process's subscribers of a user"""
+        for queue in self._subscribers.get(user_id, ()):
+            if queue.full():
+                # Slow consumer: drop its backlog and make it resync
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"seq": change.get("seq"), **self._change(change["kind"], ACTION_RESET, None, None)})
+            else:
+                queue.put_nowait(change)
+
+    async def publish_many(self, user_id: int, changes: List[Tuple[str, str, Optional[int], Any]]):
+        """
+        Publish changes of one user
+
+        Args:
+            user_id: Owner of the changed objects
+            changes: (kind, action, object id, serialized object or None) tuples
+        """
+        if not changes:
+            return
+
+        if not self.uses_redis:
+            log = self._local_log(user_id)
+            for kind, action, object_id, data in changes:
+                log.seq += 1
+                change = {"seq": log.seq, **self._change(kind, action, object_id, data)}
+                log.entries.append(change)
+                self._deliver(user_id, change)
+            return
+
+        redis = get_redis()
+        if redis is not None:
+            if self._script is None:
+                self._script = redis.register_script(PUBLISH_SCRIPT)
+            keys = list(self._keys(user_id))
+            try:
+                async with redis.pipeline(transaction=False) as pipe:
+                    for kind, action, object_id, data in changes:
+                        payload = json.dumps(self._change(kind, action, object_id, data), default=str)
+                        await self._script(
+                            keys=keys,
+                            args=[payload, settings.CHANGE_FEED_LOG_SIZE, settings.CHANGE_FEED_LOG_TTL],
+                            client=pipe,
+                        )
+                    await pipe.execute()
+                return
+            except REDIS_ERRORS as e:
+                mark_redis_unavailable(e)
+
+        # The change is lost for the feed; make local subscribers resync
+        logger.warning("Change feed unavailable, dropping %d changes of user %s", len(changes), user_id)
+        self._deliver(user_id, {"seq": None, **self._change(KIND_TASK, ACTION_RESET, None, None)})
+
+    async def publish(self, user_id: int, kind: str, action: str, object_id: Optional[int], data: Any = None):
+        """Publish a single change"""
+        await self.publish_many(user_id, [(kind, action, object_id, data)])
+
+    # Reading
+
+    async def changes_since(self, user_id: int, since: int) -> Tuple[List[Dict[str, Any]], int, bool]:
+        """
+        Changes with a sequence number above `since`
+
+        Returns:
+            (changes, latest sequence, reset) where reset means changes
+            after `since` are no longer in the log and the client must
+            reload everything
+        """
+        if not self.uses_redis:
+            log = self._local_log(user_id)
+            changes = [c for c in log.entries if c["seq"] > since]
+            oldest = log.entries[0]["seq"] if log.entries else log.seq + 1
+            return changes, log.seq, _needs_reset(since, oldest, log.seq)
+
+        redis = get_redis()
+        if redis is None:
+            return [], 0, True
+
+        seq_key, log_key, _ = self._keys(user_id)
+        try:
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.get(seq_key)
+                pipe.zrangebyscore(log_key, f"({since}", "+inf")
+                pipe.zrange(log_key, 0, 0, withscores=True)
+                latest, raw, oldest = await pipe.execute()
+        except REDIS_ERRORS as e:
+            mark_redis_unavailable(e)
+            return [], 0, True
+
+        latest = int(latest or 0)
+        oldest_seq = int(oldest[0][1]) if oldest else latest + 1
+        changes = [json.loads(item) for item in raw]
+        return changes, latest, _needs_reset(since, oldest_seq, latest)
+
+    # Subscribing
+
+    async def _subscribe_channel(self, channel: str):
+        """Subscribe the shared pub/sub connection and start its listener"""
+        if self._pubsub is None:
+            redis = get_redis()
+            if redis is None:
+                raise ConnectionError("Redis is unavailable")
+            self._pubsub = redis.pubsub()
+
+        try:
+            await self._pubsub.subscribe(channel)
+        except REDIS_ERRORS as e:
+            mark_redis_unavailable(e)
+            self._pubsub = None
+            raise
+
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen(self._pubsub))
+
+    async def _listen(self, pubsub):
+        """Fan out pub/sub messages to local subscribers"""
+        try:
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None or message.get("type") != "message":
+                    continue
+
+                channel = message["channel"]
+                channel = channel.decode() if isinstance(channel, bytes) else channel
+                with suppress(ValueError):
+                    self._deliver(int(channel.rsplit(":", 1)[1]), json.loads(message["data"]))
+        except REDIS_ERRORS as e:
+            mark_redis_unavailable(e)
+            self._pubsub = None
+            # Subscribers may have missed changes, and their channels went
+            # with the connection: end their streams so clients reconnect,
+            # which subscribes the channels again
+            reset = {"seq": None, **self._change(KIND_TASK, ACTION_RESET, None, None)}
+            for user_id in list(self._subscribers):
+                self._deliver(user_id, reset)
+                for queue in self._subscribers.pop(user_id):
+                    if queue.full():
+                        queue.get_nowait()
+                    queue.put_nowait(END_OF_STREAM)
+        finally:
+            with suppress(Exception):
+                await pubsub.aclose()
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[asyncio.Queue]:
+        """
+        Receive a user's changes as they are published
+
+        END_OF_STREAM is queued when the subscription ends (the Redis
+        connection was lost); the caller should stop reading and let the
+        client reconnect.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.CHANGE_FEED_QUEUE_SIZE)
+        first = user_id not in self._subscribers
+        self._subscribers.setdefault(user_id, set()).add(queue)
+
+        try:
+            if self.uses_redis and first:
+                await self._subscribe_channel(self._keys(user_id)[2])
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[user_id]
+                    if self.uses_redis and self._pubsub is not None:
+                        with suppress(*REDIS_ERRORS):
+                            await self._pubsub.unsubscribe(self._keys(user_id)[2])
+
+    async def close(self):
+        """Stop the pub/sub listener"""
+        if self._listener is not None:
+            self._listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+            self._pubsub = None
+
+
+change_feed = ChangeFeed()
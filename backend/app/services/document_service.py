@@ -1,15 +1,20 @@
 import os
 import asyncio
 from typing import Optional
-from PyPDF2 import PdfReader
-from docx import Document
-from PIL import Image
-import pytesseract
+from opentelemetry import trace
+from app.core.tracing import tracer
 from app.services.ai_factory import AIServiceFactory
 
 
 class DocumentService:
-    """Service for document analysis and processing"""
+    """
+    Service for document analysis and processing
+
+    The PDF, DOCX and OCR libraries are imported by their extractors on
+    first use, so they are only loaded by processes that handle documents.
+    Extraction and analysis are traced; extractor threads inherit the
+    caller's span through asyncio.to_thread().
+    """
 
     def __init__(self):
         self.supported_formats = {
@@ -41,17 +46,26 @@ class DocumentService:
             raise ValueError(f"Unsupported file format: {file_extension}")
 
         extractor = self.supported_formats[file_extension]
-        return await extractor(file_path)
+        with tracer.start_as_current_span(
+            "document.extract",
+            attributes={"document.format": file_extension, "document.size": os.path.getsize(file_path)},
+        ) as span:
+            text = await extractor(file_path)
+            span.set_attribute("document.text_length", len(text))
+            return text
 
     async def _extract_pdf(self, file_path: str) -> str:
         """Extract text from PDF"""
         def _extract():
+            from PyPDF2 import PdfReader
+
             text = ""
             reader = PdfReader(file_path)
 
             for page in reader.pages:
                 text += page.extract_text() + "\n"
 
+            trace.get_current_span().set_attribute("document.pages", len(reader.pages))
             return text.strip()
 
         return await asyncio.to_thread(_extract)
@@ -59,6 +73,8 @@ class DocumentService:
     async def _extract_docx(self, file_path: str) -> str:
         """Extract text from DOCX"""
         def _extract():
+            from docx import Document
+
             doc = Document(file_path)
             text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
             return text.strip()
@@ -76,9 +92,13 @@ class DocumentService:
     async def _extract_image(self, file_path: str) -> str:
         """Extract text from image using OCR"""
         def _extract():
+            from PIL import Image
+            import pytesseract
+
             try:
                 image = Image.open(file_path)
-                text = pytesseract.image_to_string(image, lang='tur+eng')
+                with tracer.start_as_current_span("document.ocr", attributes={"image.size": str(image.size)}):
+                    text = pytesseract.image_to_string(image, lang='tur+eng')
                 return text.strip()
             except Exception as e:
                 return f"Error extracting text from image: {str(e)}"
@@ -102,6 +122,15 @@ class DocumentService:
         Returns:
             Dictionary with extracted_text, summary, and analysis
         """
+        with tracer.start_as_current_span("document.analyze"):
+            return await self._analyze(file_path, custom_prompt, ai_provider)
+
+    async def _analyze(
+        self,
+        file_path: str,
+        custom_prompt: Optional[str],
+        ai_provider: Optional[str],
+    ) -> dict:
         # Extract text
         extracted_text = await self.extract_text(file_path)
 
@@ -0,0 +1,421 @@
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Set, Tuple
+from sqlalchemy import select
+from app.core.cache import LRUCache, MISSING
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.calendar import CalendarEvent
+from app.services.recurrence_service import (
+    recurrence_service,
+    MODE_OVERLAP,
+    ensure_aware,
+    not_expanded,
+    utcnow,
+    window_filter,
+)
+
+
+class _Node:
+    __slots__ = ("start", "end", "order", "key", "value", "priority", "left", "right", "max_end")
+
+    def __init__(self, start: float, end: float, order: int, key: Hashable, value: Any):
+        self.start = start
+        self.end = end
+        self.order = order
+        self.key = key
+        self.value = value
+        self.priority = random.random()
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+        self.max_end = end
+
+    def update(self):
+        self.max_end = self.end
+        if self.left is not None and self.left.max_end > self.max_end:
+            self.max_end = self.left.max_end
+        if self.right is not None and self.right.max_end > self.max_end:
+            self.max_end = self.right.max_end
+
+
+class IntervalTree:
+    """
+    Augmented treap of half-open intervals [start, end)
+
+    Nodes are ordered by start and carry the maximum end of their subtree,
+    so overlap queries prune every subtree that ends before the query
+    window. Insert, remove and query are O(log n) expected (plus the
+    number of reported intervals).
+    """
+
+    def __init__(self):
+        self._root: Optional[_Node] = None
+        self._nodes: Dict[Hashable, _Node] = {}
+        self._order = 0
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._nodes
+
+    def keys(self) -> List[Hashable]:
+        return list(self._nodes)
+
+    def insert(self, start: float, end: float, key: Hashable, value: Any = None):
+        """Insert an interval, replacing any interval with the same key"""
+        if key in self._nodes:
+            self.remove(key)
+
+        self._order += 1
+        node = _Node(start, end, self._order, key, value)
+        left, right = self._split(self._root, (start, node.order))
+        self._root = self._merge(self._merge(left, node), right)
+        self._nodes[key] = node
+
+    def remove(self, key: Hashable) -> bool:
+        """Remove an interval by key"""
+        node = self._nodes.pop(key, None)
+        if node is None:
+            return False
+
+        left, rest = self._split(self._root, (node.start, node.order))
+        _, right = self._split(rest, (node.start, node.order + 1))
+        self._root = self._merge(left, right)
+        return True
+
+    def overlap(self, start: float, end: float) -> List[Tuple[float, float, Hashable, Any]]:
+        """Intervals intersecting [start, end), sorted by start"""
+        found: List[Tuple[float, float, Hashable, Any]] = []
+        self._overlap(self._root, start, end, found)
+        return found
+
+    def __iter__(self) -> Iterator[Tuple[float, float, Hashable, Any]]:
+        stack: List[_Node] = []
+        node = self._root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield (node.start, node.end, node.key, node.value)
+            node = node.right
+
+    def _overlap(self, node: Optional[_Node], start: float, end: float, found: list):
+        while node is not None and node.max_end > start:
+            self._overlap(node.left, start, end, found)
+            if node.start >= end:
+                return
+            if node.end > start:
+                found.append((node.start, node.end, node.key, node.value))
+            node = node.right
+
+    def _split(self, node: Optional[_Node], pivot: Tuple[float, int]):
+        """Split into nodes ordered before pivot and the rest"""
+        if node is None:
+            return None, None
+
+        if (node.start, node.order) < pivot:
+            left, right = self._split(node.right, pivot)
+            node.right = left
+            node.update()
+            return node, right
+
+        left, right = self._split(node.left, pivot)
+        node.left = right
+        node.update()
+        return left, node
+
+    def _merge(self, left: Optional[_Node], right: Optional[_Node]) -> Optional[_Node]:
+        """Merge two treaps where every node of left precedes right"""
+        if left is None:
+            return right
+        if right is None:
+            return left
+
+        if left.priority > right.priority:
+            left.right = self._merge(left.right, right)
+            left.update()
+            return left
+
+        right.left = self._merge(left, right.left)
+        right.update()
+        return right
+
+
+@dataclass
+class BusyEntry:
+    """A busy interval with the event occupying it"""
+    start_time: datetime
+    end_time: datetime
+    event_id: int
+    title: str
+    recurrence_id: Optional[datetime] = None
+
+
+def _ts(value: datetime) -> float:
+    return ensure_aware(value).timestamp()
+
+
+def _dt(value: float) -> datetime:
+    return datetime.fromtimestamp(value, tz=timezone.utc)
+
+
+class _UserCalendar:
+    """Interval tree of one user's events over a covered range"""
+
+    def __init__(self, covered_from: datetime, covered_until: datetime):
+        self.tree = IntervalTree()
+        self.covered_from = covered_from
+        self.covered_until = covered_until
+        # Set when the user's events change while the tree is being built
+        self.stale = False
+        # Tree keys of each event, so an event is removed without a scan
+        self._event_keys: Dict[int, set] = {}
+
+    def covers(self, start: datetime, end: datetime) -> bool:
+        return self.covered_from <= start and end <= self.covered_until
+
+    def add(self, entry: BusyEntry):
+        key = (entry.event_id, entry.recurrence_id)
+        self.tree.insert(_ts(entry.start_time), _ts(entry.end_time), key, entry.title)
+        self._event_keys.setdefault(entry.event_id, set()).add(key)
+
+    def remove_event(self, event_id: int):
+        for key in self._event_keys.pop(event_id, ()):
+            self.tree.remove(key)
+
+
+class FreeBusyService:
+    """
+    Free/busy computation and conflict detection over a user's calendar
+
+    Each user's events, including recurring occurrences, are held in an
+    interval tree that covers the materialized recurrence range. Trees are
+    built on first use, updated incrementally through event_changed() and
+    event_deleted(), and expire after FREEBUSY_TREE_TTL so changes made on
+    other replicas are picked up. Windows outside the covered range are
+    answered straight from the database.
+    """
+
+    def __init__(self):
+        self._calendars = LRUCache(
+            maxsize=settings.FREEBUSY_CACHE_USERS,
+            ttl=settings.FREEBUSY_TREE_TTL,
+        )
+        # Trees being built per user, so builds racing with a change are not cached
+        self._building: Dict[int, Set[_UserCalendar]] = {}
+
+    async def _load_entries(self, user_id: int, start: datetime, end: datetime) -> List[BusyEntry]:
+        """Load the busy intervals of a user that overlap a window"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(
+                    CalendarEvent.id,
+                    CalendarEvent.title,
+                    CalendarEvent.start_time,
+                    CalendarEvent.end_time,
+                )
+                .where(
+                    CalendarEvent.user_id == user_id,
+                    window_filter(CalendarEvent, start, end, MODE_OVERLAP),
+                    not_expanded,
+                )
+            )
+            entries = [
+                BusyEntry(row.start_time, row.end_time, row.id, row.title)
+                for row in result.all()
+            ]
+
+            occurrences = await recurrence_service.get_occurrences(db, user_id, start, end, MODE_OVERLAP)
+            entries.extend(
+                BusyEntry(o.start_time, o.end_time, event.id, o.title or event.title, o.recurrence_id)
+                for event, o in occurrences
+            )
+
+        return entries
+
+    async def _calendar(self, user_id: int) -> _UserCalendar:
+        """Get or build the interval tree of a user"""
+        calendar = self._calendars.get(user_id)
+        if calendar is not MISSING:
+            return calendar
+
+        now = utcnow()
+        calendar = _UserCalendar(
+            now - timedelta(days=settings.RECURRENCE_PAST_DAYS),
+            now + timedelta(days=settings.RECURRENCE_HORIZON_DAYS),
+        )
+        building = self._building.setdefault(user_id, set())
+        building.add(calendar)
+        try:
+            for entry in await self._load_entries(user_id, calendar.covered_from, calendar.covered_until):
+                calendar.add(entry)
+        finally:
+            building.discard(calendar)
+            if not building:
+                del self._building[user_id]
+
+        if not calendar.stale:
+            self._calendars.set(user_id, calendar)
+        return calendar
+
+    def _changed(self, user_id: int):
+        for calendar in self._building.get(user_id, ()):
+            calendar.stale = True
+
+    async def busy_entries(self, user_id: int, start: datetime, end: datetime) -> List[BusyEntry]:
+        """Events of a user overlapping [start, end), sorted by start"""
+        start, end = ensure_aware(start), ensure_aware(end)
+        calendar = await self._calendar(user_id)
+
+        if not calendar.covers(start, end):
+            entries = await self._load_entries(user_id, start, end)
+            return sorted(entries, key=lambda e: e.start_time)
+
+        return [
+            BusyEntry(_dt(s), _dt(e), key[0], title, key[1])
+            for s, e, key, title in calendar.tree.overlap(_ts(start), _ts(end))
+        ]
+
+    async def busy(self, user_id: int, start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+        """Merged busy intervals of a user, clipped to [start, end)"""
+        start, end = ensure_aware(start), ensure_aware(end)
+        merged: List[List[datetime]] = []
+
+        for entry in await self.busy_entries(user_id, start, end):
+            entry_start = max(entry.start_time, start)
+            entry_end = min(entry.end_time, end)
+            if merged and entry_start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], entry_end)
+            else:
+                merged.append([entry_start, entry_end])
+
+        return [(s, e) for s, e in merged]
+
+    async def free(self, user_id: int, start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+        """Free intervals of a user inside [start, end)"""
+        start, end = ensure_aware(start), ensure_aware(end)
+        return self.gaps(await self.busy(user_id, start, end), start, end)
+
+    @staticmethod
+    def gaps(
+        busy: List[Tuple[datetime, datetime]],
+        start: datetime,
+        end: datetime,
+    ) -> List[Tuple[datetime, datetime]]:
+        """Free intervals inside [start, end) between sorted, merged busy intervals"""
+        free = []
+        cursor = start
+
+        for busy_start, busy_end in busy:
+            if busy_start > cursor:
+                free.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+
+        if cursor < end:
+            free.append((cursor, end))
+        return free
+
+    async def find_slots(
+        self,
+        user_id: int,
+        start: datetime,
+        end: datetime,
+        duration: timedelta,
+        limit: int = 5,
+        align_minutes: int = 15,
+    ) -> List[Tuple[datetime, datetime]]:
+        """
+        Suggest free slots of a given duration
+
+        Slot starts are rounded up to align_minutes. At most one slot is
+        suggested per free gap.
+        """
+        slots = []
+        align = timedelta(minutes=align_minutes) if align_minutes > 0 else None
+
+        for free_start, free_end in await self.free(user_id, start, end):
+            slot_start = free_start
+            if align:
+                epoch_offset = slot_start - datetime(1970, 1, 1, tzinfo=timezone.utc)
+                remainder = epoch_offset % align
+                if remainder:
+                    slot_start += align - remainder
+
+            if slot_start + duration <= free_end:
+                slots.append((slot_start, slot_start + duration))
+                if len(slots) >= limit:
+                    break
+
+        return slots
+
+    async def _event_entries(self, event: CalendarEvent, start: datetime, end: datetime) -> List[BusyEntry]:
+        """Busy intervals of one event (all its occurrences) overlapping a window"""
+        if not (event.is_recurring and event.recurrence_rule):
+            if ensure_aware(event.end_time) <= start or ensure_aware(event.start_time) >= end:
+                return []
+            return [BusyEntry(event.start_time, event.end_time, event.id, event.title)]
+
+        async with AsyncSessionLocal() as db:
+            overrides = await recurrence_service.load_overrides(db, event.id)
+
+        return [
+            BusyEntry(o.start_time, o.end_time, event.id, o.title or event.title, o.recurrence_id)
+            for o in recurrence_service.expand(event, start, end, MODE_OVERLAP, overrides)
+        ]
+
+    async def conflicts(self, event: CalendarEvent, limit: int = 20) -> List[BusyEntry]:
+        """
+        Events overlapping an event, excluding the event itself
+
+        Recurring events are checked occurrence by occurrence over the
+        covered range.
+        """
+        calendar = await self._calendar(event.user_id)
+        if event.is_recurring and event.recurrence_rule:
+            entries = await self._event_entries(event, calendar.covered_from, calendar.covered_until)
+        else:
+            entries = [BusyEntry(event.start_time, event.end_time, event.id, event.title)]
+
+        found = []
+        seen = set()
+        for entry in entries:
+            for other in await self.busy_entries(event.user_id, entry.start_time, entry.end_time):
+                key = (other.event_id, other.recurrence_id)
+                if other.event_id == event.id or key in seen:
+                    continue
+                seen.add(key)
+                found.append(other)
+                if len(found) >= limit:
+                    return found
+
+        return found
+
+    async def event_changed(self, event: CalendarEvent):
+        """Update the tree of the event's user after a create or update"""
+        self._changed(event.user_id)
+        calendar = self._calendars.get(event.user_id)
+        if calendar is MISSING:
+            return
+
+        entries = await self._event_entries(event, calendar.covered_from, calendar.covered_until)
+        calendar.remove_event(event.id)
+        for entry in entries:
+            calendar.add(entry)
+
+    def invalidate(self, user_id: int):
+        """Drop the tree of a user after bulk changes; it is rebuilt on next use"""
+        self._changed(user_id)
+        self._calendars.delete(user_id)
+
+    def event_deleted(self, user_id: int, event_id: int):
+        """Remove a deleted event from its user's tree"""
+        self._changed(user_id)
+        calendar = self._calendars.get(user_id)
+        if calendar is not MISSING:
+            calendar.remove_event(event_id)
+
+
+freebusy_service = FreeBusyService()
@@ -0,0 +1,553 @@
+import asyncio
+import codecs
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Optional, Union
+from icalendar import Alarm, Event, Timezone
+from icalendar.parser import foldline
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import selectinload
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.calendar import CalendarEvent, CalendarEventOverride, reminder_time
+from app.services.recurrence_service import recurrence_service, ensure_aware, get_zone, utcnow
+
+logger = logging.getLogger(__name__)
+
+# Content lines copied verbatim into CalendarEvent.recurrence_rule
+RECURRENCE_PROPERTIES = ("RRULE", "EXRULE", "RDATE", "EXDATE")
+
+# Fields written on import (and overwritten when a UID is imported again)
+EVENT_FIELDS = (
+    "title",
+    "description",
+    "location",
+    "start_time",
+    "end_time",
+    "all_day",
+    "reminder_minutes_before",
+    "reminder_at",
+    "is_recurring",
+    "recurrence_rule",
+    "tzid",
+)
+OVERRIDE_FIELDS = ("start_time", "end_time", "title", "description", "location", "is_cancelled")
+
+# Errors reported back to the client per import
+MAX_REPORTED_ERRORS = 50
+
+
+@dataclass
+class ImportResult:
+    """Outcome of an iCalendar import"""
+    created: int = 0
+    updated: int = 0
+    overrides: int = 0
+    skipped: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def skip(self, message: str):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(message)
+
+
+@dataclass
+class ParsedOverride:
+    """VEVENT with a RECURRENCE-ID, applied to its series after import"""
+    uid: str
+    recurrence_id: datetime
+    values: Dict[str, object]
+
+
+def _to_datetime(value: Union[date, datetime]) -> datetime:
+    """Convert an iCalendar DATE or DATE-TIME into an aware datetime"""
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+    return ensure_aware(value)
+
+
+def _describe(raw: str) -> str:
+    """Short label of a raw VEVENT for error messages"""
+    for line in raw.splitlines():
+        name, _, value = line.partition(":")
+        if name.partition(";")[0].upper() in ("UID", "SUMMARY"):
+            return value[:80]
+    return "VEVENT"
+
+
+def _tzid(component: Event, name: str) -> Optional[str]:
+    """IANA TZID parameter of a DATE-TIME property; None for UTC, floating or unknown zones"""
+    tzid = component[name].params.get("TZID")
+    if not tzid:
+        return None
+    try:
+        get_zone(tzid)
+    except ValueError:
+        return None
+    return tzid
+
+
+def _text(component: Event, name: str) -> Optional[str]:
+    value = component.get(name)
+    return str(value) if value is not None else None
+
+
+async def iter_content_lines(source, chunk_size: int = 65536) -> AsyncIterator[str]:
+    """
+    Yield unfolded content lines from an async file-like object
+
+    The source is read in chunks, so only the current line is kept in
+    memory.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    current: Optional[str] = None
+
+    while True:
+        chunk = await source.read(chunk_size)
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk, final=not chunk)
+        if not chunk:
+            break
+
+        pending += chunk
+        *lines, pending = pending.split("\n")
+
+        for line in lines:
+            line = line.rstrip("\r")
+            if line[:1] in (" ", "\t") and current is not None:
+                # Folded continuation of the previous line
+                current += line[1:]
+                continue
+            if current:
+                yield current
+            current = line
+
+    pending = pending.rstrip("\r")
+    if pending[:1] in (" ", "\t") and current is not None:
+        current += pending[1:]
+        pending = ""
+    if current:
+        yield current
+    if pending:
+        yield pending
+
+
+async def iter_vevents(source) -> AsyncIterator[str]:
+    """Yield the raw text of each top-level VEVENT (with nested VALARMs)"""
+    block: Optional[List[str]] = None
+    depth = 0
+
+    async for line in iter_content_lines(source):
+        upper = line.upper()
+
+        if block is None:
+            if upper == "BEGIN:VEVENT":
+                block = [line]
+                depth = 1
+            continue
+
+        block.append(line)
+        if upper.startswith("BEGIN:"):
+            depth += 1
+        elif upper.startswith("END:"):
+            depth -= 1
+            if depth == 0:
+                yield "\r\n".join(block) + "\r\n"
+                block = None
+
+
+class ICalService:
+    """Streaming iCalendar import and export of calendar events"""
+
+    def parse_vevent(self, raw: str) -> Union[Dict[str, object], ParsedOverride]:
+        """
+        Convert the raw text of a VEVENT into CalendarEvent column values
+
+        VEVENTs with a RECURRENCE-ID are returned as ParsedOverride.
+
+        Raises:
+            ValueError: If the VEVENT cannot be imported
+        """
+        component = Event.from_ical(raw)
+
+        if "DTSTART" not in component:
+            raise ValueError("missing DTSTART")
+
+        raw_start = component.decoded("DTSTART")
+        all_day = not isinstance(raw_start, datetime)
+        start_time = _to_datetime(raw_start)
+        # Recurrence rules repeat in the DTSTART timezone
+        tzid = None if all_day else _tzid(component, "DTSTART")
+
+        if "DTEND" in component:
+            end_time = _to_datetime(component.decoded("DTEND"))
+        elif "DURATION" in component:
+            end_time = start_time + component.decoded("DURATION")
+        else:
+            end_time = start_time + timedelta(days=1) if all_day else start_time
+
+        if start_time >= end_time:
+            raise ValueError("end must be after start")
+
+        values: Dict[str, object] = {
+            "title": _text(component, "SUMMARY") or "(No title)",
+            "description": _text(component, "DESCRIPTION"),
+            "location": _text(component, "LOCATION"),
+            "start_time": start_time,
+            "end_time": end_time,
+        }
+
+        uid = _text(component, "UID")
+        if "RECURRENCE-ID" in component:
+            if not uid:
+                raise ValueError("RECURRENCE-ID without UID")
+            values["is_cancelled"] = _text(component, "STATUS") == "CANCELLED"
+            return ParsedOverride(
+                uid=uid,
+                recurrence_id=_to_datetime(component.decoded("RECURRENCE-ID")),
+                values=values,
+            )
+
+        # Keep recurrence content lines verbatim; RecurrenceService parses them
+        rule_lines = [
+            line for line in raw.splitlines()
+            if line.partition(":")[0].partition(";")[0].upper() in RECURRENCE_PROPERTIES
+        ]
+        if len(rule_lines) == 1 and rule_lines[0].upper().startswith("RRULE:"):
+            recurrence_rule = rule_lines[0][len("RRULE:"):]
+        else:
+            recurrence_rule = "\n".join(rule_lines) or None
+
+        if recurrence_rule:
+            recurrence_service.validate(recurrence_rule, start_time, tzid)
+
+        reminder_minutes_before = 15
+        for alarm in component.walk("VALARM"):
+            trigger = alarm.decoded("TRIGGER") if "TRIGGER" in alarm else None
+            if isinstance(trigger, timedelta) and trigger <= timedelta(0):
+                reminder_minutes_before = int(-trigger.total_seconds() // 60)
+                break
+
+        values.update(
+            ical_uid=uid,
+            all_day=all_day,
+            reminder_minutes_before=reminder_minutes_before,
+            is_recurring=recurrence_rule is not None,
+            recurrence_rule=recurrence_rule,
+            tzid=tzid,
+            reminder_at=None if recurrence_rule else reminder_time(start_time, reminder_minutes_before),
+        )
+        return values
+
+    def _parse_batch(self, raws: List[str], result: ImportResult, overrides: List[ParsedOverride]):
+        """Parse a batch of VEVENTs (runs in a worker thread)"""
+        rows = {}
+        for raw in raws:
+            try:
+                parsed = self.parse_vevent(raw)
+            except Exception as e:
+                result.skip(f"{_describe(raw)}: {e}")
+                continue
+
+            if isinstance(parsed, ParsedOverride):
+                overrides.append(parsed)
+            else:
+                # One statement cannot upsert the same UID twice; the last copy wins
+                rows[parsed["ical_uid"] or object()] = parsed
+
+        return list(rows.values())
+
+    async def _write_events(self, user_id: int, rows: List[dict], result: ImportResult,
+                            uid_ids: Dict[str, int], refresh_ids: List[int]):
+        """Upsert a batch of events with one executemany statement"""
+        for row in rows:
+            row["user_id"] = user_id
+
+        stmt = pg_insert(CalendarEvent)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "ical_uid"],
+            index_where=CalendarEvent.ical_uid.isnot(None),
+            set_={
+                **{name: stmt.excluded[name] for name in EVENT_FIELDS},
+                "updated_at": func.now(),
+            },
+        ).returning(
+            CalendarEvent.id,
+            CalendarEvent.ical_uid,
+            CalendarEvent.is_recurring,
+            # xmax is 0 for freshly inserted rows
+            literal_column("xmax = 0").label("inserted"),
+        )
+
+        async with AsyncSessionLocal() as db:
+            returned = (await db.execute(stmt, rows)).all()
+            await db.commit()
+
+        for row in returned:
+            if row.inserted:
+                result.created += 1
+            else:
+                result.updated += 1
+            if row.ical_uid:
+                uid_ids[row.ical_uid] = row.id
+            # Updated events may have stopped recurring; their occurrences go too
+            if row.is_recurring or not row.inserted:
+                refresh_ids.append(row.id)
+
+    async def _write_overrides(self, user_id: int, overrides: List[ParsedOverride],
+                               result: ImportResult, uid_ids: Dict[str, int]):
+        """Attach RECURRENCE-ID VEVENTs to their series"""
+        async with AsyncSessionLocal() as db:
+            missing = {o.uid for o in overrides if o.uid not in uid_ids}
+            if missing:
+                found = await db.execute(
+                    select(CalendarEvent.ical_uid, CalendarEvent.id).where(
+                        CalendarEvent.user_id == user_id,
+                        CalendarEvent.ical_uid.in_(missing),
+                    )
+                )
+                uid_ids.update({row.ical_uid: row.id for row in found.all()})
+
+            rows = {}
+            for override in overrides:
+                event_id = uid_ids.get(override.uid)
+                if event_id is None:
+                    result.skip(f"RECURRENCE-ID for unknown UID {override.uid[:80]}")
+                    continue
+                rows[(event_id, override.recurrence_id)] = {
+                    "event_id": event_id,
+                    "recurrence_id": override.recurrence_id,
+                    **override.values,
+                }
+
+            if not rows:
+                return
+
+            stmt = pg_insert(CalendarEventOverride)
+            stmt = stmt.on_conflict_do_update(
+                constraint="uq_calendar_event_overrides_occurrence",
+                set_={name: stmt.excluded[name] for name in OVERRIDE_FIELDS},
+            )
+            await db.execute(stmt, list(rows.values()))
+            await db.commit()
+            result.overrides += len(rows)
+
+    async def _materialize(self, event_ids: List[int]):
+        """Materialize occurrences of imported recurring events in batches"""
+        batch_size = settings.ICAL_IMPORT_BATCH_SIZE
+
+        for i in range(0, len(event_ids), batch_size):
+            async with AsyncSessionLocal() as db:
+                events = await db.execute(
+                    select(CalendarEvent)
+                    .where(CalendarEvent.id.in_(event_ids[i:i + batch_size]))
+                    .options(selectinload(CalendarEvent.overrides))
+                )
+                for event in events.scalars().all():
+                    await recurrence_service.materialize(db, event, event.overrides)
+                await db.commit()
+
+    async def import_events(self, user_id: int, source) -> ImportResult:
+        """
+        Import VEVENTs from an .ics stream
+
+        The stream is parsed one VEVENT at a time and events are upserted
+        by UID in batches of ICAL_IMPORT_BATCH_SIZE, one transaction per
+        batch. Occurrence overrides (RECURRENCE-ID) are applied once all
+        series are written.
+
+        Args:
+            user_id: Owner of the imported events
+            source: Object with an async read(size) method (e.g. UploadFile)
+
+        Returns:
+            Counts of created, updated and skipped events
+        """
+        result = ImportResult()
+        overrides: List[ParsedOverride] = []
+        uid_ids: Dict[str, int] = {}
+        refresh_ids: List[int] = []
+        raws: List[str] = []
+
+        async def flush():
+            rows = await asyncio.to_thread(self._parse_batch, raws.copy(), result, overrides)
+            raws.clear()
+            if rows:
+                await self._write_events(user_id, rows, result, uid_ids, refresh_ids)
+
+        async for raw in iter_vevents(source):
+            raws.append(raw)
+            if len(raws) >= settings.ICAL_IMPORT_BATCH_SIZE:
+                await flush()
+        await flush()
+
+        if overrides:
+            await self._write_overrides(user_id, overrides, result, uid_ids)
+            refresh_ids.extend(uid_ids[o.uid] for o in overrides if o.uid in uid_ids)
+
+        await self._materialize(sorted(set(refresh_ids)))
+
+        logger.info(
+            "Imported calendar for user %s: %d created, %d updated, %d skipped",
+            user_id, result.created, result.updated, result.skipped,
+        )
+        return result
+
+    # Export
+
+    def _uid(self, event_id: int, ical_uid: Optional[str]) -> str:
+        return ical_uid or f"event-{event_id}@personal-assistant"
+
+    def _zone(self, tzid: Optional[str]):
+        # Times of events without a timezone are written in UTC
+        return get_zone(tzid) if tzid else timezone.utc
+
+    def _add_times(self, vevent: Event, start_time: datetime, end_time: datetime, all_day: bool,
+                   tzid: Optional[str] = None):
+        if all_day:
+            vevent.add("DTSTART", ensure_aware(start_time).date())
+            vevent.add("DTEND", max(ensure_aware(end_time).date(), ensure_aware(start_time).date() + timedelta(days=1)))
+        else:
+            # In the event's timezone, which its RRULE and TZID EXDATEs are relative to
+            vevent.add("DTSTART", ensure_aware(start_time).astimezone(self._zone(tzid)))
+            vevent.add("DTEND", ensure_aware(end_time).astimezone(self._zone(tzid)))
+
+    def event_to_ical(self, row, stamp: datetime) -> bytes:
+        """Serialize an event row into a VEVENT"""
+        vevent = Event()
+        vevent.add("UID", self._uid(row.id, row.ical_uid))
+        vevent.add("DTSTAMP", stamp)
+        vevent.add("SUMMARY", row.title)
+        self._add_times(vevent, row.start_time, row.end_time, row.all_day, row.tzid)
+        if row.description:
+            vevent.add("DESCRIPTION", row.description)
+        if row.location:
+            vevent.add("LOCATION", row.location)
+
+        if row.reminder_minutes_before is not None:
+            alarm = Alarm()
+            alarm.add("ACTION", "DISPLAY")
+            alarm.add("DESCRIPTION", row.title)
+            alarm.add("TRIGGER", timedelta(minutes=-row.reminder_minutes_before))
+            vevent.add_component(alarm)
+
+        ical = vevent.to_ical()
+        if not (row.is_recurring and row.recurrence_rule):
+            return ical
+
+        # Recurrence lines are stored as iCalendar content lines already
+        lines = [
+            line if ":" in line else f"RRULE:{line}"
+            for line in (line.strip() for line in row.recurrence_rule.splitlines())
+            if line
+        ]
+        rule = "".join(foldline(line) + "\r\n" for line in lines).encode("utf-8")
+        end = ical.rindex(b"END:VEVENT")
+        return ical[:end] + rule + ical[end:]
+
+    def override_to_ical(self, row, stamp: datetime) -> bytes:
+        """Serialize an occurrence override into a VEVENT with RECURRENCE-ID"""
+        duration = row.series_end - row.series_start
+        start_time = row.start_time or row.recurrence_id
+        end_time = row.end_time or start_time + duration
+
+        vevent = Event()
+        vevent.add("UID", self._uid(row.event_id, row.ical_uid))
+        vevent.add("DTSTAMP", stamp)
+        if row.all_day:
+            vevent.add("RECURRENCE-ID", ensure_aware(row.recurrence_id).date())
+        else:
+            vevent.add("RECURRENCE-ID", ensure_aware(row.recurrence_id).astimezone(self._zone(row.tzid)))
+        vevent.add("SUMMARY", row.title or row.series_title)
+        self._add_times(vevent, start_time, end_time, row.all_day, row.tzid)
+        if row.description:
+            vevent.add("DESCRIPTION", row.description)
+        if row.location:
+            vevent.add("LOCATION", row.location)
+        if row.is_cancelled:
+            vevent.add("STATUS", "CANCELLED")
+        return vevent.to_ical()
+
+    async def export_events(self, user_id: int) -> AsyncIterator[bytes]:
+        """
+        Stream a user's calendar as an .ics document
+
+        Rows are read through a server-side cursor ICAL_EXPORT_FETCH_SIZE
+        at a time, and each batch is sent as one chunk. A VTIMEZONE is
+        written first for each timezone the events use.
+        """
+        stamp = utcnow().replace(microsecond=0)
+        fetch_size = settings.ICAL_EXPORT_FETCH_SIZE
+
+        yield (
+            "BEGIN:VCALENDAR\r\n"
+            "VERSION:2.0\r\n"
+            f"PRODID:-//{settings.APP_NAME}//{settings.APP_VERSION}//EN\r\n"
+            "CALSCALE:GREGORIAN\r\n"
+        ).encode("utf-8")
+
+        async with AsyncSessionLocal() as db:
+            tzids = await db.scalars(
+                select(CalendarEvent.tzid)
+                .where(CalendarEvent.user_id == user_id, CalendarEvent.tzid.isnot(None))
+                .distinct()
+                .order_by(CalendarEvent.tzid)
+            )
+            for tzid in tzids:
+                yield Timezone.from_tzid(tzid).to_ical()
+
+            events = await db.stream(
+                select(
+                    CalendarEvent.id,
+                    CalendarEvent.ical_uid,
+                    CalendarEvent.title,
+                    CalendarEvent.description,
+                    CalendarEvent.location,
+                    CalendarEvent.start_time,
+                    CalendarEvent.end_time,
+                    CalendarEvent.all_day,
+                    CalendarEvent.reminder_minutes_before,
+                    CalendarEvent.is_recurring,
+                    CalendarEvent.recurrence_rule,
+                    CalendarEvent.tzid,
+                )
+                .where(CalendarEvent.user_id == user_id)
+                .order_by(CalendarEvent.id)
+                .execution_options(yield_per=fetch_size)
+            )
+            async for partition in events.partitions():
+                yield b"".join(self.event_to_ical(row, stamp) for row in partition)
+
+            overrides = await db.stream(
+                select(
+                    CalendarEventOverride.event_id,
+                    CalendarEventOverride.recurrence_id,
+                    CalendarEventOverride.start_time,
+                    CalendarEventOverride.end_time,
+                    CalendarEventOverride.title,
+                    CalendarEventOverride.description,
+                    CalendarEventOverride.location,
+                    CalendarEventOverride.is_cancelled,
+                    CalendarEvent.ical_uid,
+                    CalendarEvent.all_day,
+                    CalendarEvent.tzid,
+                    CalendarEvent.title.label("series_title"),
+                    CalendarEvent.start_time.label("series_start"),
+                    CalendarEvent.end_time.label("series_end"),
+                )
+                .join(CalendarEvent, CalendarEvent.id == CalendarEventOverride.event_id)
+                .where(CalendarEvent.user_id == user_id)
+                .order_by(CalendarEventOverride.event_id, CalendarEventOverride.recurrence_id)
+                .execution_options(yield_per=fetch_size)
+            )
+            async for partition in overrides.partitions():
+                yield b"".join(self.override_to_ical(row, stamp) for row in partition)
+
+        yield b"END:VCALENDAR\r\n"
+
+
+ical_service = ICalService()
@@ -0,0 +1,543 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from dateutil import parser as date_parser
+from dateutil import tz
+from dateutil.rrule import rrulestr, rruleset
+from sqlalchemy import select, delete, insert, and_, or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.core.cache import LRUCache, MISSING
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.calendar import (
+    CalendarEvent,
+    CalendarEventOverride,
+    CalendarEventOccurrence,
+    reminder_time,
+)
+
+logger = logging.getLogger(__name__)
+
+# Lower bound for open-ended range queries
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Window matching modes
+MODE_CONTAINED = "contained"  # occurrence lies entirely inside the window
+MODE_STARTS = "starts"  # occurrence starts inside the window
+MODE_OVERLAP = "overlap"  # occurrence intersects the half-open window [start, end)
+
+
+@dataclass
+class Occurrence:
+    """A single (possibly overridden) occurrence of an event"""
+    event_id: int
+    recurrence_id: datetime
+    start_time: datetime
+    end_time: datetime
+    title: Optional[str] = None
+    description: Optional[str] = None
+    location: Optional[str] = None
+
+
+def ensure_aware(value: datetime) -> datetime:
+    """Treat naive datetimes as UTC"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def get_zone(name: Optional[str]) -> ZoneInfo:
+    """
+    Resolve an IANA timezone name
+
+    Raises:
+        ValueError: If the timezone is unknown
+    """
+    try:
+        return ZoneInfo(name or "UTC")
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {name}")
+
+
+def matches_window(
+    start: datetime,
+    end: datetime,
+    window_start: datetime,
+    window_end: datetime,
+    mode: str = MODE_CONTAINED,
+) -> bool:
+    """Check an interval against a window using the given mode"""
+    if mode == MODE_STARTS:
+        return window_start <= start <= window_end
+    if mode == MODE_OVERLAP:
+        return start < window_end and end > window_start
+    return start >= window_start and end <= window_end
+
+
+# Events that are returned as stored rather than expanded
+not_expanded = or_(
+    CalendarEvent.is_recurring.isnot(True),
+    CalendarEvent.recurrence_rule.is_(None),
+)
+
+
+def window_filter(
+    model,
+    window_start: Optional[datetime],
+    window_end: Optional[datetime],
+    mode: str = MODE_CONTAINED,
+):
+    """
+    SQL equivalent of matches_window() for a model with start/end columns
+
+    Overlap mode uses the `&&` operator on the GiST-indexed time_range
+    column. A None bound is open-ended.
+    """
+    if mode == MODE_OVERLAP:
+        return model.time_range.op("&&")(func.tstzrange(window_start, window_end, "[)"))
+
+    conditions = []
+    if window_start is not None:
+        conditions.append(model.start_time >= window_start)
+    if window_end is not None:
+        column = model.start_time if mode == MODE_STARTS else model.end_time
+        conditions.append(column <= window_end)
+    return and_(*conditions)
+
+
+class RecurrenceService:
+    """Service for expanding and materializing recurring calendar events"""
+
+    def __init__(self):
+        self._rules = LRUCache(maxsize=settings.RECURRENCE_CACHE_SIZE)
+        self._windows = LRUCache(maxsize=settings.RECURRENCE_CACHE_SIZE)
+
+    def parse_rule(self, rule: str, dtstart: datetime, tzid: Optional[str] = None) -> rruleset:
+        """
+        Parse an iCalendar recurrence definition
+
+        Accepts a bare RRULE value ("FREQ=WEEKLY;BYDAY=MO") or content
+        lines (RRULE, EXRULE, RDATE, EXDATE), one per line. The rule is
+        expanded in the event's timezone (tzid, UTC if None), so a 09:00
+        series stays at 09:00 local time across DST changes. Naive dates
+        in RDATE/EXDATE use their TZID parameter or the event's timezone.
+
+        Raises:
+            ValueError: If the rule or the timezone cannot be parsed
+        """
+        dtstart = ensure_aware(dtstart).astimezone(get_zone(tzid))
+        # Equal instants in different zones compare (and hash) equal
+        key = (rule, dtstart, tzid)
+        cached = self._rules.get(key)
+        if cached is not MISSING:
+            return cached
+
+        rset = rruleset()
+        has_rule = False
+
+        for line in rule.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+
+            if ":" in line:
+                name, _, value = line.partition(":")
+            else:
+                name, value = "RRULE", line
+
+            prop, *params = name.upper().split(";")
+
+            if prop in ("RRULE", "EXRULE"):
+                parsed = rrulestr(value, dtstart=dtstart)
+                if prop == "RRULE":
+                    rset.rrule(parsed)
+                    has_rule = True
+                else:
+                    rset.exrule(parsed)
+            elif prop in ("RDATE", "EXDATE"):
+                tzinfo = dtstart.tzinfo
+                for param in params:
+                    if param.startswith("TZID="):
+                        tzinfo = tz.gettz(param[5:]) or tzinfo
+
+                for raw in value.split(","):
+                    date = date_parser.parse(raw)
+                    if date.tzinfo is None:
+                        date = date.replace(tzinfo=tzinfo)
+                    if prop == "RDATE":
+                        rset.rdate(date)
+                        has_rule = True
+                    else:
+                        rset.exdate(date)
+            elif prop != "DTSTART":
+                raise ValueError(f"Unsupported recurrence property: {prop}")
+
+        if not has_rule:
+            raise ValueError("Recurrence rule has no RRULE or RDATE")
+
+        self._rules.set(key, rset)
+        return rset
+
+    def validate(self, rule: str, dtstart: datetime, tzid: Optional[str] = None):
+        """
+        Validate a recurrence rule against its start time and timezone
+
+        Raises:
+            ValueError: If the rule or the timezone is invalid
+        """
+        rset = self.parse_rule(rule, dtstart, tzid)
+        # Force evaluation so UNTIL/timezone mismatches surface here
+        next(iter(rset), None)
+
+    def expand(
+        self,
+        event: CalendarEvent,
+        window_start: datetime,
+        window_end: datetime,
+        mode: str = MODE_CONTAINED,
+        overrides: Iterable[CalendarEventOverride] = (),
+    ) -> List[Occurrence]:
+        """
+        Compute the occurrences of an event inside a window
+
+        Only the requested window is expanded. Results are cached per event,
+        rule, window and override set. Cancelled occurrences are skipped and
+        moved occurrences are matched by their new times.
+
+        Args:
+            event: Calendar event (recurring or not)
+            window_start: Window start
+            window_end: Window end
+            mode: MODE_CONTAINED, MODE_STARTS or MODE_OVERLAP
+            overrides: Overrides of the event
+
+        Returns:
+            Occurrences sorted by start time
+        """
+        window_start = ensure_aware(window_start)
+        window_end = ensure_aware(window_end)
+        start_time = ensure_aware(event.start_time)
+        end_time = ensure_aware(event.end_time)
+
+        if not event.is_recurring or not event.recurrence_rule:
+            if not matches_window(start_time, end_time, window_start, window_end, mode):
+                return []
+            return [Occurrence(event.id, start_time, start_time, end_time)]
+
+        overrides = {ensure_aware(o.recurrence_id): o for o in overrides}
+        key = (
+            event.id,
+            event.recurrence_rule,
+            event.tzid,
+            start_time,
+            end_time,
+            window_start,
+            window_end,
+            mode,
+            tuple(sorted(
+                (rid, o.start_time, o.end_time, o.title, o.description, o.location, o.is_cancelled)
+                for rid, o in overrides.items()
+            )),
+        )
+        cached = self._windows.get(key)
+        if cached is not MISSING:
+            return cached
+
+        rset = self.parse_rule(event.recurrence_rule, start_time, event.tzid)
+        duration = end_time - start_time
+        occurrences = []
+        seen = set()
+
+        # Overlapping occurrences may start up to one duration before the window
+        first_start = window_start - duration if mode == MODE_OVERLAP else window_start
+
+        for recurrence_id in rset.xafter(first_start, inc=True):
+            if recurrence_id > window_end or len(occurrences) >= settings.RECURRENCE_MAX_OCCURRENCES:
+                break
+
+            # Expanded in local time, returned in UTC like stored times
+            recurrence_id = recurrence_id.astimezone(timezone.utc)
+
+            seen.add(recurrence_id)
+            occurrence = self._build(event, recurrence_id, duration, overrides.get(recurrence_id))
+            if occurrence and matches_window(
+                occurrence.start_time, occurrence.end_time, window_start, window_end, mode
+            ):
+                occurrences.append(occurrence)
+
+        # Occurrences moved into the window from outside of it
+        for recurrence_id, override in overrides.items():
+            if recurrence_id in seen or override.is_cancelled or override.start_time is None:
+                continue
+
+            occurrence = self._build(event, recurrence_id, duration, override)
+            if matches_window(
+                occurrence.start_time, occurrence.end_time, window_start, window_end, mode
+            ) and recurrence_id in rset:
+                occurrences.append(occurrence)
+
+        occurrences.sort(key=lambda o: o.start_time)
+        self._windows.set(key, occurrences)
+        return occurrences
+
+    def _build(
+        self,
+        event: CalendarEvent,
+        recurrence_id: datetime,
+        duration: timedelta,
+        override: Optional[CalendarEventOverride],
+    ) -> Optional[Occurrence]:
+        """Build an occurrence, applying its override if any"""
+        if override is None:
+            return Occurrence(event.id, recurrence_id, recurrence_id, recurrence_id + duration)
+
+        if override.is_cancelled:
+            return None
+
+        start = ensure_aware(override.start_time) if override.start_time else recurrence_id
+        end = ensure_aware(override.end_time) if override.end_time else start + duration
+
+        return Occurrence(
+            event_id=event.id,
+            recurrence_id=recurrence_id,
+            start_time=start,
+            end_time=end,
+            title=override.title,
+            description=override.description,
+            location=override.location,
+        )
+
+    def _horizon(self) -> Tuple[datetime, datetime]:
+        """Range materialized from now on"""
+        now = utcnow()
+        return (
+            now - timedelta(days=settings.RECURRENCE_PAST_DAYS),
+            now + timedelta(days=settings.RECURRENCE_HORIZON_DAYS),
+        )
+
+    async def load_overrides(self, db: AsyncSession, event_id: int) -> List[CalendarEventOverride]:
+        """Load the overrides of an event"""
+        result = await db.execute(
+            select(CalendarEventOverride).where(CalendarEventOverride.event_id == event_id)
+        )
+        return list(result.scalars().all())
+
+    async def materialize(
+        self,
+        db: AsyncSession,
+        event: CalendarEvent,
+        overrides: Optional[Iterable[CalendarEventOverride]] = None,
+    ):
+        """
+        Replace the materialized occurrences of an event
+
+        Occurrences starting between RECURRENCE_PAST_DAYS ago and
+        RECURRENCE_HORIZON_DAYS ahead are written to the occurrences table.
+        The covered range is stored on the event so range queries know
+        when they can use the table.
+
+        A new event may be passed before it is flushed: its coverage is then
+        part of its INSERT and there are no old occurrences to delete.
+        """
+        if event.id is not None:
+            await db.execute(
+                delete(CalendarEventOccurrence).where(CalendarEventOccurrence.event_id == event.id)
+            )
+
+        if not event.is_recurring or not event.recurrence_rule:
+            event.occurrences_from = None
+            event.occurrences_until = None
+            return
+
+        if overrides is None:
+            overrides = await self.load_overrides(db, event.id)
+
+        covered_from, covered_until = self._horizon()
+
+        occurrences = self.expand(event, covered_from, covered_until, MODE_STARTS, overrides)
+
+        # Only claim coverage up to the last occurrence if expansion was capped
+        if len(occurrences) >= settings.RECURRENCE_MAX_OCCURRENCES:
+            covered_until = occurrences[-1].start_time
+
+        event.occurrences_from = covered_from
+        event.occurrences_until = covered_until
+
+        if occurrences:
+            if event.id is None:
+                await db.flush()
+            await db.execute(
+                insert(CalendarEventOccurrence),
+                [
+                    {
+                        "event_id": event.id,
+                        "user_id": event.user_id,
+                        "recurrence_id": o.recurrence_id,
+                        "start_time": o.start_time,
+                        "end_time": o.end_time,
+                        "title": o.title,
+                        "description": o.description,
+                        "location": o.location,
+                        "reminder_at": reminder_time(o.start_time, event.reminder_minutes_before),
+                    }
+                    for o in occurrences
+                ],
+            )
+
+    async def get_occurrences(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        window_start: datetime,
+        window_end: datetime,
+        mode: str = MODE_CONTAINED,
+    ) -> List[Tuple[CalendarEvent, Occurrence]]:
+        """
+        Get the occurrences of a user's recurring events inside a window
+
+        Events whose materialized range covers the window are served from
+        the indexed occurrences table. The rest are expanded on the fly.
+
+        Returns:
+            (event, occurrence) pairs sorted by start time
+        """
+        window_start = ensure_aware(window_start)
+        window_end = ensure_aware(window_end)
+
+        # Overlapping occurrences may start up to one duration before the window
+        covered_from = CalendarEvent.occurrences_from
+        if mode == MODE_OVERLAP:
+            covered_from = covered_from + (CalendarEvent.end_time - CalendarEvent.start_time)
+
+        covered = and_(
+            covered_from <= window_start,
+            CalendarEvent.occurrences_until >= window_end,
+        )
+
+        # Materialized occurrences
+        result = await db.execute(
+            select(CalendarEventOccurrence, CalendarEvent)
+            .join(CalendarEvent, CalendarEvent.id == CalendarEventOccurrence.event_id)
+            .where(
+                CalendarEventOccurrence.user_id == user_id,
+                window_filter(CalendarEventOccurrence, window_start, window_end, mode),
+                covered,
+            )
+        )
+        pairs = [
+            (
+                event,
+                Occurrence(
+                    event_id=event.id,
+                    recurrence_id=row.recurrence_id,
+                    start_time=row.start_time,
+                    end_time=row.end_time,
+                    title=row.title,
+                    description=row.description,
+                    location=row.location,
+                ),
+            )
+            for row, event in result.all()
+        ]
+
+        # Recurring events not covered by the materialized range
+        result = await db.execute(
+            select(CalendarEvent)
+            .where(
+                CalendarEvent.user_id == user_id,
+                CalendarEvent.is_recurring.is_(True),
+                CalendarEvent.recurrence_rule.isnot(None),
+                CalendarEvent.start_time <= window_end,
+                or_(
+                    CalendarEvent.occurrences_from.is_(None),
+                    CalendarEvent.occurrences_until.is_(None),
+                    ~covered,
+                ),
+            )
+            .options(selectinload(CalendarEvent.overrides))
+        )
+        for event in result.scalars().all():
+            try:
+                occurrences = self.expand(event, window_start, window_end, mode, event.overrides)
+            except ValueError as e:
+                logger.warning("Skipping event %s with invalid recurrence rule: %s", event.id, e)
+                continue
+            pairs.extend((event, occurrence) for occurrence in occurrences)
+
+        pairs.sort(key=lambda pair: pair[1].start_time)
+        return pairs
+
+    async def refresh_horizons(self, batch_size: int = 100) -> int:
+        """
+        Extend the materialized range of recurring events
+
+        Events materialized more than half a horizon ago (or never) are
+        re-materialized in batches. The age comes from occurrences_from,
+        which unlike occurrences_until is not cut short when expansion is
+        capped at RECURRENCE_MAX_OCCURRENCES. Events with an invalid rule
+        are covered with no occurrences, so they are not retried every
+        interval either.
+
+        Returns:
+            Number of refreshed events
+        """
+        threshold = self._horizon()[0] - timedelta(days=settings.RECURRENCE_HORIZON_DAYS / 2)
+        refreshed = 0
+        last_id = 0
+
+        while True:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(CalendarEvent)
+                    .where(
+                        CalendarEvent.id > last_id,
+                        CalendarEvent.is_recurring.is_(True),
+                        CalendarEvent.recurrence_rule.isnot(None),
+                        or_(
+                            CalendarEvent.occurrences_from.is_(None),
+                            CalendarEvent.occurrences_from < threshold,
+                        ),
+                    )
+                    .options(selectinload(CalendarEvent.overrides))
+                    .order_by(CalendarEvent.id)
+                    .limit(batch_size)
+                )
+                events = result.scalars().all()
+
+                if not events:
+                    return refreshed
+
+                for event in events:
+                    try:
+                        await self.materialize(db, event, event.overrides)
+                        refreshed += 1
+                    except ValueError as e:
+                        logger.warning("Cannot materialize event %s: %s", event.id, e)
+                        # Its old occurrences are deleted; expansion skips it too
+                        event.occurrences_from, event.occurrences_until = self._horizon()
+
+                last_id = events[-1].id
+                await db.commit()
+
+    async def run_refresh_loop(self):
+        """Periodically refresh materialized horizons (runs in lifespan)"""
+        while True:
+            try:
+                refreshed = await self.refresh_horizons()
+                if refreshed:
+                    logger.info("Refreshed occurrences of %d recurring events", refreshed)
+            except Exception:
+                logger.exception("Recurrence horizon refresh failed")
+
+            await asyncio.sleep(settings.RECURRENCE_REFRESH_INTERVAL)
+
+
+recurrence_service = RecurrenceService()
@@ -0,0 +1,413 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import socket
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.core.redis import get_redis, mark_redis_unavailable, REDIS_ERRORS
+from app.models.calendar import CalendarEvent, CalendarEventOccurrence
+from app.models.task import Task, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+# Task statuses that no longer need a reminder
+DONE_STATUSES = (TaskStatus.COMPLETED, TaskStatus.CANCELLED)
+
+ReminderKey = Tuple[str, int, Optional[datetime]]
+
+
+@dataclass
+class Reminder:
+    """A reminder that is due at fire_at"""
+    kind: str  # "task" or "event"
+    source_id: int
+    user_id: int
+    fire_at: datetime
+    title: str
+    # Event start (events) or due date (tasks)
+    starts_at: Optional[datetime] = None
+    # Occurrence of a recurring event
+    recurrence_id: Optional[datetime] = None
+
+    @property
+    def key(self) -> ReminderKey:
+        return (self.kind, self.source_id, self.recurrence_id)
+
+    @property
+    def text(self) -> str:
+        """Human readable reminder text"""
+        if self.kind == "event" and self.starts_at:
+            return f"Reminder: {self.title} starts at {self.starts_at:%H:%M}"
+        return f"Reminder: {self.title}"
+
+
+ReminderHandler = Callable[[Reminder], Awaitable[None]]
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class ReminderScheduler:
+    """
+    In-process scheduler for task and event reminders
+
+    Only reminders due within the next REMINDER_LOAD_WINDOW seconds are
+    held in memory, in a heap ordered by fire time. Each window is
+    loaded with indexed range queries on tasks.reminder_date and
+    reminder_at, so the full table is never scanned. Routers call
+    task_changed()/event_changed() after a commit to keep the heap
+    current. Replaced entries are dropped lazily when popped.
+
+    With several replicas, each reminder is claimed in Redis (SET NX)
+    before it fires. When Redis is unavailable, only the replica holding
+    a Postgres advisory lock fires reminders.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Reminder]] = []
+        self._entries: Dict[ReminderKey, datetime] = {}
+        self._counter = itertools.count()
+        self._handlers: List[ReminderHandler] = []
+        self._wakeup = asyncio.Event()
+        self._loaded_until: Optional[datetime] = None
+        self._leader_conn: Optional[AsyncConnection] = None
+        self._firing: set = set()
+        self._node_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    def add_handler(self, handler: ReminderHandler):
+        """Register a coroutine called with each fired reminder"""
+        self._handlers.append(handler)
+
+    def upcoming(self, within: float) -> List[Reminder]:
+        """Reminders held in memory that fire within the next `within` seconds"""
+        horizon = utcnow() + timedelta(seconds=within)
+        return sorted(
+            (
+                reminder
+                for _, _, reminder in self._heap
+                if self._entries.get(reminder.key) == reminder.fire_at and reminder.fire_at <= horizon
+            ),
+            key=lambda r: r.fire_at,
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # Scheduling
+
+    def _push(self, reminder: Reminder):
+        """Add or replace a reminder if it falls inside the loaded window"""
+        now = utcnow()
+        if reminder.fire_at < now or self._loaded_until is None or reminder.fire_at >= self._loaded_until:
+            # Outside the window; the next window load picks it up from the database
+            self._entries.pop(reminder.key, None)
+            return
+
+        self._entries[reminder.key] = reminder.fire_at
+        heapq.heappush(self._heap, (reminder.fire_at.timestamp(), next(self._counter), reminder))
+
+        if self._heap[0][2] is reminder:
+            self._wakeup.set()
+
+    def _remove(self, kind: str, source_id: int):
+        """Forget every reminder of a task or event"""
+        for key in [k for k in self._entries if k[0] == kind and k[1] == source_id]:
+            del self._entries[key]
+
+    async def task_changed(self, task: Task):
+        """Refresh the reminder of a created or updated task"""
+        self._remove("task", task.id)
+
+        if task.reminder_date is None or task.status in DONE_STATUSES:
+            return
+
+        self._push(Reminder(
+            kind="task",
+            source_id=task.id,
+            user_id=task.user_id,
+            fire_at=task.reminder_date,
+            title=task.title,
+            starts_at=task.due_date,
+        ))
+
+    def task_deleted(self, task_id: int):
+        """Drop the reminder of a deleted task"""
+        self._remove("task", task_id)
+
+    async def event_changed(self, event: CalendarEvent):
+        """Refresh the reminders of a created or updated event"""
+        self._remove("event", event.id)
+
+        if self._loaded_until is None:
+            return
+
+        if not (event.is_recurring and event.recurrence_rule):
+            if event.reminder_at is not None:
+                self._push(Reminder(
+                    kind="event",
+                    source_id=event.id,
+                    user_id=event.user_id,
+                    fire_at=event.reminder_at,
+                    title=event.title,
+                    starts_at=event.start_time,
+                ))
+            return
+
+        # Recurring events: reload the occurrences inside the loaded window
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                self._occurrence_query(utcnow(), self._loaded_until)
+                .where(CalendarEventOccurrence.event_id == event.id)
+            )
+            for reminder in self._occurrence_reminders(result):
+                self._push(reminder)
+
+    def event_deleted(self, event_id: int):
+        """Drop the reminders of a deleted event"""
+        self._remove("event", event_id)
+
+    async def reload(self):
+        """Reload the current window after bulk changes (e.g. an import)"""
+        if self._loaded_until is not None:
+            await self._load_window(utcnow(), self._loaded_until)
+
+    # Loading
+
+    def _task_query(self, start: datetime, end: datetime):
+        return (
+            select(Task.id, Task.user_id, Task.title, Task.due_date, Task.reminder_date)
+            .where(
+                Task.reminder_date >= start,
+                Task.reminder_date < end,
+                Task.status.notin_(DONE_STATUSES),
+            )
+        )
+
+    def _event_query(self, start: datetime, end: datetime):
+        return (
+            select(
+                CalendarEvent.id,
+                CalendarEvent.user_id,
+                CalendarEvent.title,
+                CalendarEvent.start_time,
+                CalendarEvent.reminder_at,
+            )
+            .where(
+                CalendarEvent.reminder_at >= start,
+                CalendarEvent.reminder_at < end,
+            )
+        )
+
+    def _occurrence_query(self, start: datetime, end: datetime):
+        return (
+            select(
+                CalendarEventOccurrence.event_id,
+                CalendarEventOccurrence.user_id,
+                CalendarEventOccurrence.recurrence_id,
+                CalendarEventOccurrence.start_time,
+                CalendarEventOccurrence.reminder_at,
+                CalendarEventOccurrence.title,
+                CalendarEvent.title.label("event_title"),
+            )
+            .join(CalendarEvent, CalendarEvent.id == CalendarEventOccurrence.event_id)
+            .where(
+                CalendarEventOccurrence.reminder_at >= start,
+                CalendarEventOccurrence.reminder_at < end,
+            )
+        )
+
+    def _occurrence_reminders(self, result) -> List[Reminder]:
+        return [
+            Reminder(
+                kind="event",
+                source_id=row.event_id,
+                user_id=row.user_id,
+                fire_at=row.reminder_at,
+                title=row.title or row.event_title,
+                starts_at=row.start_time,
+                recurrence_id=row.recurrence_id,
+            )
+            for row in result.all()
+        ]
+
+    async def _load_window(self, start: datetime, end: datetime):
+        """Load reminders firing in [start, end) with indexed range queries"""
+        reminders: List[Reminder] = []
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(self._task_query(start, end))
+            reminders.extend(
+                Reminder(
+                    kind="task",
+                    source_id=row.id,
+                    user_id=row.user_id,
+                    fire_at=row.reminder_date,
+                    title=row.title,
+                    starts_at=row.due_date,
+                )
+                for row in result.all()
+            )
+
+            result = await db.execute(self._event_query(start, end))
+            reminders.extend(
+                Reminder(
+                    kind="event",
+                    source_id=row.id,
+                    user_id=row.user_id,
+                    fire_at=row.reminder_at,
+                    title=row.title,
+                    starts_at=row.start_time,
+                )
+                for row in result.all()
+            )
+
+            result = await db.execute(self._occurrence_query(start, end))
+            reminders.extend(self._occurrence_reminders(result))
+
+        self._loaded_until = end
+        for reminder in reminders:
+            self._push(reminder)
+
+        logger.debug("Loaded %d reminders until %s", len(reminders), end)
+
+    # Firing
+
+    async def _still_due(self, reminder: Reminder) -> bool:
+        """Re-check a reminder against the database (changes on other replicas)"""
+        async with AsyncSessionLocal() as db:
+            if reminder.kind == "task":
+                query = select(Task.id).where(
+                    Task.id == reminder.source_id,
+                    Task.reminder_date == reminder.fire_at,
+                    Task.status.notin_(DONE_STATUSES),
+                )
+            elif reminder.recurrence_id is None:
+                query = select(CalendarEvent.id).where(
+                    CalendarEvent.id == reminder.source_id,
+                    CalendarEvent.reminder_at == reminder.fire_at,
+                )
+            else:
+                query = select(CalendarEventOccurrence.id).where(
+                    CalendarEventOccurrence.event_id == reminder.source_id,
+                    CalendarEventOccurrence.recurrence_id == reminder.recurrence_id,
+                    CalendarEventOccurrence.reminder_at == reminder.fire_at,
+                )
+
+            result = await db.execute(query)
+            return result.first() is not None
+
+    async def _claim(self, reminder: Reminder) -> bool:
+        """Make sure only one replica fires a reminder"""
+        redis = get_redis()
+        if redis is not None:
+            kind, source_id, recurrence_id = reminder.key
+            claim_key = f"reminder:{kind}:{source_id}:{recurrence_id}:{reminder.fire_at.timestamp()}"
+            try:
+                return bool(await redis.set(
+                    claim_key, self._node_id, nx=True, ex=settings.REMINDER_CLAIM_TTL
+                ))
+            except REDIS_ERRORS as e:
+                mark_redis_unavailable(e)
+
+        return await self._is_leader()
+
+    async def _is_leader(self) -> bool:
+        """Hold a session-level Postgres advisory lock as the firing replica"""
+        if self._leader_conn is not None:
+            return True
+
+        conn = await engine.connect()
+        try:
+            result = await conn.execute(
+                text("SELECT pg_try_advisory_lock(:lock_id)"),
+                {"lock_id": settings.REMINDER_LEADER_LOCK_ID},
+            )
+            if result.scalar():
+                await conn.commit()
+                self._leader_conn = conn
+                return True
+        except Exception:
+            await conn.close()
+            raise
+
+        await conn.close()
+        return False
+
+    async def _fire(self, reminder: Reminder):
+        try:
+            if not await self._still_due(reminder) or not await self._claim(reminder):
+                return
+
+            for handler in self._handlers:
+                await handler(reminder)
+        except Exception:
+            logger.exception("Failed to fire reminder %s", reminder.key)
+
+    async def _fire_due(self):
+        """Pop and fire every reminder that is due"""
+        now = utcnow().timestamp()
+
+        while self._heap and self._heap[0][0] <= now:
+            _, _, reminder = heapq.heappop(self._heap)
+
+            # Skip entries replaced or removed since they were pushed
+            if self._entries.get(reminder.key) != reminder.fire_at:
+                continue
+
+            del self._entries[reminder.key]
+            task = asyncio.create_task(self._fire(reminder))
+            self._firing.add(task)
+            task.add_done_callback(self._firing.discard)
+
+    async def run(self):
+        """Scheduler loop (runs in lifespan)"""
+        window = timedelta(seconds=settings.REMINDER_LOAD_WINDOW)
+
+        while True:
+            try:
+                now = utcnow()
+
+                # Load the next window shortly before the current one runs out
+                if self._loaded_until is None or self._loaded_until - now < window / 2:
+                    await self._load_window(self._loaded_until or now, now + window)
+
+                await self._fire_due()
+
+                timeout = (self._loaded_until - utcnow() - window / 2).total_seconds()
+                if self._heap:
+                    timeout = min(timeout, self._heap[0][0] - utcnow().timestamp())
+
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=max(timeout, 0.01))
+                except asyncio.TimeoutError:
+                    pass
+
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Reminder scheduler iteration failed")
+                await asyncio.sleep(5)
+
+    async def close(self):
+        """Release the leader lock connection"""
+        if self._leader_conn is not None:
+            await self._leader_conn.close()
+            self._leader_conn = None
+
+
+async def log_reminder(reminder: Reminder):
+    """Default reminder handler"""
+    logger.info("Reminder for user %s: %s", reminder.user_id, reminder.text)
+
+
+reminder_scheduler = ReminderScheduler()
+reminder_scheduler.add_handler(log_reminder)
@@ -0,0 +1,29 @@
+from abc import ABC, abstractmethod
+import speech_recognition as sr
+
+
+class SpeechRecognizerBase(ABC):
+    """Base class for speech recognition engines"""
+
+    @abstractmethod
+    def recognize(self, audio_data: sr.AudioData, language: str) -> str:
+        """
+        Transcribe audio (blocking; run it in a worker thread)
+
+        Args:
+            audio_data: Audio to transcribe
+            language: Language code (e.g., 'tr-TR', 'en-US')
+
+        Returns:
+            Transcribed text
+
+        Raises:
+            sr.UnknownValueError: Could not understand audio
+            sr.RequestError: Engine error
+        """
+        pass
+
+    @abstractmethod
+    def get_engine_name(self) -> str:
+        """Get the engine name"""
+        pass
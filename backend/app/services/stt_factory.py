@@ -0,0 +1,59 @@
+import importlib
+from typing import Optional
+from app.services.stt_base import SpeechRecognizerBase
+from app.core.config import settings
+
+
+class SpeechRecognizerFactory:
+    """
+    Factory for creating speech recognizer instances
+
+    Engines are registered by name as "module:Class" paths and imported
+    on first use.
+    """
+
+    _engines = {
+        "google": "app.services.stt_google:GoogleRecognizer",
+        "vosk": "app.services.stt_vosk:VoskRecognizer",
+    }
+    _instances = {}
+
+    @classmethod
+    def get_recognizer(cls, engine: Optional[str] = None) -> SpeechRecognizerBase:
+        """
+        Get a speech recognizer instance
+
+        Args:
+            engine: Engine name (google, vosk)
+                    If None, uses STT_ENGINE from settings
+
+        Returns:
+            SpeechRecognizerBase instance
+
+        Raises:
+            ValueError: If engine is not supported
+        """
+        engine = engine or settings.STT_ENGINE
+
+        # Return cached instance if available
+        if engine in cls._instances:
+            return cls._instances[engine]
+
+        target = cls._engines.get(engine)
+        if target is None:
+            raise ValueError(f"Unsupported speech recognition engine: {engine}")
+
+        module_name, class_name = target.split(":")
+        recognizer = getattr(importlib.import_module(module_name), class_name)()
+        cls._instances[engine] = recognizer
+        return recognizer
+
+    @classmethod
+    def register(cls, engine: str, recognizer: SpeechRecognizerBase):
+        """Register a custom recognizer instance under an engine name"""
+        cls._instances[engine] = recognizer
+
+    @classmethod
+    def clear_cache(cls):
+        """Clear cached recognizer instances"""
+        cls._instances = {}
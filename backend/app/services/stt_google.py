@@ -0,0 +1,15 @@
+import speech_recognition as sr
+from app.services.stt_base import SpeechRecognizerBase
+
+
+class GoogleRecognizer(SpeechRecognizerBase):
+    """Google Web Speech API recognizer (requires network access)"""
+
+    def __init__(self):
+        self.recognizer = sr.Recognizer()
+
+    def recognize(self, audio_data: sr.AudioData, language: str) -> str:
+        return self.recognizer.recognize_google(audio_data, language=language)
+
+    def get_engine_name(self) -> str:
+        return "google"
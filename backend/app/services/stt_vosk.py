@@ -0,0 +1,55 @@
+import json
+import threading
+import speech_recognition as sr
+from app.services.stt_base import SpeechRecognizerBase
+from app.core.config import settings
+
+# Sample rate Vosk models are trained on
+VOSK_SAMPLE_RATE = 16000
+
+
+class VoskRecognizer(SpeechRecognizerBase):
+    """
+    Offline recognizer backed by a local Vosk model
+
+    The model at STT_VOSK_MODEL_PATH is loaded once and shared between
+    threads; it determines the language, so the language argument is
+    ignored. Requires the optional `vosk` package.
+    """
+
+    def __init__(self, model_path: str = None):
+        self.model_path = model_path or settings.STT_VOSK_MODEL_PATH
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    try:
+                        from vosk import Model, SetLogLevel
+                    except ImportError:
+                        raise sr.RequestError("Offline recognition requires the vosk package")
+
+                    SetLogLevel(-1)
+                    try:
+                        self._model = Model(self.model_path)
+                    except Exception as e:
+                        raise sr.RequestError(f"Could not load Vosk model from {self.model_path}: {e}")
+        return self._model
+
+    def recognize(self, audio_data: sr.AudioData, language: str) -> str:
+        from vosk import KaldiRecognizer
+
+        recognizer = KaldiRecognizer(self._get_model(), VOSK_SAMPLE_RATE)
+        recognizer.AcceptWaveform(
+            audio_data.get_raw_data(convert_rate=VOSK_SAMPLE_RATE, convert_width=2)
+        )
+        text = json.loads(recognizer.FinalResult()).get("text", "")
+
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+    def get_engine_name(self) -> str:
+        return "vosk"
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+from croniter import croniter
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.task import Task, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+# Fields copied from the series root into generated instances
+COPIED_FIELDS = ("user_id", "title", "description", "priority", "is_recurring", "recurrence_rule")
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def ensure_aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def series_key(task: Task) -> int:
+    """Id of the task that defines the series of a recurring task"""
+    return task.series_id or task.id
+
+
+class TaskRecurrenceService:
+    """
+    Generates instances of recurring tasks from cron expressions
+
+    A recurring task is the root of a series; generated instances copy it
+    and point back through series_id. Instance due dates follow the
+    root's cron expression (evaluated in UTC) and keep the root's
+    reminder offset. A unique (series_id, due_date) index makes
+    generation idempotent, so completion-time spawning and the horizon
+    loop can run concurrently.
+    """
+
+    def validate(self, rule: str):
+        """
+        Validate a cron expression
+
+        Raises:
+            ValueError: If the expression is invalid
+        """
+        if not croniter.is_valid(rule):
+            raise ValueError(f"'{rule}' is not a valid cron expression")
+
+    def due_dates(self, rule: str, after: datetime, until: Optional[datetime] = None, limit: int = 1) -> List[datetime]:
+        """Due dates strictly after `after`, up to `until` and at most `limit`"""
+        itr = croniter(rule, ensure_aware(after))
+        dates = []
+
+        while len(dates) < limit:
+            due = itr.get_next(datetime)
+            if until is not None and due > until:
+                break
+            dates.append(due)
+
+        return dates
+
+    def _instance(self, root: Task, due: datetime) -> Dict[str, object]:
+        values = {field: getattr(root, field) for field in COPIED_FIELDS}
+        reminder_date = None
+        if root.reminder_date is not None and root.due_date is not None:
+            reminder_date = due - (ensure_aware(root.due_date) - ensure_aware(root.reminder_date))
+
+        values.update(
+            series_id=series_key(root),
+            status=TaskStatus.TODO,
+            due_date=due,
+            reminder_date=reminder_date,
+        )
+        return values
+
+    async def _insert(self, db: AsyncSession, rows: List[Dict[str, object]]) -> List[Task]:
+        """Insert instances in one statement, skipping ones that already exist"""
+        if not rows:
+            return []
+
+        result = await db.scalars(
+            pg_insert(Task)
+            .on_conflict_do_nothing(
+                index_elements=["series_id", "due_date"],
+                index_where=Task.series_id.isnot(None),
+            )
+            .returning(Task),
+            rows,
+        )
+        return list(result.all())
+
+    async def _roots(self, db: AsyncSession, tasks: Iterable[Task]) -> Dict[int, Task]:
+        """Series roots of recurring tasks, loading the ones not given"""
+        roots = {t.id: t for t in tasks if t.series_id is None}
+        missing = {t.series_id for t in tasks if t.series_id is not None and t.series_id not in roots}
+
+        if missing:
+            result = await db.execute(select(Task).where(Task.id.in_(missing)))
+            roots.update({t.id: t for t in result.scalars().all()})
+
+        return roots
+
+    async def spawn_next(self, db: AsyncSession, completed: Iterable[Task]) -> List[Task]:
+        """
+        Create the next instance of each completed recurring task
+
+        The next due date follows the completed task's due date (or its
+        completion time when it had none). Nothing is created when the
+        instance already exists, e.g. from pre-generation. The caller
+        commits.
+        """
+        completed = [t for t in completed if t.is_recurring and t.recurrence_rule]
+        if not completed:
+            return []
+
+        roots = await self._roots(db, completed)
+        rows = {}
+
+        for task in completed:
+            root = roots.get(series_key(task))
+            if root is None or root.status == TaskStatus.CANCELLED:
+                continue
+
+            base = task.due_date or task.completed_at or utcnow()
+            try:
+                due = self.due_dates(root.recurrence_rule, base)[0]
+            except (ValueError, KeyError) as e:
+                logger.warning("Skipping task %s with invalid recurrence rule: %s", root.id, e)
+                continue
+            rows[(root.id, due)] = self._instance(root, due)
+
+        return await self._insert(db, list(rows.values()))
+
+    async def generate(self, db: AsyncSession, roots: Iterable[Task], until: datetime) -> List[Task]:
+        """
+        Pre-generate instances of recurring series up to `until`
+
+        Generation continues from the latest due date in each series. At
+        most TASK_RECURRENCE_MAX_INSTANCES instances are created per
+        series and call. The caller commits.
+        """
+        roots = {
+            t.id: t for t in roots
+            if t.series_id is None and t.is_recurring and t.recurrence_rule
+            and t.status != TaskStatus.CANCELLED
+        }
+        if not roots:
+            return []
+
+        series = func.coalesce(Task.series_id, Task.id)
+        result = await db.execute(
+            select(series, func.max(Task.due_date))
+            .where(or_(Task.id.in_(list(roots)), Task.series_id.in_(list(roots))))
+            .group_by(series)
+        )
+        latest = dict(result.all())
+
+        rows = []
+        for root_id, root in roots.items():
+            after = latest.get(root_id) or root.created_at or utcnow()
+            try:
+                dates = self.due_dates(
+                    root.recurrence_rule, after, until, settings.TASK_RECURRENCE_MAX_INSTANCES
+                )
+            except (ValueError, KeyError) as e:
+                logger.warning("Skipping task %s with invalid recurrence rule: %s", root_id, e)
+                continue
+            rows.extend(self._instance(root, due) for due in dates)
+
+        return await self._insert(db, rows)
+
+    async def generate_horizon(self, batch_size: int = 100) -> List[Task]:
+        """
+        Pre-generate instances of every recurring series for the next
+        TASK_RECURRENCE_HORIZON_DAYS, one transaction per batch of series
+
+        Returns:
+            Created instances
+        """
+        until = utcnow() + timedelta(days=settings.TASK_RECURRENCE_HORIZON_DAYS)
+        created: List[Task] = []
+        last_id = 0
+
+        while True:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(Task)
+                    .where(
+                        Task.id > last_id,
+                        Task.series_id.is_(None),
+                        Task.is_recurring.is_(True),
+                        Task.recurrence_rule.isnot(None),
+                        or_(Task.status.is_(None), Task.status != TaskStatus.CANCELLED),
+                    )
+                    .order_by(Task.id)
+                    .limit(batch_size)
+                )
+                roots = result.scalars().all()
+                if not roots:
+                    return created
+
+                created.extend(await self.generate(db, roots, until))
+                await db.commit()
+                last_id = roots[-1].id
+
+    async def run_generation_loop(self, on_created=None):
+        """Periodically extend recurring task series (runs in lifespan)"""
+        while True:
+            try:
+                created = await self.generate_horizon()
+                if created:
+                    logger.info("Generated %d recurring task instances", len(created))
+                    if on_created is not None:
+                        for task in created:
+                            await on_created(task)
+            except Exception:
+                logger.exception("Recurring task generation failed")
+
+            await asyncio.sleep(settings.TASK_RECURRENCE_REFRESH_INTERVAL)
+
+
+task_recurrence_service = TaskRecurrenceService()
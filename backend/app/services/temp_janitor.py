@@ -0,0 +1,81 @@
+import asyncio
+import glob
+import logging
+import os
+import time
+from typing import List, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TempFileJanitor:
+    """
+    Removes temporary artifacts left behind on disk
+
+    Watches glob patterns (VOICE_TEMP_DIR and the temp_* upload copies
+    older versions left in UPLOAD_DIR). Files older than VOICE_TEMP_TTL
+    are deleted, then the oldest ones until the total size is below
+    VOICE_TEMP_MAX_BYTES.
+    """
+
+    def __init__(self, patterns: List[str] = None):
+        self.patterns = patterns or [
+            os.path.join(settings.VOICE_TEMP_DIR, "*"),
+            os.path.join(settings.UPLOAD_DIR, "temp_*"),
+        ]
+
+    def _files(self) -> List[Tuple[float, int, str]]:
+        """(mtime, size, path) of watched files, oldest first"""
+        files = []
+        for pattern in self.patterns:
+            for path in glob.glob(pattern):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if os.path.isfile(path):
+                    files.append((stat.st_mtime, stat.st_size, path))
+        return sorted(files)
+
+    def sweep(self) -> int:
+        """
+        Enforce the TTL and disk quota once
+
+        Returns:
+            Number of removed files
+        """
+        files = self._files()
+        total = sum(size for _, size, _ in files)
+        cutoff = time.time() - settings.VOICE_TEMP_TTL
+        removed = 0
+
+        for mtime, size, path in files:
+            if mtime >= cutoff and total <= settings.VOICE_TEMP_MAX_BYTES:
+                break
+            try:
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning("Could not remove temp file %s: %s", path, e)
+                continue
+            total -= size
+
+        return removed
+
+    async def run(self):
+        """Sweep periodically (runs in lifespan)"""
+        while True:
+            try:
+                removed = await asyncio.to_thread(self.sweep)
+                if removed:
+                    logger.info("Removed %d temp files", removed)
+            except Exception:
+                logger.exception("Temp file sweep failed")
+
+            await asyncio.sleep(settings.VOICE_JANITOR_INTERVAL)
+
+
+temp_janitor = TempFileJanitor()
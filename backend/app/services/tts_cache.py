@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedAudio:
+    """Synthesized speech stored in the cache"""
+    key: str
+    path: str
+    size: int
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.key}"'
+
+
+class TTSCache:
+    """
+    Disk-backed cache of synthesized speech
+
+    Files are content-addressed: the name is a hash of (text, language,
+    slow, voice) and the output format variant, so the same phrase is
+    synthesized once and its ETag is known before the file exists. An
+    in-memory index keeps entries in LRU order with their sizes and
+    evicts the least recently used files once the total exceeds
+    TTS_CACHE_MAX_BYTES. The index is rebuilt
+    from file modification times on first use, and hits touch the file
+    so the order survives restarts.
+    """
+
+    def __init__(self, directory: str = None, max_bytes: int = None):
+        self.directory = directory or settings.TTS_CACHE_DIR
+        self.max_bytes = max_bytes or settings.TTS_CACHE_MAX_BYTES
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self._total = 0
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def key(text: str, language: str, slow: bool, voice: str, variant: Optional[str] = None) -> str:
+        """Cache key of a synthesis request (variant identifies a transcoded format)"""
+        parts = [text, language, slow, voice] + ([variant] if variant else [])
+        raw = json.dumps(parts, ensure_ascii=False)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def _load_index(self) -> "OrderedDict[str, int]":
+        if self._index is None:
+            os.makedirs(self.directory, exist_ok=True)
+            entries = []
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.is_file() and not entry.name.endswith(".part"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, entry.name, stat.st_size))
+
+            self._index = OrderedDict((key, size) for _, key, size in sorted(entries))
+            self._total = sum(self._index.values())
+        return self._index
+
+    def get(self, key: str) -> Optional[CachedAudio]:
+        """Get a cached file and mark it as recently used"""
+        index = self._load_index()
+        size = index.get(key)
+        if size is None:
+            return None
+
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Removed behind our back
+            self._total -= index.pop(key)
+            return None
+
+        index.move_to_end(key)
+        return CachedAudio(key, path, size)
+
+    async def put(self, key: str, data: bytes) -> CachedAudio:
+        """
+        Store a file atomically and evict least recently used files over the quota
+
+        Only the file I/O runs in a worker thread; the index and total are
+        updated on the event loop so they never race with get().
+        """
+        index = self._load_index()
+        path = self._path(key)
+        await asyncio.to_thread(self._write, path, data)
+
+        self._total += len(data) - index.pop(key, 0)
+        index[key] = len(data)
+        evicted = self._evict(keep=key)
+        if evicted:
+            await asyncio.to_thread(self._unlink, evicted)
+        return CachedAudio(key, path, len(data))
+
+    def _write(self, path: str, data: bytes):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def _evict(self, keep: str) -> List[str]:
+        """Drop least recently used entries from the index and return their paths"""
+        index = self._load_index()
+        evicted = []
+        while self._total > self.max_bytes and len(index) > 1:
+            key = next(iter(index))
+            if key == keep:
+                index.move_to_end(key)
+                continue
+
+            self._total -= index.pop(key)
+            evicted.append(self._path(key))
+        return evicted
+
+    @staticmethod
+    def _unlink(paths: List[str]):
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    async def get_or_create(self, key: str, generate: Callable[[], Awaitable[bytes]]) -> CachedAudio:
+        """
+        Get a cached file, synthesizing it on a miss
+
+        Concurrent misses for the same key share one synthesis.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            data = await generate()
+            cached = await self.put(key, data)
+            future.set_result(cached)
+            return cached
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters re-raise it; don't warn when nobody was waiting
+            future.exception()
+            raise
+        finally:
+            del self._pending[key]
+
+    @property
+    def total_bytes(self) -> int:
+        self._load_index()
+        return self._total
+
+    def __len__(self) -> int:
+        return len(self._load_index())
+
+
+tts_cache = TTSCache()
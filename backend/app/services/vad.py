@@ -0,0 +1,111 @@
+import math
+import sys
+from array import array
+from collections import deque
+from typing import List, Optional
+from app.core.config import settings
+
+try:
+    import webrtcvad
+except ImportError:  # Optional: falls back to an energy threshold
+    webrtcvad = None
+
+# Sample rates supported by webrtcvad
+SUPPORTED_SAMPLE_RATES = (8000, 16000, 32000, 48000)
+
+# 16-bit mono PCM
+SAMPLE_WIDTH = 2
+
+
+def frame_rms(frame: bytes) -> float:
+    """Root mean square level of a 16-bit little-endian PCM frame"""
+    samples = array("h", frame)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+class SpeechSegmenter:
+    """
+    Splits a stream of 16-bit mono PCM into speech segments
+
+    Audio is cut into STT_VAD_FRAME_MS frames and classified by webrtcvad
+    (or an RMS threshold when it is not installed). A segment starts when
+    most frames in a STT_VAD_PADDING_MS window are voiced and ends when
+    most are silent, or after STT_MAX_SEGMENT_SECONDS. Segments keep the
+    padding on both sides so words are not clipped.
+    """
+
+    def __init__(self, sample_rate: int = 16000):
+        if sample_rate not in SUPPORTED_SAMPLE_RATES:
+            raise ValueError(f"Sample rate must be one of {SUPPORTED_SAMPLE_RATES}")
+
+        self.sample_rate = sample_rate
+        self.frame_bytes = sample_rate * settings.STT_VAD_FRAME_MS // 1000 * SAMPLE_WIDTH
+        self.max_frames = settings.STT_MAX_SEGMENT_SECONDS * 1000 // settings.STT_VAD_FRAME_MS
+        self._vad = webrtcvad.Vad(settings.STT_VAD_AGGRESSIVENESS) if webrtcvad else None
+
+        self._buffer = bytearray()
+        self._window: deque = deque(maxlen=max(1, settings.STT_VAD_PADDING_MS // settings.STT_VAD_FRAME_MS))
+        self._voiced: List[bytes] = []
+        self._triggered = False
+
+    def is_speech(self, frame: bytes) -> bool:
+        if self._vad is not None:
+            return self._vad.is_speech(frame, self.sample_rate)
+        return frame_rms(frame) >= settings.STT_VAD_ENERGY_THRESHOLD
+
+    def _cut(self) -> bytes:
+        segment = b"".join(self._voiced)
+        self._voiced = []
+        self._window.clear()
+        self._triggered = False
+        return segment
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """
+        Add audio and return the segments it completed
+
+        Args:
+            data: 16-bit little-endian mono PCM of any length
+
+        Returns:
+            PCM of each completed speech segment
+        """
+        self._buffer.extend(data)
+        segments = []
+        threshold = 0.9 * self._window.maxlen
+
+        while len(self._buffer) >= self.frame_bytes:
+            frame = bytes(self._buffer[:self.frame_bytes])
+            del self._buffer[:self.frame_bytes]
+            speech = self.is_speech(frame)
+
+            if not self._triggered:
+                self._window.append((frame, speech))
+                if sum(1 for _, voiced in self._window if voiced) >= threshold:
+                    self._triggered = True
+                    self._voiced = [f for f, _ in self._window]
+                    self._window.clear()
+                continue
+
+            self._voiced.append(frame)
+            self._window.append((frame, speech))
+            if (
+                sum(1 for _, voiced in self._window if not voiced) >= threshold
+                or len(self._voiced) >= self.max_frames
+            ):
+                segments.append(self._cut())
+
+        return segments
+
+    def flush(self) -> Optional[bytes]:
+        """Return the segment in progress at the end of the stream, if any"""
+        if not self._triggered:
+            return None
+        if self._buffer:
+            self._voiced.append(bytes(self._buffer))
+            self._buffer.clear()
+        return self._cut()
@@ -1,58 +1,181 @@
-import os
-import tempfile
+import io
+import re
 import asyncio
-from typing import Optional
+import logging
+from typing import AsyncGenerator, Dict, Iterable, List, Optional
 import speech_recognition as sr
-from gtts import gTTS
-from pydub import AudioSegment
 from app.core.config import settings
+from app.services.audio_pipeline import AudioFormat, decode_audio, transcode, transcode_stream
+from app.services.reminder_scheduler import reminder_scheduler
+from app.services.stt_base import SpeechRecognizerBase
+from app.services.stt_factory import SpeechRecognizerFactory
+from app.services.tts_cache import tts_cache, CachedAudio
+from app.services.vad import SpeechSegmenter, SAMPLE_WIDTH
+
+logger = logging.getLogger(__name__)
+
+# Sentence ends: punctuation followed by whitespace, or line breaks
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+def split_sentences(text: str, min_chars: int = 20, max_chars: int = 300) -> List[str]:
+    """
+    Split text into sentences for pipelined synthesis
+
+    Sentences shorter than min_chars are merged with the next one, and
+    ones longer than max_chars are cut at the last space before it.
+    """
+    sentences = []
+    current = ""
+
+    for part in SENTENCE_BOUNDARY.split(text):
+        part = part.strip()
+        if not part:
+            continue
+        current = f"{current} {part}" if current else part
+
+        while len(current) > max_chars:
+            cut = current.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            sentences.append(current[:cut].strip())
+            current = current[cut:].strip()
+
+        if len(current) >= min_chars:
+            sentences.append(current)
+            current = ""
+
+    if current:
+        sentences.append(current)
+    return sentences
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class SentenceBuffer:
+    """
+    Collects streamed text and releases it sentence by sentence
+
+    Uses the same rules as split_sentences(); text after the last
+    sentence boundary (or a sentence still shorter than min_chars) is
+    held back until more text arrives or flush() is called.
+    """
+
+    def __init__(self, min_chars: int = 20, max_chars: int = 300):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Add text and return the sentences it completed"""
+        self._buffer += text
+
+        end = 0
+        for match in SENTENCE_BOUNDARY.finditer(self._buffer):
+            end = match.end()
+        if end == 0 and len(self._buffer) > self.max_chars:
+            end = self._buffer.rfind(" ", 0, self.max_chars) + 1 or self.max_chars
+        if end == 0:
+            return []
+
+        sentences = split_sentences(self._buffer[:end], self.min_chars, self.max_chars)
+        rest = self._buffer[end:]
+        if sentences and len(sentences[-1]) < self.min_chars:
+            rest = f"{sentences.pop()} {rest}"
+        self._buffer = rest
+        return sentences
+
+    def flush(self) -> List[str]:
+        """Return whatever text is left"""
+        sentences = split_sentences(self._buffer, self.min_chars, self.max_chars)
+        self._buffer = ""
+        return sentences
 
 
 class VoiceService:
     """Service for speech recognition and text-to-speech"""
 
-    def __init__(self):
+    def __init__(self, speech_recognizer: Optional[SpeechRecognizerBase] = None):
         self.recognizer = sr.Recognizer()
+        self.speech_recognizer = speech_recognizer
         self.language = settings.VOICE_LANGUAGE
 
+    def get_recognizer(self, engine: Optional[str] = None) -> SpeechRecognizerBase:
+        """
+        Get the speech recognition engine
+
+        Args:
+            engine: Engine name; defaults to the recognizer given to the
+                    service, then STT_ENGINE
+
+        Raises:
+            ValueError: If engine is not supported
+        """
+        if engine is None and self.speech_recognizer is not None:
+            return self.speech_recognizer
+        return SpeechRecognizerFactory.get_recognizer(engine)
+
     async def speech_to_text(
         self,
-        audio_file_path: str,
+        audio: bytes,
         language: Optional[str] = None,
+        engine: Optional[str] = None,
+        input_format: Optional[str] = None,
     ) -> str:
         """
-        Convert speech audio file to text
+        Convert speech audio to text
+
+        The audio is decoded in memory to 16 kHz mono PCM; nothing is
+        written to disk.
 
         Args:
-            audio_file_path: Path to audio file
+            audio: Encoded audio file content
             language: Language code (e.g., 'tr-TR', 'en-US')
+            engine: Speech recognition engine (google, vosk)
+            input_format: Optional format hint (e.g., 'webm', 'mp3')
 
         Returns:
             Transcribed text
 
         Raises:
+            ValueError: Unsupported engine or undecodable audio
             sr.UnknownValueError: Could not understand audio
             sr.RequestError: API error
         """
         lang = language or self.language
+        recognizer = self.get_recognizer(engine)
+        audio_data = await decode_audio(audio, input_format)
 
-        def _recognize():
-            # Convert audio to WAV if needed
-            path = audio_file_path
-            if not path.endswith('.wav'):
-                audio = AudioSegment.from_file(path)
-                temp_wav = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-                audio.export(temp_wav.name, format='wav')
-                path = temp_wav.name
+        # Run in thread pool to avoid blocking
+        return await asyncio.to_thread(recognizer.recognize, audio_data, lang)
 
-            # Recognize speech
-            with sr.AudioFile(path) as source:
-                audio_data = self.recognizer.record(source)
-                text = self.recognizer.recognize_google(audio_data, language=lang)
+    async def transcribe_pcm(
+        self,
+        pcm: bytes,
+        sample_rate: int,
+        language: Optional[str] = None,
+        engine: Optional[str] = None,
+    ) -> str:
+        """
+        Convert raw 16-bit mono PCM to text
 
-            return text
+        Returns:
+            Transcribed text, or an empty string if nothing was understood
+
+        Raises:
+            sr.RequestError: Engine error
+        """
+        recognizer = self.get_recognizer(engine)
+        audio_data = sr.AudioData(pcm, sample_rate, SAMPLE_WIDTH)
+
+        def _recognize():
+            try:
+                return recognizer.recognize(audio_data, language or self.language)
+            except sr.UnknownValueError:
+                return ""
 
-        # Run in thread pool to avoid blocking
         return await asyncio.to_thread(_recognize)
 
     async def text_to_speech(
@@ -60,38 +183,179 @@ class VoiceService:
         text: str,
         language: Optional[str] = None,
         slow: bool = False,
-    ) -> str:
+        voice: Optional[str] = None,
+    ) -> bytes:
         """
-        Convert text to speech audio file
+        Convert text to speech audio
 
         Args:
             text: Text to convert to speech
             language: Language code (e.g., 'tr', 'en')
             slow: Speak slowly
+            voice: Accent, as the Google Translate domain (e.g., 'com', 'co.uk')
 
         Returns:
-            Path to generated audio file
+            MP3 audio
         """
         lang = language or self.language.split('-')[0]  # Get language without region
 
         def _generate_speech():
-            # Generate speech
-            tts = gTTS(text=text, lang=lang, slow=slow)
+            from gtts import gTTS
 
-            # Save to temporary file
-            temp_file = tempfile.NamedTemporaryFile(suffix='.mp3', delete=False)
-            tts.save(temp_file.name)
+            # Generate speech
+            tts = gTTS(text=text, lang=lang, slow=slow, tld=voice or settings.TTS_VOICE)
 
-            return temp_file.name
+            buffer = io.BytesIO()
+            tts.write_to_fp(buffer)
+            return buffer.getvalue()
 
         # Run in thread pool to avoid blocking
         return await asyncio.to_thread(_generate_speech)
 
+    async def synthesize_sentence(
+        self,
+        sentence: str,
+        language: Optional[str],
+        slow: bool,
+        voice: Optional[str],
+        semaphore: asyncio.Semaphore,
+        output: Optional[AudioFormat] = None,
+    ) -> bytes:
+        """Audio of one sentence, synthesized through the cache under a concurrency limit"""
+        async with semaphore:
+            audio = await self.text_to_speech_cached(sentence, language, slow, voice, output)
+
+        try:
+            return await asyncio.to_thread(_read_file, audio.path)
+        except FileNotFoundError:
+            # Evicted in the meantime
+            audio = await self.text_to_speech(sentence, language, slow, voice)
+            return audio if output is None or output.is_source else await transcode(audio, output, "mp3")
+
+    async def text_to_speech_stream(
+        self,
+        text: str,
+        language: Optional[str] = None,
+        slow: bool = False,
+        voice: Optional[str] = None,
+        output: Optional[AudioFormat] = None,
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Convert long text to speech sentence by sentence
+
+        Sentences are synthesized concurrently (at most
+        TTS_STREAM_CONCURRENCY at a time, through the TTS cache) and their
+        MP3 audio is yielded in order, so playback can start as soon as
+        the first sentence is ready. Other output formats are transcoded
+        on the fly as one continuous stream.
+
+        Yields:
+            Audio chunks
+        """
+        if output is not None and not output.is_source:
+            async for chunk in transcode_stream(
+                self.text_to_speech_stream(text, language, slow, voice), output, "mp3"
+            ):
+                yield chunk
+            return
+
+        semaphore = asyncio.Semaphore(settings.TTS_STREAM_CONCURRENCY)
+        tasks = [
+            asyncio.create_task(self.synthesize_sentence(sentence, language, slow, voice, semaphore))
+            for sentence in split_sentences(text, settings.TTS_STREAM_MIN_CHARS, settings.TTS_STREAM_MAX_CHARS)
+        ]
+
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            # The client went away or a sentence failed
+            for task in tasks:
+                task.cancel()
+
+    def speech_key(
+        self,
+        text: str,
+        language: Optional[str] = None,
+        slow: bool = False,
+        voice: Optional[str] = None,
+        output: Optional[AudioFormat] = None,
+    ) -> str:
+        """Cache key (and ETag) of synthesized speech"""
+        return tts_cache.key(
+            text,
+            language or self.language.split('-')[0],
+            slow,
+            voice or settings.TTS_VOICE,
+            None if output is None or output.is_source else output.tag,
+        )
+
+    async def text_to_speech_cached(
+        self,
+        text: str,
+        language: Optional[str] = None,
+        slow: bool = False,
+        voice: Optional[str] = None,
+        output: Optional[AudioFormat] = None,
+    ) -> CachedAudio:
+        """
+        Convert text to speech through the disk cache
+
+        Other formats than gTTS's MP3 are transcoded from the cached MP3
+        and cached as well.
+
+        Returns:
+            Cached audio file
+        """
+        if output is None or output.is_source:
+            return await tts_cache.get_or_create(
+                self.speech_key(text, language, slow, voice),
+                lambda: self.text_to_speech(text, language, slow, voice),
+            )
+
+        async def _transcode() -> bytes:
+            source = await self.text_to_speech_cached(text, language, slow, voice)
+            data = await asyncio.to_thread(_read_file, source.path)
+            return await transcode(data, output, "mp3")
+
+        return await tts_cache.get_or_create(self.speech_key(text, language, slow, voice, output), _transcode)
+
+    async def prewarm(self, texts: Iterable[str]) -> int:
+        """
+        Synthesize texts into the cache ahead of time
+
+        Returns:
+            Number of newly synthesized texts
+        """
+        created = 0
+        for text in dict.fromkeys(texts):
+            if tts_cache.get(self.speech_key(text)) is not None:
+                continue
+            try:
+                await self.text_to_speech_cached(text)
+                created += 1
+            except Exception as e:
+                logger.warning("Could not pre-synthesize '%s': %s", text, e)
+        return created
+
+    async def run_prewarm_loop(self):
+        """Pre-synthesize texts of reminders firing soon (runs in lifespan)"""
+        while True:
+            try:
+                reminders = reminder_scheduler.upcoming(settings.TTS_PREWARM_WINDOW)
+                created = await self.prewarm(r.text for r in reminders)
+                if created:
+                    logger.info("Pre-synthesized %d reminder texts", created)
+            except Exception:
+                logger.exception("TTS pre-warming failed")
+
+            await asyncio.sleep(settings.TTS_PREWARM_INTERVAL)
+
     async def record_audio(
         self,
         duration: int = 5,
         sample_rate: int = 16000,
-    ) -> str:
+    ) -> bytes:
         """
         Record audio from microphone
 
@@ -100,7 +364,7 @@ class VoiceService:
             sample_rate: Sample rate in Hz
 
         Returns:
-            Path to recorded audio file
+            WAV audio
         """
         def _record():
             with sr.Microphone(sample_rate=sample_rate) as source:
@@ -110,18 +374,96 @@ class VoiceService:
                 # Record audio
                 audio_data = self.recognizer.record(source, duration=duration)
 
-            # Save to temporary file
-            temp_file = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-
-            with open(temp_file.name, 'wb') as f:
-                f.write(audio_data.get_wav_data())
-
-            return temp_file.name
+            return audio_data.get_wav_data()
 
         # Run in thread pool to avoid blocking
         return await asyncio.to_thread(_record)
 
-    def cleanup_temp_file(self, file_path: str):
-        """Delete temporary audio file"""
-        if os.path.exists(file_path):
-            os.unlink(file_path)
+
+class TranscriptionStream:
+    """
+    Incremental transcription of live audio
+
+    Fed PCM frames are split into speech segments by voice activity
+    detection, and each segment is transcribed as soon as it ends, up to
+    STT_MAX_CONCURRENCY at a time. Results are put on `events` as they
+    arrive:
+
+    - {"type": "partial", "segment": n, "text": ..., "transcript": ...}
+      where transcript joins all segments finished in order so far
+    - {"type": "error", "segment": n, "detail": ...}
+    - {"type": "final", "text": ...} once finish() has transcribed everything
+    """
+
+    def __init__(
+        self,
+        voice_service: VoiceService,
+        sample_rate: int = 16000,
+        language: Optional[str] = None,
+        engine: Optional[str] = None,
+    ):
+        """
+        Raises:
+            ValueError: If the sample rate or engine is not supported
+        """
+        self.voice_service = voice_service
+        self.sample_rate = sample_rate
+        self.language = language
+        self.engine = engine
+        voice_service.get_recognizer(engine)
+
+        self.segmenter = SpeechSegmenter(sample_rate)
+        self.events: asyncio.Queue = asyncio.Queue()
+        self._semaphore = asyncio.Semaphore(settings.STT_MAX_CONCURRENCY)
+        self._tasks: List[asyncio.Task] = []
+        self._texts: Dict[int, str] = {}
+
+    def transcript(self) -> str:
+        """Text of the segments transcribed so far, up to the first pending one"""
+        parts = []
+        for index in range(len(self._tasks)):
+            if index not in self._texts:
+                break
+            parts.append(self._texts[index])
+        return " ".join(p for p in parts if p)
+
+    async def _transcribe(self, index: int, pcm: bytes):
+        async with self._semaphore:
+            try:
+                text = await self.voice_service.transcribe_pcm(pcm, self.sample_rate, self.language, self.engine)
+            except sr.RequestError as e:
+                logger.warning("Transcription of segment %d failed: %s", index, e)
+                await self.events.put({"type": "error", "segment": index, "detail": str(e)})
+                text = ""
+
+        self._texts[index] = text
+        await self.events.put({
+            "type": "partial",
+            "segment": index,
+            "text": text,
+            "transcript": self.transcript(),
+        })
+
+    def _start(self, pcm: bytes):
+        self._tasks.append(asyncio.create_task(self._transcribe(len(self._tasks), pcm)))
+
+    def feed(self, data: bytes):
+        """Add captured audio (16-bit little-endian mono PCM)"""
+        for segment in self.segmenter.feed(data):
+            self._start(segment)
+
+    async def finish(self) -> str:
+        """Transcribe the remaining audio and emit the final transcript"""
+        segment = self.segmenter.flush()
+        if segment:
+            self._start(segment)
+
+        await asyncio.gather(*self._tasks)
+        text = self.transcript()
+        await self.events.put({"type": "final", "text": text})
+        return text
+
+    def cancel(self):
+        """Stop pending transcriptions (e.g. after a disconnect)"""
+        for task in self._tasks:
+            task.cancel()
@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.conversation import Conversation, Message, MessageRole
+from app.services.ai_factory import AIServiceFactory
+from app.services.audio_pipeline import AudioFormat
+from app.services.voice_service import VoiceService, TranscriptionStream, SentenceBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class StageTimer:
+    """Millisecond timings of the stages of a voice turn"""
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.timings: Dict[str, float] = {}
+
+    def mark(self, name: str, since: Optional[float] = None):
+        """Record the time since `since` (default: the start of the turn), once"""
+        if name not in self.timings:
+            self.timings[name] = round((time.monotonic() - (since or self.start)) * 1000, 1)
+
+
+class VoiceTurn:
+    """
+    One spoken exchange: speech-to-text, chat and text-to-speech, overlapped
+
+    The turn starts when the user stops speaking. Segments were already
+    transcribed while they spoke, so only the tail is left; the chat
+    request starts as soon as the final transcript is ready. The reply is
+    streamed from the AI provider and every completed sentence goes to
+    TTS right away (at most TTS_STREAM_CONCURRENCY at a time), so audio
+    of the first sentence plays while the rest is still generated.
+
+    Everything for the client is put on the transcription stream's
+    `events` queue: dicts are JSON messages, bytes are audio.
+
+    - {"type": "partial" | "final", ...}: transcription (see TranscriptionStream)
+    - {"type": "reply", "text": ...}: a chunk of the AI reply
+    - {"type": "audio", "sentence": n, "text": ..., "size": ...} followed
+      by a binary message with that sentence's audio (MP3 unless another
+      output format was requested)
+    - {"type": "error", "detail": ...}
+    - {"type": "done", "conversation_id", "message_id", "transcript",
+      "reply", "timings"} where timings are milliseconds since the end of
+      speech (stt, llm_first_token, llm, first_audio, total)
+    """
+
+    def __init__(
+        self,
+        voice_service: VoiceService,
+        stream: TranscriptionStream,
+        user_id: int,
+        conversation_id: Optional[int] = None,
+        ai_provider: Optional[str] = None,
+        voice: Optional[str] = None,
+        output: Optional[AudioFormat] = None,
+    ):
+        self.voice_service = voice_service
+        self.stream = stream
+        self.events = stream.events
+        self.user_id = user_id
+        self.conversation_id = conversation_id
+        self.ai_provider = ai_provider
+        self.voice = voice
+        self.output = output
+        self.timer: Optional[StageTimer] = None
+
+    @property
+    def tts_language(self) -> Optional[str]:
+        # Speak in the language that was recognized (tr-TR -> tr)
+        return self.stream.language.split("-")[0] if self.stream.language else None
+
+    async def _start_conversation(self, transcript: str) -> Tuple[int, str, List[Dict[str, str]]]:
+        """
+        Store the user message and load the history
+
+        Returns:
+            (conversation id, AI provider, chat messages)
+
+        Raises:
+            LookupError: If the conversation does not exist
+        """
+        async with AsyncSessionLocal() as db:
+            if self.conversation_id:
+                result = await db.execute(
+                    select(Conversation)
+                    .where(
+                        Conversation.id == self.conversation_id,
+                        Conversation.user_id == self.user_id,
+                    )
+                    .options(selectinload(Conversation.messages))
+                )
+                conversation = result.scalar_one_or_none()
+                if conversation is None:
+                    raise LookupError("Conversation not found")
+                history = [{"role": m.role.value, "content": m.content} for m in conversation.messages]
+            else:
+                conversation = Conversation(
+                    user_id=self.user_id,
+                    ai_provider=self.ai_provider or settings.DEFAULT_AI_PROVIDER,
+                )
+                db.add(conversation)
+                await db.flush()
+                history = []
+
+            db.add(Message(conversation_id=conversation.id, role=MessageRole.USER, content=transcript))
+            await db.commit()
+
+            history.append({"role": "user", "content": transcript})
+            return conversation.id, self.ai_provider or conversation.ai_provider, history
+
+    async def _save_reply(self, conversation_id: int, reply: str) -> int:
+        async with AsyncSessionLocal() as db:
+            message = Message(
+                conversation_id=conversation_id,
+                role=MessageRole.ASSISTANT,
+                content=reply,
+                message_metadata={"voice_timings": self.timer.timings},
+            )
+            db.add(message)
+            await db.commit()
+            return message.id
+
+    async def _deliver_audio(self, pending: asyncio.Queue):
+        """Send synthesized sentences in order as they become ready"""
+        index = 0
+        while True:
+            item = await pending.get()
+            if item is None:
+                return
+
+            sentence, task = item
+            audio = await task
+            self.timer.mark("first_audio")
+            await self.events.put({"type": "audio", "sentence": index, "text": sentence, "size": len(audio)})
+            await self.events.put(audio)
+            index += 1
+
+    async def run(self):
+        """Run the turn after the end of speech; always ends with a "done" event"""
+        self.timer = timer = StageTimer()
+        conversation_id = message_id = None
+        transcript = ""
+        reply: List[str] = []
+
+        pending: asyncio.Queue = asyncio.Queue()
+        deliverer = asyncio.create_task(self._deliver_audio(pending))
+        tts_tasks: List[asyncio.Task] = []
+
+        try:
+            transcript = await self.stream.finish()
+            timer.mark("stt")
+            if not transcript:
+                await self.events.put({"type": "error", "detail": "No speech recognized"})
+                return
+
+            conversation_id, provider, messages = await self._start_conversation(transcript)
+            ai_service = AIServiceFactory.get_service(provider)
+
+            semaphore = asyncio.Semaphore(settings.TTS_STREAM_CONCURRENCY)
+            sentences = SentenceBuffer(settings.TTS_STREAM_MIN_CHARS, settings.TTS_STREAM_MAX_CHARS)
+
+            def _speak(sentence: str):
+                task = asyncio.create_task(self.voice_service.synthesize_sentence(
+                    sentence, self.tts_language, False, self.voice, semaphore, self.output
+                ))
+                tts_tasks.append(task)
+                pending.put_nowait((sentence, task))
+
+            llm_start = time.monotonic()
+            async for chunk in await ai_service.chat(messages, stream=True):
+                timer.mark("llm_first_token")
+                reply.append(chunk)
+                await self.events.put({"type": "reply", "text": chunk})
+                for sentence in sentences.feed(chunk):
+                    _speak(sentence)
+
+            for sentence in sentences.flush():
+                _speak(sentence)
+            timer.mark("llm", llm_start)
+
+            await pending.put(None)
+            await deliverer
+            timer.mark("total")
+
+            message_id = await self._save_reply(conversation_id, "".join(reply))
+            logger.info("Voice turn timings (ms): %s", timer.timings)
+
+        except LookupError as e:
+            await self.events.put({"type": "error", "detail": str(e)})
+        except Exception as e:
+            logger.exception("Voice turn failed")
+            await self.events.put({"type": "error", "detail": f"Voice turn failed: {str(e)}"})
+        finally:
+            deliverer.cancel()
+            for task in tts_tasks:
+                task.cancel()
+            await self.events.put({
+                "type": "done",
+                "conversation_id": conversation_id,
+                "message_id": message_id,
+                "transcript": transcript,
+                "reply": "".join(reply),
+                "timings": timer.timings,
+            })
@@ -1,7 +1,11 @@
 from typing import List, Dict
+import asyncio
+import time
 import httpx
-from bs4 import BeautifulSoup
-from googlesearch import search as google_search
+from opentelemetry import trace
+from app.core.cache import TwoLevelCache, MISSING, make_key
+from app.core.config import settings
+from app.core.tracing import tracer
 
 
 class WebSearchService:
@@ -11,6 +15,17 @@ class WebSearchService:
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
         }
+        self.search_cache = TwoLevelCache(
+            "search",
+            ttl=settings.SEARCH_CACHE_TTL,
+            maxsize=settings.CACHE_LOCAL_MAXSIZE,
+        )
+        self.page_cache = TwoLevelCache(
+            "page",
+            ttl=settings.PAGE_CACHE_MAX_AGE,
+            local_ttl=settings.PAGE_CACHE_TTL,
+            maxsize=settings.CACHE_LOCAL_MAXSIZE,
+        )
 
     async def search(
         self,
@@ -29,9 +44,31 @@ class WebSearchService:
         Returns:
             List of search results with title, url, and snippet
         """
-        results = []
+        key = make_key(query.strip().lower(), num_results, lang)
 
         try:
+            return await self.search_cache.get_or_compute(
+                key,
+                lambda: self._google_search(query, num_results, lang),
+                # No results is more likely a blocked request than a real answer
+                cacheable=bool,
+            )
+        except Exception as e:
+            print(f"Search error: {e}")
+            return []
+
+    async def _google_search(
+        self,
+        query: str,
+        num_results: int,
+        lang: str,
+    ) -> List[Dict[str, str]]:
+        """Run an uncached Google search"""
+        def _search():
+            from googlesearch import search as google_search
+
+            results = []
+
             # Get search results from Google
             search_results = google_search(
                 query,
@@ -47,10 +84,11 @@ class WebSearchService:
                     "snippet": result.description if hasattr(result, 'description') else "",
                 })
 
-        except Exception as e:
-            print(f"Search error: {e}")
+            return results
 
-        return results
+        # Run in thread pool to avoid blocking
+        with tracer.start_as_current_span("search.google", attributes={"search.results": num_results}):
+            return await asyncio.to_thread(_search)
 
     async def fetch_page_content(
         self,
@@ -67,29 +105,76 @@ class WebSearchService:
         Returns:
             Page content (HTML or extracted text)
         """
-        async with httpx.AsyncClient(headers=self.headers, timeout=10.0) as client:
-            response = await client.get(url)
-            response.raise_for_status()
+        html = await self._fetch_html(url)
+
+        if not extract_text:
+            return html
+
+        # Parse HTML and extract text
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, 'html.parser')
 
-            if not extract_text:
-                return response.text
+        # Remove script and style elements
+        for script in soup(["script", "style"]):
+            script.decompose()
 
-            # Parse HTML and extract text
-            soup = BeautifulSoup(response.text, 'html.parser')
+        # Get text
+        text = soup.get_text()
 
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
+        # Clean up whitespace
+        lines = (line.strip() for line in text.splitlines())
+        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+        text = '\n'.join(chunk for chunk in chunks if chunk)
 
-            # Get text
-            text = soup.get_text()
+        return text
 
-            # Clean up whitespace
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = '\n'.join(chunk for chunk in chunks if chunk)
+    async def _fetch_html(self, url: str) -> str:
+        """
+        Fetch a page body through the page cache
 
-            return text
+        Fresh entries are served without a request. Stale entries are
+        revalidated with a conditional GET using the stored ETag and
+        Last-Modified headers, so an unchanged page costs a 304.
+        """
+        with tracer.start_as_current_span("search.fetch", attributes={"url.full": url}) as span:
+            key = make_key(url)
+            cached = await self.page_cache.get(key)
+
+            if cached is not MISSING and time.time() - cached["fetched_at"] < settings.PAGE_CACHE_TTL:
+                span.set_attribute("cache.result", "hit")
+                return cached["body"]
+
+            span.set_attribute("cache.result", "miss" if cached is MISSING else "stale")
+            entry = await self._revalidate(url, key, cached)
+            return entry["body"]
+
+    async def _revalidate(self, url: str, key: str, cached) -> dict:
+        """Fetch a page, conditionally if a stale copy is cached, and store it"""
+        headers = dict(self.headers)
+        if cached is not MISSING:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        async with httpx.AsyncClient(headers=headers, timeout=10.0) as client:
+            response = await client.get(url)
+        trace.get_current_span().set_attribute("http.response.status_code", response.status_code)
+
+        if response.status_code == 304 and cached is not MISSING:
+            entry = dict(cached, fetched_at=time.time())
+        else:
+            response.raise_for_status()
+            entry = {
+                "body": response.text,
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "fetched_at": time.time(),
+            }
+
+        await self.page_cache.set(key, entry)
+        return entry
 
     async def search_and_summarize(
         self,
@@ -0,0 +1,59 @@
+"""recurring events
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('calendar_events', sa.Column('occurrences_from', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('calendar_events', sa.Column('occurrences_until', sa.DateTime(timezone=True), nullable=True))
+    op.create_table('calendar_event_occurrences',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('recurrence_id', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('start_time', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('end_time', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('title', sa.String(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('location', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['event_id'], ['calendar_events.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('event_id', 'recurrence_id', name='uq_calendar_event_occurrences_occurrence')
+    )
+    op.create_index('ix_calendar_event_occurrences_user_start', 'calendar_event_occurrences', ['user_id', 'start_time'], unique=False)
+    op.create_table('calendar_event_overrides',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('recurrence_id', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('start_time', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('end_time', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('title', sa.String(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('location', sa.String(), nullable=True),
+    sa.Column('is_cancelled', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['event_id'], ['calendar_events.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('event_id', 'recurrence_id', name='uq_calendar_event_overrides_occurrence')
+    )
+    op.create_index(op.f('ix_calendar_event_overrides_id'), 'calendar_event_overrides', ['id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_calendar_event_overrides_id'), table_name='calendar_event_overrides')
+    op.drop_table('calendar_event_overrides')
+    op.drop_index('ix_calendar_event_occurrences_user_start', table_name='calendar_event_occurrences')
+    op.drop_table('calendar_event_occurrences')
+    op.drop_column('calendar_events', 'occurrences_until')
+    op.drop_column('calendar_events', 'occurrences_from')
@@ -0,0 +1,45 @@
+"""reminder indexes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('calendar_events', sa.Column('reminder_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('calendar_event_occurrences', sa.Column('reminder_at', sa.DateTime(timezone=True), nullable=True))
+
+    # Backfill reminder times of existing rows
+    op.execute("""
+        UPDATE calendar_events
+        SET reminder_at = start_time - make_interval(mins => reminder_minutes_before)
+        WHERE reminder_minutes_before IS NOT NULL
+          AND (is_recurring IS NOT TRUE OR recurrence_rule IS NULL)
+    """)
+    op.execute("""
+        UPDATE calendar_event_occurrences AS o
+        SET reminder_at = o.start_time - make_interval(mins => e.reminder_minutes_before)
+        FROM calendar_events AS e
+        WHERE e.id = o.event_id AND e.reminder_minutes_before IS NOT NULL
+    """)
+
+    op.create_index('ix_tasks_reminder_date', 'tasks', ['reminder_date'], unique=False, postgresql_where=sa.text('reminder_date IS NOT NULL'))
+    op.create_index('ix_calendar_events_reminder_at', 'calendar_events', ['reminder_at'], unique=False, postgresql_where=sa.text('reminder_at IS NOT NULL'))
+    op.create_index('ix_calendar_event_occurrences_reminder_at', 'calendar_event_occurrences', ['reminder_at'], unique=False, postgresql_where=sa.text('reminder_at IS NOT NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_calendar_event_occurrences_reminder_at', table_name='calendar_event_occurrences')
+    op.drop_index('ix_calendar_events_reminder_at', table_name='calendar_events')
+    op.drop_index('ix_tasks_reminder_date', table_name='tasks')
+    op.drop_column('calendar_event_occurrences', 'reminder_at')
+    op.drop_column('calendar_events', 'reminder_at')
@@ -0,0 +1,24 @@
+"""calendar ical uid
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('calendar_events', sa.Column('ical_uid', sa.String(), nullable=True))
+    op.create_index('uq_calendar_events_user_ical_uid', 'calendar_events', ['user_id', 'ical_uid'], unique=True, postgresql_where=sa.text('ical_uid IS NOT NULL'))
+
+
+def downgrade():
+    op.drop_index('uq_calendar_events_user_ical_uid', table_name='calendar_events')
+    op.drop_column('calendar_events', 'ical_uid')
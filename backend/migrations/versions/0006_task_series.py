@@ -0,0 +1,26 @@
+"""task series
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('tasks', sa.Column('series_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('tasks_series_id_fkey', 'tasks', 'tasks', ['series_id'], ['id'], ondelete='CASCADE')
+    op.create_index('uq_tasks_series_due_date', 'tasks', ['series_id', 'due_date'], unique=True, postgresql_where=sa.text('series_id IS NOT NULL'))
+
+
+def downgrade():
+    op.drop_index('uq_tasks_series_due_date', table_name='tasks')
+    op.drop_constraint('tasks_series_id_fkey', 'tasks', type_='foreignkey')
+    op.drop_column('tasks', 'series_id')
@@ -0,0 +1,35 @@
+"""user list indexes
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from alembic import op
+
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns)
+INDEXES = [
+    ('ix_tasks_user_status_due_date', 'tasks', ['user_id', 'status', 'due_date']),
+    ('ix_tasks_user_due_date', 'tasks', ['user_id', 'due_date']),
+    ('ix_documents_user_created_at', 'documents', ['user_id', 'created_at']),
+    ('ix_conversations_user_updated_at', 'conversations', ['user_id', 'updated_at']),
+    ('ix_messages_conversation_created_at', 'messages', ['conversation_id', 'created_at']),
+]
+
+
+def upgrade():
+    # Build concurrently so large tables stay writable during the upgrade
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
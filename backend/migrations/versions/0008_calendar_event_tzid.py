@@ -0,0 +1,22 @@
+"""calendar event tzid
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('calendar_events', sa.Column('tzid', sa.String(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('calendar_events', 'tzid')
@@ -0,0 +1,222 @@
+"""
+Database round-trip benchmark of the write paths
+
+Calls each benchmarked endpoint in-process and counts what it sends to
+the database: statements, BEGIN, COMMIT and ROLLBACK, on the primary
+and the read engine. Chat uses a stub AI provider, so no API key is
+needed and the counts do not depend on a provider.
+
+Exits with status 1 if an endpoint needs more round trips than its
+budget (BUDGETS, or --max name=N), so it can track regressions in CI.
+
+The background loops of the app are not started. The benchmark creates
+a user and a few rows, so point it at a scratch database.
+
+Usage (from backend/, against a migrated database):
+    DATABASE_URL=postgresql://... python -m scripts.bench_roundtrips [--max chat_new=5] [--json]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List
+import httpx
+from sqlalchemy import event
+from app.core.database import engine, read_engine
+from app.main import app
+from app.services.ai_base import AIServiceBase
+from app.services.ai_factory import AIServiceFactory
+
+STUB_PROVIDER = "bench"
+
+# Most round trips each endpoint may need
+BUDGETS = {
+    "chat_new": 5,
+    "chat_existing": 6,
+    "upload_document": 3,
+    "create_task": 3,
+    "create_recurring_task": 5,
+    "create_event": 3,
+    "create_recurring_event": 4,
+    "override_occurrence": 13,
+    "cancel_occurrence": 13,
+    "list_tasks": 3,
+}
+
+
+class StubAIService(AIServiceBase):
+    """Provider answering after a short delay, standing in for a real one"""
+
+    async def chat(self, messages, temperature=0.7, max_tokens=2000, stream=False):
+        await asyncio.sleep(0.01)
+        return f"Reply to: {messages[-1]['content']}"
+
+    async def analyze_document(self, text: str, prompt: str = None) -> str:
+        return text[:100]
+
+    async def summarize(self, text: str, max_length: int = 200) -> str:
+        return text[:max_length]
+
+    def get_provider_name(self) -> str:
+        return STUB_PROVIDER
+
+
+class RoundTripCounter:
+    """Counts statements and transaction control on both engines"""
+
+    def __init__(self):
+        self.counts = {"statements": 0, "begin": 0, "commit": 0, "rollback": 0}
+        for db_engine in {engine.sync_engine, read_engine.sync_engine}:
+            event.listen(db_engine, "before_cursor_execute", self._statement)
+            for name in ("begin", "commit", "rollback"):
+                event.listen(db_engine, name, self._counter(name))
+
+    def _statement(self, *args):
+        self.counts["statements"] += 1
+
+    def _counter(self, name: str) -> Callable:
+        def _count(conn):
+            self.counts[name] += 1
+        return _count
+
+    def reset(self):
+        for name in self.counts:
+            self.counts[name] = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return {**self.counts, "total": sum(self.counts.values())}
+
+
+def _event(start: datetime, recurring: bool) -> Dict:
+    return {
+        "title": "Bench event",
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=1)).isoformat(),
+        "is_recurring": recurring,
+        "recurrence_rule": "FREQ=WEEKLY;COUNT=10" if recurring else None,
+    }
+
+
+async def run(client: httpx.AsyncClient, counter: RoundTripCounter) -> List[Dict]:
+    suffix = uuid.uuid4().hex[:8]
+    user = await client.post(
+        "/api/v1/users/",
+        json={"email": f"bench-{suffix}@example.com", "username": f"bench-{suffix}", "password": "bench-password"},
+    )
+    user.raise_for_status()
+    params = {"user_id": user.json()["id"]}
+    start = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=1)
+    state = {}
+
+    async def create_recurring_event():
+        response = await client.post("/api/v1/calendar/", params=params, json=_event(start, True))
+        state["event_id"] = response.json().get("id")
+        return response
+
+    def occurrence(weeks: int) -> str:
+        return (start + timedelta(weeks=weeks)).isoformat()
+
+    async def chat_new():
+        response = await client.post("/api/v1/chat/", params=params, json={"message": "Hello", "ai_provider": STUB_PROVIDER})
+        state["conversation_id"] = response.json().get("conversation_id")
+        return response
+
+    steps = [
+        ("chat_new", chat_new),
+        ("chat_existing", lambda: client.post(
+            "/api/v1/chat/",
+            params=params,
+            json={"message": "Again", "conversation_id": state["conversation_id"], "ai_provider": STUB_PROVIDER},
+        )),
+        ("upload_document", lambda: client.post(
+            "/api/v1/documents/upload",
+            params=params,
+            files={"file": ("bench.txt", b"round trip benchmark", "text/plain")},
+        )),
+        ("create_task", lambda: client.post("/api/v1/tasks/", params=params, json={"title": "Bench task"})),
+        ("create_recurring_task", lambda: client.post(
+            "/api/v1/tasks/",
+            params=params,
+            json={
+                "title": "Bench series",
+                "due_date": start.isoformat(),
+                "is_recurring": True,
+                "recurrence_rule": "0 9 * * *",
+            },
+        )),
+        ("create_event", lambda: client.post("/api/v1/calendar/", params=params, json=_event(start, False))),
+        ("create_recurring_event", create_recurring_event),
+        ("override_occurrence", lambda: client.put(
+            f"/api/v1/calendar/{state['event_id']}/occurrences",
+            params=params,
+            json={"recurrence_id": occurrence(1), "title": "Moved"},
+        )),
+        ("cancel_occurrence", lambda: client.delete(
+            f"/api/v1/calendar/{state['event_id']}/occurrences",
+            params={**params, "recurrence_id": occurrence(2)},
+        )),
+        ("list_tasks", lambda: client.get("/api/v1/tasks/", params=params)),
+    ]
+
+    results = []
+    for name, call in steps:
+        counter.reset()
+        response = await call()
+        if response.status_code >= 400:
+            raise RuntimeError(f"{name} failed with {response.status_code}: {response.text[:500]}")
+        results.append({"endpoint": name, **counter.snapshot()})
+    return results
+
+
+async def _run_app(counter: RoundTripCounter) -> List[Dict]:
+    # Without the lifespan: its background loops would query the database
+    # while requests are counted
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        try:
+            return await run(client, counter)
+        finally:
+            await engine.dispose()
+            await read_engine.dispose()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max", action="append", default=[], help="name=N, overrides a budget")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    budgets = dict(BUDGETS)
+    for item in args.max:
+        name, _, limit = item.partition("=")
+        budgets[name] = int(limit)
+
+    AIServiceFactory.register(STUB_PROVIDER, StubAIService)
+    counter = RoundTripCounter()
+    results = asyncio.run(_run_app(counter))
+
+    failed = False
+    for result in results:
+        result["budget"] = budgets.get(result["endpoint"])
+        result["ok"] = result["budget"] is None or result["total"] <= result["budget"]
+        failed |= not result["ok"]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 1 if failed else 0
+
+    print(f"{'endpoint':<24} {'stmts':>5} {'begin':>5} {'commit':>6} {'rollbk':>6} {'total':>5} {'budget':>6}")
+    for r in results:
+        status = "" if r["ok"] else "  OVER BUDGET"
+        print(
+            f"{r['endpoint']:<24} {r['statements']:>5} {r['begin']:>5} {r['commit']:>6} "
+            f"{r['rollback']:>6} {r['total']:>5} {r['budget'] if r['budget'] is not None else '-':>6}{status}"
+        )
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
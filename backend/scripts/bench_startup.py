@@ -0,0 +1,167 @@
+"""
+Cold-start benchmark: import time and memory of app.main
+
+Imports the application in fresh interpreters, once per router profile,
+and reports the median import time, the peak RSS after import and the
+slowest third-party packages (from python -X importtime). Heavy optional
+libraries that got loaded are listed so a profile that should not need
+them (e.g. a tasks/calendar node) shows when one slips back in.
+
+Exits with status 1 if a limit given with --max-import-ms or --max-rss-mb
+is exceeded, so it can track regressions in CI.
+
+Usage (from backend/):
+    python -m scripts.bench_startup [--runs 5] [--profile core=users,tasks,calendar,agenda,changes]
+                                    [--max-import-ms 1500] [--max-rss-mb 150] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+# Libraries that only some routers need
+HEAVY_MODULES = [
+    "openai",
+    "anthropic",
+    "google.generativeai",
+    "ollama",
+    "PyPDF2",
+    "docx",
+    "PIL",
+    "pytesseract",
+    "speech_recognition",
+    "pydub",
+    "gtts",
+    "bs4",
+    "googlesearch",
+    "icalendar",
+]
+
+DEFAULT_PROFILES = {
+    "all": None,
+    "core": "users,tasks,calendar,agenda,changes",
+}
+
+# Runs in the child interpreter and prints one JSON line
+CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform != "darwin":
+    rss *= 1024  # kilobytes on Linux
+print(json.dumps({
+    "import_ms": elapsed * 1000,
+    "rss_bytes": rss,
+    "loaded": [m for m in %r if m in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def parse_importtime(stderr: str, top: int) -> List[Dict]:
+    """
+    Slowest third-party packages from -X importtime output
+
+    A package's time is the largest cumulative time of any of its modules,
+    i.e. the cost of its first import wherever that happened.
+    """
+    packages: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        package = name.strip().split(".")[0]
+        if package == "app" or package in sys.stdlib_module_names:
+            continue
+        packages[package] = max(packages.get(package, 0), int(cumulative))
+
+    slowest = sorted(packages.items(), key=lambda p: p[1], reverse=True)[:top]
+    return [{"module": package, "ms": us / 1000} for package, us in slowest]
+
+
+def run_once(routers: Optional[str], importtime: bool) -> Dict:
+    env = dict(os.environ)
+    # Background loops are not started: only the import is measured
+    if routers is not None:
+        env["API_ROUTERS"] = json.dumps(routers.split(","))
+
+    args = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", CHILD]
+    result = subprocess.run(args, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing app.main failed:\n{result.stderr[-2000:]}")
+
+    sample = json.loads(result.stdout.strip().splitlines()[-1])
+    if importtime:
+        sample["slowest"] = parse_importtime(result.stderr, 10)
+    return sample
+
+
+def bench(profile: str, routers: Optional[str], runs: int) -> Dict:
+    # The first run warms the bytecode cache and is not counted; importtime
+    # adds overhead, so it is collected from a separate run
+    run_once(routers, importtime=False)
+    samples = [run_once(routers, importtime=False) for _ in range(runs)]
+    detail = run_once(routers, importtime=True)
+
+    return {
+        "profile": profile,
+        "routers": routers or "all",
+        "import_ms": round(statistics.median(s["import_ms"] for s in samples), 1),
+        "rss_mb": round(statistics.median(s["rss_bytes"] for s in samples) / 1048576, 1),
+        "loaded": detail["loaded"],
+        "slowest": detail["slowest"],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--profile",
+        action="append",
+        help="name=router,router,... (default: all routers and a tasks/calendar core)",
+    )
+    parser.add_argument("--max-import-ms", type=float)
+    parser.add_argument("--max-rss-mb", type=float)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    profiles = DEFAULT_PROFILES
+    if args.profile:
+        profiles = dict(p.split("=", 1) if "=" in p else (p, p) for p in args.profile)
+
+    results = [bench(name, routers, args.runs) for name, routers in profiles.items()]
+
+    failed = False
+    for result in results:
+        result["ok"] = not (
+            (args.max_import_ms and result["import_ms"] > args.max_import_ms)
+            or (args.max_rss_mb and result["rss_mb"] > args.max_rss_mb)
+        )
+        failed |= not result["ok"]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 1 if failed else 0
+
+    for result in results:
+        status = "ok" if result["ok"] else "OVER LIMIT"
+        print(f"[{result['profile']}] {result['routers']}")
+        print(f"  import: {result['import_ms']} ms  peak RSS: {result['rss_mb']} MB  ({status})")
+        print(f"  heavy modules loaded: {', '.join(result['loaded']) or 'none'}")
+        print("  slowest packages:")
+        for item in result["slowest"]:
+            print(f"    {item['ms']:8.1f} ms  {item['module']}")
+        print()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+EXPLAIN audit of the per-user list queries
+
+Seeds a large synthetic dataset, runs EXPLAIN on the query behind each
+list endpoint and exits with status 1 if any of them plans a sequential
+scan over an audited table. Everything runs in one transaction that is
+rolled back, so the target database is left unchanged.
+
+Usage (from backend/, against a migrated database):
+    DATABASE_URL=postgresql://... python -m scripts.explain_audit [--users 2000] [--rows-per-user 100]
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+from sqlalchemy import Select, select, text
+from sqlalchemy.dialects import postgresql
+from app.core.config import settings
+from app.core.database import engine
+from app.models.calendar import CalendarEvent, CalendarEventOccurrence
+from app.models.conversation import Conversation, Message
+from app.models.document import Document
+from app.models.task import Task, TaskStatus
+from app.services.recurrence_service import (
+    MODE_CONTAINED,
+    MODE_OVERLAP,
+    MODE_STARTS,
+    not_expanded,
+    window_filter,
+)
+from app.services.reminder_scheduler import reminder_scheduler
+
+AUDITED_TABLES = {
+    "tasks",
+    "calendar_events",
+    "calendar_event_occurrences",
+    "documents",
+    "conversations",
+    "messages",
+}
+
+SEED_SQL = [
+    """
+    INSERT INTO users (email, username, hashed_password)
+    SELECT 'audit' || u || '@example.com', 'audit' || u, 'x'
+    FROM generate_series(1, :users) AS u
+    """,
+    """
+    INSERT INTO tasks (user_id, title, status, priority, due_date, reminder_date, is_recurring)
+    SELECT u.id, 'task ' || n,
+           (ARRAY['TODO', 'IN_PROGRESS', 'COMPLETED', 'CANCELLED'])[1 + n % 4]::taskstatus,
+           'MEDIUM'::taskpriority,
+           CASE WHEN n % 5 = 0 THEN NULL ELSE now() + n * interval '7 hours' END,
+           CASE WHEN n % 3 = 0 THEN now() + n * interval '7 hours' - interval '15 minutes' END,
+           false
+    FROM (SELECT id FROM users WHERE email LIKE 'audit%') AS u, generate_series(1, :rows) AS n
+    """,
+    """
+    INSERT INTO calendar_events (user_id, title, start_time, end_time, all_day, reminder_minutes_before,
+                                 reminder_at, is_recurring)
+    SELECT u.id, 'event ' || n,
+           now() + (n - :rows / 2) * interval '11 hours',
+           now() + (n - :rows / 2) * interval '11 hours' + interval '1 hour',
+           false, 15,
+           now() + (n - :rows / 2) * interval '11 hours' - interval '15 minutes',
+           false
+    FROM (SELECT id FROM users WHERE email LIKE 'audit%') AS u, generate_series(1, :rows) AS n
+    """,
+    """
+    INSERT INTO calendar_event_occurrences (event_id, user_id, recurrence_id, start_time, end_time, reminder_at)
+    SELECT id, user_id, start_time, start_time, end_time, reminder_at
+    FROM calendar_events
+    """,
+    """
+    INSERT INTO documents (user_id, filename, original_filename, file_path, file_type, file_size, created_at)
+    SELECT u.id, 'doc' || n, 'doc' || n || '.pdf', '/tmp/doc' || n, 'pdf', 1024,
+           now() - n * interval '1 hour'
+    FROM (SELECT id FROM users WHERE email LIKE 'audit%') AS u, generate_series(1, :rows / 4) AS n
+    """,
+    """
+    INSERT INTO conversations (user_id, title, ai_provider, created_at, updated_at)
+    SELECT u.id, 'conversation ' || n, 'gemini',
+           now() - n * interval '1 day', now() - n * interval '1 hour'
+    FROM (SELECT id FROM users WHERE email LIKE 'audit%') AS u, generate_series(1, :rows / 10) AS n
+    """,
+    """
+    INSERT INTO messages (conversation_id, role, content, created_at)
+    SELECT c.id, 'USER'::messagerole, 'message ' || n, now() - n * interval '1 minute'
+    FROM (SELECT id FROM conversations) AS c, generate_series(1, 10) AS n
+    """,
+    "ANALYZE",
+]
+
+
+def list_queries(user_id: int, conversation_ids: List[int]) -> Dict[str, Select]:
+    """Statements issued by the list endpoints, keyed by a readable name"""
+    now = datetime.now(timezone.utc)
+    week = now + timedelta(days=7)
+    month = now + timedelta(days=30)
+    reminder_window = now + timedelta(seconds=settings.REMINDER_LOAD_WINDOW)
+
+    return {
+        # GET /tasks
+        "tasks.list": select(Task)
+        .where(Task.user_id == user_id)
+        .order_by(Task.due_date.asc().nullslast()),
+        "tasks.list?status_filter": select(Task)
+        .where(Task.user_id == user_id, Task.status == TaskStatus.TODO)
+        .order_by(Task.due_date.asc().nullslast()),
+        # GET /calendar
+        "calendar.list": select(CalendarEvent)
+        .where(CalendarEvent.user_id == user_id)
+        .order_by(CalendarEvent.start_time.asc()),
+        "calendar.list?range": select(CalendarEvent).where(
+            CalendarEvent.user_id == user_id,
+            window_filter(CalendarEvent, now, month, MODE_CONTAINED),
+            not_expanded,
+        ),
+        "calendar.list?range&overlap": select(CalendarEvent).where(
+            CalendarEvent.user_id == user_id,
+            window_filter(CalendarEvent, now, month, MODE_OVERLAP),
+            not_expanded,
+        ),
+        "calendar.occurrences": select(CalendarEventOccurrence).where(
+            CalendarEventOccurrence.user_id == user_id,
+            window_filter(CalendarEventOccurrence, now, month, MODE_STARTS),
+        ),
+        # GET /calendar/upcoming
+        "calendar.upcoming": select(CalendarEvent).where(
+            CalendarEvent.user_id == user_id,
+            CalendarEvent.start_time >= now,
+            CalendarEvent.start_time <= week,
+            not_expanded,
+        ),
+        # GET /documents
+        "documents.list": select(Document)
+        .where(Document.user_id == user_id)
+        .order_by(Document.created_at.desc()),
+        # GET /chat/conversations (with selectinload of messages)
+        "conversations.list": select(Conversation)
+        .where(Conversation.user_id == user_id)
+        .order_by(Conversation.updated_at.desc()),
+        "conversations.messages": select(Message)
+        .where(Message.conversation_id.in_(conversation_ids)),
+        # Reminder scheduler window loads (the scheduler's own statements)
+        "reminders.tasks": reminder_scheduler._task_query(now, reminder_window),
+        "reminders.events": reminder_scheduler._event_query(now, reminder_window),
+        "reminders.occurrences": reminder_scheduler._occurrence_query(now, reminder_window),
+    }
+
+
+def seq_scans(plan: dict) -> List[str]:
+    """Relations read by sequential scans anywhere in a plan tree"""
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in AUDITED_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def compile_sql(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+async def audit(users: int, rows_per_user: int, verbose: bool) -> List[Tuple[str, List[str]]]:
+    failures = []
+
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            print(f"Seeding {users} users x {rows_per_user} rows...")
+            for sql in SEED_SQL:
+                await conn.execute(text(sql), {"users": users, "rows": rows_per_user})
+
+            user_id = (await conn.execute(
+                text("SELECT id FROM users WHERE email LIKE 'audit%' ORDER BY id OFFSET :n LIMIT 1"),
+                {"n": users // 2},
+            )).scalar_one()
+            conversation_ids = list((await conn.execute(
+                select(Conversation.id).where(Conversation.user_id == user_id)
+            )).scalars().all())
+
+            for name, statement in list_queries(user_id, conversation_ids).items():
+                sql = compile_sql(statement)
+                result = await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+                raw = result.scalar_one()
+                plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+
+                scans = seq_scans(plan)
+                status = "FAIL" if scans else "ok"
+                print(f"{status:4} {name:32} {plan['Node Type']:24} cost={plan['Total Cost']}")
+                if verbose or scans:
+                    plan_text = await conn.execute(text(f"EXPLAIN {sql}"))
+                    print("\n".join("      " + row[0] for row in plan_text.all()))
+                if scans:
+                    failures.append((name, scans))
+        finally:
+            await trans.rollback()
+
+    await engine.dispose()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--rows-per-user", type=int, default=100)
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    failures = asyncio.run(audit(args.users, args.rows_per_user, args.verbose))
+
+    if failures:
+        print(f"\n{len(failures)} queries use sequential scans:")
+        for name, tables in failures:
+            print(f"  {name}: {', '.join(sorted(set(tables)))}")
+        sys.exit(1)
+
+    print("\nAll audited queries use indexes")
+
+
+if __name__ == "__main__":
+    main()